@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of MailFolder tree construction on synthetic LIST responses.
+
+Usage: python benchmarks/bench_mail_folder.py [number of folders]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from imapy.mail_folder import MailFolder  # noqa: E402
+
+
+def synthetic_list_response(total, fanout=10):
+    """Returns LIST response lines of a balanced folder hierarchy"""
+    lines = [b'(\\HasChildren) "/" "INBOX"']
+    level = ["INBOX"]
+    while len(lines) < total:
+        next_level = []
+        for parent in level:
+            for i in range(fanout):
+                name = f"{parent}/Project {i}"
+                lines.append(b'(\\HasNoChildren) "/" "' + name.encode() + b'"')
+                next_level.append(name)
+                if len(lines) >= total:
+                    return lines
+        level = next_level
+    return lines
+
+
+def bench(total, fanout, repeat=3):
+    raw_folders = synthetic_list_response(total, fanout)
+    best_total = best_tree = float("inf")
+    for _ in range(repeat):
+        mail_folder = MailFolder()
+        create_tree = mail_folder._create_tree_and_children
+        tree_time = []
+
+        def timed_create_tree(*args):
+            start = time.perf_counter()
+            result = create_tree(*args)
+            tree_time.append(time.perf_counter() - start)
+            return result
+
+        mail_folder._create_tree_and_children = timed_create_tree
+        start = time.perf_counter()
+        mail_folder.get_folders((None, raw_folders))
+        best_total = min(best_total, time.perf_counter() - start)
+        best_tree = min(best_tree, tree_time[0])
+    depth = max(line.count(b"/") for line in raw_folders) - 1
+    print(
+        f"{len(raw_folders):>7} folders, depth {depth:>2}: "
+        f"total {best_total * 1000:9.1f} ms, tree {best_tree * 1000:9.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [1000, 10000, 100000]
+    for size in sizes:
+        bench(size, fanout=10)
+        bench(size, fanout=2)
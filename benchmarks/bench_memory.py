@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark of EmailMessage objects kept by the caller (e.g. result
+of folder.emails()). Current slotted layout with flag bitmask and lazily
+built headers is compared with the previous implementation kept in
+reference_email_message.py (attributes in __dict__ of every message,
+sender and contact object, list of flags, headers copied when the message
+is parsed).
+
+Usage: python benchmarks/bench_memory.py [number of messages]
+"""
+import email
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from imapy import email_message as current  # noqa: E402
+
+import reference_email_message as reference  # noqa: E402
+
+
+def synthetic_emails(total):
+    """Returns parsed email objects with a few typical headers"""
+    emails = []
+    for i in range(total):
+        raw = (
+            f"From: Sender {i} <sender{i}@example.com>\r\n"
+            f"To: rcpt{i}@example.com, other@example.com\r\n"
+            f"Subject: Report {i}\r\n"
+            f"Date: Mon, 19 Oct 2026 10:00:00 +0000\r\n"
+            f"Message-ID: <{i}@example.com>\r\n"
+            "\r\n"
+            f"Body of message {i}\r\n"
+        )
+        emails.append(email.message_from_string(raw))
+    return emails
+
+
+def measure(module, emails):
+    """Returns bytes allocated per message kept in memory"""
+    flag = module.EmailFlag
+    flags = [flag.SEEN, flag.FLAGGED, "$Forwarded"]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    messages = [
+        module.EmailMessage(
+            folder="INBOX",
+            uid=str(i),
+            flags=list(flags),
+            email_obj=email_obj,
+            imap_obj=None,
+        )
+        for i, email_obj in enumerate(emails)
+    ]
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del messages
+    return allocated / len(emails)
+
+
+def bench(total):
+    emails = synthetic_emails(total)
+    before = measure(reference, emails)
+    after = measure(current, emails)
+    print(
+        f"{total:>7} messages: "
+        f"reference {before:8.0f} bytes/message, "
+        f"current {after:8.0f} bytes/message "
+        f"({(before - after) * total / 1024 / 1024:.1f} MB saved)"
+    )
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of IMAP modified UTF-7 codec on a large LIST response.
+Current codec is compared with the previous per-character implementation.
+
+Usage: python benchmarks/bench_utf7.py [number of folders]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from imapy import utils  # noqa: E402
+from imapy.packages import imap_utf7  # noqa: E402
+from imapy.packages.imap_utf7 import (  # noqa: E402
+    PRINTABLE,
+    modified_deutf7,
+    modified_utf7,
+)
+
+
+def reference_encode(s):
+    """Previous implementation processing one character at a time"""
+    r = []
+    _in = []
+
+    def extend_result_if_chars_buffered():
+        if _in:
+            r.extend([b"&", modified_utf7("".join(_in)), b"-"])
+            del _in[:]
+
+    for c in s:
+        if ord(c) in PRINTABLE:
+            extend_result_if_chars_buffered()
+            r.append(c.encode("latin-1"))
+        elif c == "&":
+            extend_result_if_chars_buffered()
+            r.append(b"&-")
+        else:
+            _in.append(c)
+
+    extend_result_if_chars_buffered()
+    return b"".join(r)
+
+
+def reference_decode(s):
+    """Previous implementation processing one byte at a time"""
+    r = []
+    _in = bytearray()
+    for c in s:
+        if c == ord(b"&") and not _in:
+            _in.append(c)
+        elif c == ord(b"-") and _in:
+            if len(_in) == 1:
+                r.append("&")
+            else:
+                r.append(modified_deutf7(bytes(_in[1:])))
+            _in = bytearray()
+        elif _in:
+            _in.append(c)
+        else:
+            r.append(chr(c))
+    if _in:
+        r.append(modified_deutf7(bytes(_in[1:])))
+    return "".join(r)
+
+
+def synthetic_names(total):
+    """Returns folder names, every 10th of them containing non-ASCII text"""
+    names = []
+    for i in range(total):
+        if i % 10:
+            names.append(f"INBOX/Projects/Customer {i}/Reports & Invoices")
+        else:
+            names.append(f"INBOX/Проекты/Клиент {i}/Отчёты")
+    return names
+
+
+def timed(func, items, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(total):
+    names = synthetic_names(total)
+    encoded = [imap_utf7.encode(n) for n in names]
+    lines = [b'(\\HasNoChildren) "/" "' + e + b'"' for e in encoded]
+    assert [reference_decode(line) for line in lines] == [
+        imap_utf7.decode(line) for line in lines
+    ]
+    for name, reference, current, cached, items in (
+        ("decode", reference_decode, imap_utf7.decode, utils.utf7_to_unicode, lines),
+        ("encode", reference_encode, imap_utf7.encode, utils.str_to_utf7, names),
+    ):
+        # fill the cache before measuring cached calls
+        cached_items = items[:4096]
+        for item in cached_items:
+            cached(item)
+        print(
+            f"{total:>7} names, {name}: "
+            f"reference {timed(reference, items):8.1f} ms, "
+            f"current {timed(current, items):8.1f} ms, "
+            f"cached (first 4096) {timed(cached, cached_items):6.1f} ms "
+            f"vs {timed(current, cached_items):6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -13,8 +13,8 @@ import email
 import re
 from dataclasses import dataclass
 from email.header import decode_header
-from enum import Enum, auto
-from typing import Any, Dict, List, Optional, Union
+from enum import Enum, IntFlag, auto
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from . import utils
 from .exceptions import EmailParsingError
@@ -22,7 +22,11 @@ from .structures import CaseInsensitiveDict
 
 
 class EmailParser:
+    __slots__ = ()
+
     class EmailContact:
+        __slots__ = ("name", "email")
+
         def __init__(self, name: str, email: str) -> None:
             self.name: str = name
             self.email: str = email
@@ -59,6 +63,8 @@ class EmailParser:
 
 
 class EmailSender(EmailParser):
+    __slots__ = ("_sender",)
+
     def __init__(self, sender_info: str) -> None:
         self._sender: EmailParser.EmailContact = self.parse_email_info(sender_info)
 
@@ -78,6 +84,8 @@ class EmailSender(EmailParser):
 
 
 class EmailRecipients(EmailParser):
+    __slots__ = ("_recipients",)
+
     def __init__(self, receiver_info: str) -> None:
         self._recipients: List[EmailParser.EmailContact] = self.parse_multiple_emails(
             receiver_info
@@ -110,6 +118,27 @@ class EmailFlag(Enum):
     UNFLAGGED = auto()
 
 
+class FlagSet(IntFlag):
+    """Bitmask of standard flags set on a message"""
+
+    SEEN = 1
+    ANSWERED = 2
+    FLAGGED = 4
+    DELETED = 8
+    DRAFT = 16
+    RECENT = 32
+
+
+# bits of standard flags and flags which are removed by pseudo-flags
+FLAG_BITS = {
+    flag: FlagSet[flag.name] for flag in EmailFlag if flag.name in FlagSet.__members__
+}
+REMOVED_FLAG_BITS = {
+    EmailFlag.UNSEEN: FlagSet.SEEN,
+    EmailFlag.UNFLAGGED: FlagSet.FLAGGED,
+}
+
+
 @dataclass
 class EmailAttachment:
     """Class for storing email attachaments"""
@@ -123,19 +152,44 @@ class EmailAttachment:
 
 
 class EmailMessage:
-    """Class for parsing email messages"""
+    """Class for parsing email messages. Standard flags are kept as FlagSet
+    bitmask, other keywords (e.g. "$Forwarded") in a separate tuple."""
+
+    __slots__ = (
+        "_folder",
+        "_uid",
+        "_flag_bits",
+        "_keywords",
+        "_email_obj",
+        "_imap_obj",
+        "sender",
+        "recipients",
+        "_subject",
+        "_cc",
+        "_text",
+        "_html",
+        "_headers",
+        "_attachments",
+        "_date",
+    )
 
     def __init__(
         self,
         folder: str,
         uid: str,
-        flags: List[EmailFlag],
+        flags: List[Union[EmailFlag, str]],
         email_obj: email.message.Message,
         imap_obj: Any,
     ):
         self._folder: str = folder
         self._uid: str = uid
-        self._flags: List[EmailFlag] = flags
+        self._flag_bits: int = 0
+        self._keywords: Tuple[str, ...] = ()
+        for flag in flags:
+            if flag in FLAG_BITS:
+                self._flag_bits |= FLAG_BITS[flag]  # type: ignore
+            elif isinstance(flag, str) and flag not in self._keywords:
+                self._keywords += (flag,)
         self._email_obj: email.message.Message = email_obj
         self._imap_obj: Any = imap_obj
         self.sender: EmailSender
@@ -144,7 +198,8 @@ class EmailMessage:
         self._cc: List[Dict[str, str]] = []
         self._text: List[Dict[str, Union[str, List[str]]]] = []
         self._html: List[str] = []
-        self._headers: CaseInsensitiveDict = CaseInsensitiveDict()
+        # built from email object when first requested
+        self._headers: Optional[CaseInsensitiveDict] = None
         self._attachments: List[EmailAttachment] = []
         self._date: Optional[str] = None
 
@@ -170,8 +225,18 @@ class EmailMessage:
         self._uid = value
 
     @property
-    def flags(self) -> List[EmailFlag]:
-        return self._flags
+    def flags(self) -> List[Union[EmailFlag, str]]:
+        """Returns new list of standard flags (in EmailFlag order, not in
+        the order sent by server) followed by keywords. Use mark() to
+        change flags."""
+        flags: List[Union[EmailFlag, str]] = [
+            flag for flag, bit in FLAG_BITS.items() if self._flag_bits & bit
+        ]
+        return flags + list(self._keywords)
+
+    @property
+    def flag_set(self) -> FlagSet:
+        return FlagSet(self._flag_bits)
 
     @property
     def subject(self) -> str:
@@ -191,6 +256,13 @@ class EmailMessage:
 
     @property
     def headers(self) -> CaseInsensitiveDict:
+        if self._headers is None:
+            self._headers = CaseInsensitiveDict()
+            for header, val in self._email_obj.items():
+                if header in self._headers:
+                    self._headers[header].append(val)
+                else:
+                    self._headers[header] = [val]
         return self._headers
 
     @property
@@ -222,16 +294,18 @@ class EmailMessage:
                 links.add(m)
         return list(links)
 
+    def _update_flags(self, flags: List[EmailFlag]) -> None:
+        """Applies flag changes to the local copy of message flags"""
+        for flag in flags:
+            if flag in REMOVED_FLAG_BITS:
+                self._flag_bits &= ~REMOVED_FLAG_BITS[flag]
+            else:
+                self._flag_bits |= FLAG_BITS[flag]
+
     def mark(self, flags: Union[EmailFlag, List[EmailFlag]]) -> Any:
         if not isinstance(flags, list):
             flags = [flags]
-        for flag in flags:
-            if flag.name.startswith("UN"):
-                if EmailFlag[flag.name[2:]] in self._flags:
-                    self._flags.remove(EmailFlag[flag.name[2:]])
-            else:
-                if flag not in self._flags:
-                    self._flags.append(flag)
+        self._update_flags(flags)
         return self._imap_obj.mark(flags, self.uid)
 
     def delete(self) -> Any:
@@ -339,9 +413,3 @@ class EmailMessage:
                     )
 
         self._date = self._email_obj["Date"]
-
-        for header, val in self._email_obj.items():
-            if header in self._headers:
-                self._headers[header].append(val)
-            else:
-                self._headers[header] = [val]
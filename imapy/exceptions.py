@@ -47,6 +47,11 @@ class SearchSyntaxNotSupported(ImapyException):
     than 1 parameter containing non-ascii characters"""
 
 
+class ExtensionNotSupported(ImapyException):
+    """Raised when operation requires IMAP extension which is not
+    supported by the server"""
+
+
 class TagNotSupported(ImapyException):
     """Raised when user tries to mark email message with non-standard tag"""
 
@@ -59,6 +64,19 @@ class NonexistentFolderError(ImapyException):
     """Raised when selecting non-existing email folder"""
 
 
+class AppendFailed(ImapyException):
+    """Raised when server refuses to append email message(s)"""
+
+
+class CommandTimeout(ImapyException):
+    """Raised when command is not completed in time. Connection is closed
+    as its state is unknown; use IMAP.reconnect() to continue"""
+
+
+class CommandCancelled(CommandTimeout):
+    """Raised when running command is cancelled with IMAP.cancel()"""
+
+
 """
 MailFolder Exceptions
 """
@@ -88,3 +106,7 @@ class ConnectionRefused(ImapyException):
 
 class InvalidHost(ImapyException):
     """Invalid host"""
+
+
+class ConnectionTimeout(ConnectionRefused):
+    """Connection was not established in time"""
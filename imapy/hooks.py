@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.hooks
+    ~~~~~~~~~~~
+
+    This module contains observer API used to instrument Imapy: observers
+    are notified before and after every IMAP command and around parsing
+    of fetched email messages. StatsCollector observer aggregates
+    durations and byte counts in memory.
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class CommandEvent:
+    """IMAP command sent to server. Status (OK, NO, BAD or name of the
+    exception which interrupted the command), duration and received data
+    are known after the command is completed. Received data is counted
+    for the oldest command in progress when commands are pipelined.
+    """
+
+    tag: str
+    started: float
+    name: str = ""
+    folder: Optional[str] = None
+    status: Optional[str] = None
+    duration: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    literals_sent: int = 0
+    literals_received: int = 0
+
+
+@dataclass
+class ParseEvent:
+    """Parse phase of fetched email message: "mime" (raw message data to
+    email.message.Message) or "message" (EmailMessage fields)"""
+
+    phase: str
+    folder: Optional[str]
+    uid: str
+    size: int
+    duration: float = 0.0
+    # name of the exception raised while parsing
+    error: Optional[str] = None
+
+
+class Observer:
+    """Base class of observers passed to IMAP(observers=[...]). Methods
+    are called from the thread which sends commands."""
+
+    def before_command(self, event: CommandEvent) -> None:
+        pass
+
+    def after_command(self, event: CommandEvent) -> None:
+        pass
+
+    def before_parse(self, event: ParseEvent) -> None:
+        pass
+
+    def after_parse(self, event: ParseEvent) -> None:
+        pass
+
+    def after_reconnect(self) -> None:
+        """Called when IMAP.reconnect() opened new connection"""
+
+    def after_checkout(self, wait: float) -> None:
+        """Called when connection is checked out from ConnectionPool after
+        waiting for wait seconds"""
+
+
+@contextmanager
+def parse_phase(
+    observers: List[Observer],
+    phase: str,
+    folder: Optional[str],
+    uid: str,
+    size: int,
+) -> Iterator[None]:
+    """Notifies observers before and after the with block"""
+    if not observers:
+        yield
+        return
+    event = ParseEvent(phase, folder, uid, size)
+    for observer in observers:
+        observer.before_parse(event)
+    started = time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        event.error = type(e).__name__
+        raise
+    finally:
+        event.duration = time.monotonic() - started
+        for observer in observers:
+            observer.after_parse(event)
+
+
+def percentile(samples: Iterable[float], q: float) -> Optional[float]:
+    """Returns q-th percentile (0-100) of samples using linear
+    interpolation or None if there are no samples"""
+    values = sorted(samples)
+    if not values:
+        return None
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class StatsCollector(Observer):
+    """Aggregates command and parse durations (last max_samples of every
+    command or parse phase), command counts by status and byte counts.
+    Can be shared by several connections."""
+
+    def __init__(self, max_samples: int = 10000) -> None:
+        self.max_samples = max_samples
+        self.durations: Dict[str, Deque[float]] = defaultdict(self._samples)
+        self.statuses: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.bytes_sent: Dict[str, int] = defaultdict(int)
+        self.bytes_received: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _samples(self) -> Deque[float]:
+        return deque(maxlen=self.max_samples)
+
+    def after_command(self, event: CommandEvent) -> None:
+        with self._lock:
+            self.durations[event.name].append(event.duration)
+            self.statuses[(event.name, event.status or "")] += 1
+            self.bytes_sent[event.name] += event.bytes_sent
+            self.bytes_received[event.name] += event.bytes_received
+
+    def after_parse(self, event: ParseEvent) -> None:
+        with self._lock:
+            self.durations["parse:" + event.phase].append(event.duration)
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """Returns q-th percentile of durations of a command (e.g.
+        "UID FETCH") or parse phase (e.g. "parse:mime")"""
+        with self._lock:
+            samples = list(self.durations.get(name, ()))
+        return percentile(samples, q)
+
+    def summary(
+        self, percentiles: Iterable[float] = (50, 90, 99)
+    ) -> Dict[str, Dict[str, Any]]:
+        """Returns number of samples, percentiles of durations and byte
+        counts of every command and parse phase"""
+        with self._lock:
+            durations = {name: list(d) for name, d in self.durations.items()}
+            statuses = dict(self.statuses)
+        summary = {}
+        for name, samples in durations.items():
+            stats: Dict[str, Any] = {"count": len(samples)}
+            for q in percentiles:
+                stats[f"p{q:g}"] = percentile(samples, q)
+            if not name.startswith("parse:"):
+                stats["statuses"] = {
+                    status: count
+                    for (command, status), count in statuses.items()
+                    if command == name
+                }
+                stats["bytes_sent"] = self.bytes_sent[name]
+                stats["bytes_received"] = self.bytes_received[name]
+            summary[name] = stats
+        return summary
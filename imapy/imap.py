@@ -9,18 +9,38 @@
     :license: MIT, see LICENSE for more details.
 """
 
+import codecs
 import email
 import imaplib
 import re
 import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from email.message import Message
 from email.mime.base import MIMEBase
-from typing import Any, Dict, List, Optional, Union
+from email.parser import FeedParser
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from . import utils
+from . import scheduler, sorting, utils
 from .email_message import EmailFlag, EmailMessage
 from .exceptions import (
+    AppendFailed,
+    CommandTimeout,
     ConnectionRefused,
+    ConnectionTimeout,
+    ExtensionNotSupported,
     ImapyLoggedOut,
     InvalidFolderName,
     InvalidHost,
@@ -29,8 +49,29 @@ from .exceptions import (
     TagNotSupported,
     UnknownEmailMessageType,
 )
+from .hooks import Observer, parse_phase
+from .literal import Literal
 from .mail_folder import MailFolder
+from .pool import ConnectionPool
 from .query_builder import Q
+from .ratelimit import RateLimiter
+from .structures import SavedSearch, SearchPage, SearchResult, UIDSet
+from .transport import Transport
+
+CRLF = b"\r\n"
+
+STATUS_ITEMS = "(MESSAGES RECENT UIDNEXT UIDVALIDITY UNSEEN)"
+# untagged STATUS response: mailbox name followed by status items
+STATUS_RESPONSE = re.compile(
+    rb'^(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<atom>\S+))\s+\((?P<items>.*)\)$'
+)
+
+# multi-mailbox search command (RFC 7377) is unknown to imaplib
+imaplib.Commands.setdefault("ESEARCH", ("AUTH", "SELECTED"))
+
+UIDsOrMessages = Union[
+    str, int, EmailMessage, SavedSearch, Iterable[Union[str, int, EmailMessage]]
+]
 
 
 def is_logged(func):
@@ -47,19 +88,6 @@ def is_logged(func):
     return wrapper
 
 
-def refresh_folders(func):
-    """Decorator used to refresh folder tree during operations
-    involving changing folder name(s) or structure
-    """
-
-    def wrapper(*args, **kwargs):
-        f = func(*args, **kwargs)
-        args[0]._update_folder_info()
-        return f
-
-    return wrapper
-
-
 @dataclass
 class IMAP:
     """Class used for interfacing between"""
@@ -73,10 +101,20 @@ class IMAP:
     auth_object: Any = None
     debug_level: int = 0
     port: int = 0
-
+    starttls: bool = False
+    # limits of commands and bytes per second (may be shared between
+    # connections)
+    rate_limiter: Optional[RateLimiter] = None
+    # seconds allowed for connecting (and for every socket operation)
+    connect_timeout: Optional[float] = None
+    # seconds allowed for every command to complete
+    command_timeout: Optional[float] = None
+    # instrumentation notified about commands and parsing of emails
+    observers: List[Observer] = field(default_factory=list)
+
+    # capabilities of the current session
     capabilities: List[str] = field(default_factory=list)
     separator: Optional[str] = None
-    folder_capabilities: Dict[str, List[str]] = field(default_factory=dict)
 
     # email flags
     standard_rw_flags: List[EmailFlag] = field(
@@ -96,14 +134,23 @@ class IMAP:
     # folders
     selected_folder: Optional[str] = None
     selected_folder_utf7: Optional[bytes] = None
+    _selected_mailbox: Optional[str] = field(default=None, init=False)
+    _expunge_pending: bool = field(default=False, init=False)
+    # changes whenever search result saved on server ($) is reset
+    _search_generation: int = field(default=0, init=False)
     mail_folder_class: MailFolder = field(default_factory=MailFolder)
 
     # email parsing
     msg_class = EmailMessage
+    # byte budget of iter_emails() batches adapted to server responses
+    fetch_batch_size: scheduler.AdaptiveBatchSize = field(
+        default_factory=scheduler.AdaptiveBatchSize
+    )
 
     operating_folder: Optional[str] = None
     logged_in: bool = False
     imap: Union[imaplib.IMAP4, imaplib.IMAP4_SSL] = field(init=False)
+    transport: Transport = field(init=False)
 
     # default ports
     IMAP4_SSL_PORT: int = 993
@@ -113,12 +160,79 @@ class IMAP:
         if not self.port:
             self.port = self.IMAP4_SSL_PORT if self.ssl else self.IMAP4_PORT
 
-        if self.ssl:
-            self.imap = imaplib.IMAP4_SSL(self.host, port=self.port)
-        else:
-            self.imap = imaplib.IMAP4(self.host, port=self.port)
         self.standard_flags = self.standard_rw_flags + self.standard_r_flags
+        self._open()
+        self.connect()
+
+    def _open(self) -> None:
+        """Opens connection to server"""
+        kwargs: Dict[str, Any] = (
+            {"timeout": self.connect_timeout} if self.connect_timeout else {}
+        )
+        try:
+            if self.ssl:
+                self.imap = imaplib.IMAP4_SSL(self.host, port=self.port, **kwargs)
+            else:
+                self.imap = imaplib.IMAP4(self.host, port=self.port, **kwargs)
+        except socket.timeout as e:
+            raise ConnectionTimeout(
+                f"Connection to {self.host}:{self.port} timed out"
+            ) from e
+        self.transport = Transport(
+            self.imap,
+            self.rate_limiter,
+            timeout=self.connect_timeout,
+            command_timeout=self.command_timeout,
+            folder=lambda: self.selected_folder,
+            on_close=self._connection_closed,
+            observers=self.observers,
+        )
+
+    def _connection_closed(self) -> None:
+        """Resets session state after connection was closed because of
+        a timed out or cancelled command"""
+        self.logged_in = False
+        self._selected_mailbox = None
+        self._expunge_pending = False
+        self._search_generation += 1
+
+    def reconnect(self) -> "IMAP":
+        """Opens new connection (e.g. after a command timed out or was
+        cancelled) and selects previously selected folder again"""
+        folder_name = self.selected_folder
+        readonly = bool(getattr(self.imap, "is_readonly", False))
+        if self.logged_in:
+            try:
+                self.logout()
+            except (imaplib.IMAP4.error, OSError, CommandTimeout):
+                pass
+        self._open()
         self.connect()
+        if folder_name and folder_name in self.mail_folders:
+            self.folder(folder_name, readonly)
+        for observer in self.observers:
+            observer.after_reconnect()
+        return self
+
+    def cancel(self) -> None:
+        """Cancels running command (e.g. long FETCH) from another thread.
+        Connection is closed and CommandCancelled is raised in the thread
+        which sent the command. Does nothing when no command is running."""
+        self.transport.cancel()
+
+    @contextmanager
+    def deadline(self, seconds: float) -> Iterator["IMAP"]:
+        """Commands sent inside the with block have to be completed within
+        seconds in total, otherwise CommandTimeout is raised"""
+        previous = self.transport.deadline
+        deadline = time.monotonic() + seconds
+        self.transport.deadline = (
+            deadline if previous is None else min(previous, deadline)
+        )
+        try:
+            yield self
+        finally:
+            self.transport.deadline = previous
 
     def __enter__(self):
         return self
@@ -133,13 +247,19 @@ class IMAP:
         return f'"{self.selected_folder}"'
 
     def logout(self) -> None:
-        """Log out"""
-        # expunge selected folder if selected
-        if self.selected_folder:
-            self.imap.close()
-        self.imap.logout()
+        """Log out; only session state is reset when connection was
+        already closed (e.g. after a command timed out)"""
+        if self.imap.state != "LOGOUT":
+            # LOGOUT does not expunge, so CLOSE is sent only when messages
+            # were marked as deleted in the selected folder
+            if self.selected_folder and self._expunge_pending:
+                self.imap.close()
+            self.imap.logout()
         # cleanup vars
         self.selected_folder = self.selected_folder_utf7 = None
+        self._selected_mailbox = None
+        self._expunge_pending = False
+        self._search_generation += 1
         self.logged_in = False
 
     def log_out(self) -> None:
@@ -149,27 +269,17 @@ class IMAP:
     @is_logged
     def folders(self, search_string: Optional[str] = None) -> List[str]:
         """Return list of email all folders or folder names matching
-        the search string
+        the search string ("*" matches any characters; use list_folders()
+        for LIST patterns with "%")
         """
         if search_string:
-            # search folders folders
-            regexp = ""
-            parts = re.split(r"(?<!\\)\*", search_string)
-            total = len(parts)
-            for i, p in enumerate(parts):
-                if p:
-                    regexp += re.escape(p)
-                    if (i + 1) < total:
-                        regexp += ".*"
-                else:
-                    if (i + 1) < total:
-                        regexp += ".*"
-            folders = []
-            for f in self.mail_folders:
-                real_name = f.split(self.separator).pop()
-                if re.match("^" + regexp + "$", real_name):
-                    folders.append(f)
-            return folders
+            # search folders by their names
+            pattern = utils.list_pattern_to_regex(search_string, wildcards="*")
+            return [
+                f
+                for f in self.mail_folders
+                if pattern.fullmatch(f.rpartition(self.separator or "")[2])
+            ]
         else:
             if hasattr(self, "mail_folders"):
                 return self.mail_folders
@@ -177,33 +287,132 @@ class IMAP:
         return self.mail_folders
 
     @is_logged
-    def folder(self, folder_name: str = "") -> "IMAP":
+    def list_folders(
+        self,
+        pattern: str = "*",
+        reference: str = "",
+        selection: Optional[List[str]] = None,
+        return_options: Optional[List[str]] = None,
+        update: bool = False,
+    ) -> List[str]:
+        """Returns names of folders matching LIST pattern on server side
+        ("*" matches any characters, "%" doesn't match hierarchy separator).
+        LIST-EXTENDED selection options (e.g. SUBSCRIBED, SPECIAL-USE) and
+        return options (e.g. CHILDREN) are passed to server when specified.
+        Folder tree is replaced with the listed folders if update is True.
+        """
+        raw_folders = self._list(pattern, reference, selection, return_options)
+        if update:
+            self.mail_folders = self.mail_folder_class.get_folders(raw_folders)
+            self.separator = self.mail_folder_class.get_separator()
+            return self.mail_folders
+        return MailFolder().get_folders(raw_folders)
+
+    def _list(
+        self,
+        pattern: str = "*",
+        reference: str = "",
+        selection: Optional[List[str]] = None,
+        return_options: Optional[List[str]] = None,
+    ) -> Tuple[str, List[Any]]:
+        """Sends LIST command (RFC 3501, RFC 5258) and returns its response"""
+        reference_arg = self._mailbox_arg(reference)
+        pattern_arg = self._mailbox_arg(pattern)
+        if not selection and not return_options:
+            return self.imap.list(reference_arg, pattern_arg)
+        if not self.has_capability("LIST-EXTENDED"):
+            if not return_options and [o.upper() for o in selection or []] == [
+                "SUBSCRIBED"
+            ]:
+                return self.imap.lsub(reference_arg, pattern_arg)
+            raise ExtensionNotSupported(
+                "LIST selection and return options require LIST-EXTENDED"
+            )
+        args = []
+        if selection:
+            args.append("(" + " ".join(selection) + ")")
+        args += [reference_arg, pattern_arg]
+        if return_options:
+            args += ["RETURN", "(" + " ".join(return_options) + ")"]
+        typ, data = self.imap._simple_command("LIST", *args)
+        return self.imap._untagged_response(typ, data, "LIST")
+
+    @is_logged
+    def folder(self, folder_name: str = "", readonly: bool = False) -> "IMAP":
         """Sets folder for folder-related operations. If folder_name is omitted
-        then operations will be carried on topmost folder level."""
+        then operations will be carried on topmost folder level.
+        Folder is opened in read-only mode (EXAMINE) if readonly is True."""
         if folder_name:
             if folder_name not in self.mail_folders:
                 raise NonexistentFolderError(
                     f"The folder you are trying to select ({folder_name}) doesn't exist. Hint: try getting list of available folders via `em.folders()`"
                 )
-            if self.selected_folder:
-                self.imap.close()
             self.selected_folder = folder_name
             self.selected_folder_utf7 = utils.str_to_utf7(self.selected_folder)
+            if self._is_selected(folder_name, readonly):
+                # folder is already selected in requested mode
+                return self
+            if self._expunge_pending:
+                self.imap.close()
             if self.selected_folder_utf7 is not None:
-                self.imap.select('"' + self.selected_folder_utf7.decode() + '"')
-            self._save_folder_capabilities(self.selected_folder)
+                mailbox = '"' + self.selected_folder_utf7.decode() + '"'
+                if readonly:
+                    self.imap.select(mailbox, readonly=True)
+                else:
+                    self.imap.select(mailbox)
+            self._selected_mailbox = folder_name
+            self._expunge_pending = False
+            self._search_generation += 1
         else:
-            if self.selected_folder:
-                self.imap.close()
+            self._unselect()
             self.selected_folder = self.selected_folder_utf7 = None
         return self
 
-    def _save_folder_capabilities(self, folder_name: str) -> None:
-        """Saves folder capabilities in class variable if not present"""
+    def examine(self, folder_name: str) -> "IMAP":
+        """Alias for folder() function opening folder in read-only mode"""
+        return self.folder(folder_name, readonly=True)
+
+    def _is_selected(self, folder_name: str, readonly: bool = False) -> bool:
+        """Returns True if folder is currently selected on server in
+        requested mode"""
+        return (
+            self.imap.state == "SELECTED"
+            and self._selected_mailbox == folder_name
+            and self.imap.is_readonly == readonly
+        )
 
-        if folder_name not in self.folder_capabilities:
-            _response, result = self.imap.capability()
-            self.folder_capabilities[folder_name] = result[0].upper().split()
+    def _unselect(self) -> None:
+        """Returns to authenticated state. Selected folder is expunged only
+        if messages were marked as deleted in it; otherwise UNSELECT
+        (RFC 3691) is used when server supports it."""
+        if self.imap.state == "SELECTED":
+            if not self._expunge_pending and self.has_capability("UNSELECT"):
+                self.imap.unselect()
+            else:
+                self.imap.close()
+            self._search_generation += 1
+        self._selected_mailbox = None
+        self._expunge_pending = False
+
+    def refresh_capabilities(self) -> List[str]:
+        """Updates capabilities of the current session. Capabilities sent by
+        server in a response code (e.g. as a part of LOGIN response) are used
+        when present, otherwise CAPABILITY command is sent."""
+        _typ, data = self.imap.response("CAPABILITY")
+        if not data or data[-1] is None:
+            _typ, data = self.imap.capability()
+        self.capabilities = utils.b_to_str(data[-1]).upper().split()
+        # keep imaplib checks (e.g. for ENABLE) in sync
+        self.imap.capabilities = tuple(self.capabilities)
+        return self.capabilities
+
+    @is_logged
+    def enable(self, *capabilities: str) -> "IMAP":
+        """Enables server extensions (RFC 5161) and refreshes capabilities"""
+        self.imap.enable(" ".join(capabilities))
+        self.imap.untagged_responses.pop("CAPABILITY", None)
+        self.refresh_capabilities()
+        return self
 
     def _update_folder_info(self) -> None:
         """Updates internal information about email folder structure"""
@@ -239,6 +448,11 @@ class IMAP:
         try:
             self.imap.debug = self.debug_level
 
+            if self.starttls:
+                self.imap.starttls()
+
+            # drop capabilities left from connection greeting
+            self.imap.untagged_responses.pop("CAPABILITY", None)
             if self.auth_mechanism:
                 if self.auth_object is None:
                     raise ValueError(
@@ -256,43 +470,138 @@ class IMAP:
             raise ConnectionRefused(str(e))
 
         self.logged_in = True
-        self.capabilities = list(self.imap.capabilities)
+        # capabilities may change after authentication
+        self.refresh_capabilities()
         self._update_folder_info()
         return self
 
-    @is_logged
-    def append(self, message: MIMEBase, **kwargs) -> "IMAP":
-        """Append message to the end of mailbox folder."""
+    def _append_flags(self, flags: Optional[List[EmailFlag]]) -> str:
+        """Returns flags string for APPEND command"""
         # create flags string '(\Seen \Flagged)'
-        flags: Optional[List[EmailFlag]] = kwargs.pop("flags", None)
         if flags:
             good_flags = list(set(flags) & set(self.standard_rw_flags))
             if good_flags:
-                flags_str = "(\\" + " \\".join(f.name for f in good_flags) + ")"
-            else:
-                flags_str = ""
-        else:
-            flags_str = ""
+                return "(\\" + " \\".join(f.name for f in good_flags) + ")"
+        return ""
+
+    def _append_options(
+        self, flags: Optional[List[EmailFlag]], date_time: Optional[str]
+    ) -> List[Union[bytes, Literal]]:
+        """Returns flags and date-time arguments of APPEND command"""
+        options: List[Union[bytes, Literal]] = []
+        flags_str = self._append_flags(flags)
+        if flags_str:
+            options.append(flags_str.encode())
+        if date_time:
+            options.append(imaplib.Time2Internaldate(date_time).encode())
+        return options
 
+    @is_logged
+    def append(self, message: Any, **kwargs) -> "IMAP":
+        """Append message to the end of mailbox folder.
+        Message can be a MIMEBase object, bytes-like object, binary file
+        object or path to a file. Data from files is streamed to the server
+        in chunks (memory-mapped if `use_mmap` is True) so that appending
+        large messages uses constant memory.
+        """
+        flags: Optional[List[EmailFlag]] = kwargs.pop("flags", None)
         date_time: Optional[str] = kwargs.pop("date_time", None)
+        use_mmap: bool = kwargs.pop("use_mmap", False)
 
         # detect message type
         if isinstance(message, MIMEBase):
-            msg = message.as_string()
-        else:
-            raise UnknownEmailMessageType(
-                "Message should be a subclass of email.mime.base.MIMEBase"
+            self.imap.append(
+                '"' + utils.b_to_str(self.selected_folder_utf7) + '"',
+                self._append_flags(flags),
+                date_time or "",
+                message.as_string(),
             )
+            return self
 
-        self.imap.append(
-            '"' + utils.b_to_str(self.selected_folder_utf7) + '"',
-            flags_str,
-            date_time or "",
-            msg,
+        literal = Literal.from_message(message, use_mmap=use_mmap)
+        mailbox = b'"' + (self.selected_folder_utf7 or b"") + b'"'
+        tag = self._send_literal_command(
+            "APPEND", [mailbox] + self._append_options(flags, date_time) + [literal]
         )
-
+        typ, data = self.imap._command_complete("APPEND", tag)
+        if typ != "OK":
+            raise AppendFailed(f"Server refused to append message: {typ} {data}")
         return self
 
+    @is_logged
+    def append_many(self, messages: Iterable[Any], **kwargs) -> List[str]:
+        """Append a number of messages to the end of mailbox folder.
+        Messages can be of any type accepted by append().
+        Uses MULTIAPPEND (RFC 3502) to upload up to `batch_size` messages per
+        command and non-synchronizing literals (LITERAL+) when available.
+        Returns UIDs of appended messages if server supports UIDPLUS.
+        """
+        options = self._append_options(
+            kwargs.pop("flags", None), kwargs.pop("date_time", None)
+        )
+        batch_size: int = kwargs.pop("batch_size", 50)
+        use_mmap: bool = kwargs.pop("use_mmap", False)
+        mailbox = b'"' + (self.selected_folder_utf7 or b"") + b'"'
+        multiappend = self.has_capability("MULTIAPPEND")
+
+        self.imap.untagged_responses.pop("APPENDUID", None)
+        tags = []
+        parts: List[Union[bytes, Literal]] = [mailbox]
+        count = 0
+        for message in messages:
+            parts += options + [Literal.from_message(message, use_mmap=use_mmap)]
+            count += 1
+            if not multiappend or count >= batch_size:
+                tags.append(self._send_literal_command("APPEND", parts))
+                parts, count = [mailbox], 0
+        if count:
+            tags.append(self._send_literal_command("APPEND", parts))
+
+        # commands are pipelined, collect their completion responses
+        for tag in tags:
+            typ, data = self.imap._command_complete("APPEND", tag)
+            if typ != "OK":
+                raise AppendFailed(f"Server refused to append message(s): {typ} {data}")
+
+        uids = []
+        for val in self.imap.untagged_responses.pop("APPENDUID", []):
+            parts_str = utils.b_to_str(val).split()
+            if len(parts_str) == 2:
+                uids += [str(u) for u in utils.expand_sequence_set(parts_str[1])]
+        return uids
+
+    def _non_synchronizing(self, size: int) -> bool:
+        """Returns True if literal of given size can be sent without waiting
+        for server continuation request (RFC 7888)
+        """
+        return self.has_capability("LITERAL+") or (
+            self.has_capability("LITERAL-") and size <= 4096
+        )
+
+    def _send_literal_command(
+        self, name: str, parts: List[Union[bytes, Literal]]
+    ) -> bytes:
+        """Sends command consisting of atoms and literals and returns its tag
+        without waiting for the command to complete.
+        """
+        tag = self.imap._new_tag()
+        line = tag + b" " + name.encode()
+        for part in parts:
+            if isinstance(part, Literal):
+                non_sync = self._non_synchronizing(part.size)
+                self.imap.send(line + b" " + part.header(non_sync) + CRLF)
+                if not non_sync:
+                    # wait for continuation request
+                    while self.imap._get_response():
+                        if self.imap.tagged_commands[tag]:
+                            return tag
+                part.write(self.imap.send)
+                line = b""
+            else:
+                line += b" " + part
+        self.imap.send(line + CRLF)
+        return tag
+
     def email(self, sequence_number: int) -> Optional[EmailMessage]:
         """Helper function for self.emails(). Returns email by its
         sequence number
@@ -320,28 +629,25 @@ class IMAP:
             return self._get_emails_by_sequence(args[0], args[1], ids_only=ids_only)
         elif len(args) == 1:
             if isinstance(args[0], Q):
-                query = args[0]
-                if self.selected_folder:
-                    query.capabilities = self.folder_capabilities.get(
-                        self.selected_folder, []
-                    )
-                use_query = query.get_query()
-
-                # call search
-                if self.imap:
-                    if query.non_ascii_params:
-                        # search using charset
-                        old_literal = self.imap.literal
-                        self.imap.literal = utils.str_to_b(query.non_ascii_params[0])
-                        _, data = self.imap.uid("SEARCH", *use_query)
-                        self.imap.literal = old_literal
-                    else:
-                        _, data = self.imap.uid("SEARCH", *use_query)
-
-                    if data and data[0]:
-                        uids = utils.b_to_str(data[0]).split()
+                sort = kwargs.get("sort")
+                limit: Optional[int] = kwargs.get("limit")
+                offset: int = kwargs.get("offset", 0)
+                if sort:
+                    uid_list = self._sorted_uids(args[0], sort)
+                elif limit is not None or offset:
+                    uid_list = list(self.search(args[0], ["ALL"]).uids or [])
+                else:
+                    uids = self.search(args[0], ["ALL"]).uids
+                    if uids:
                         return self._fetch_emails_info(uids)
-                return []
+                    return []
+                end = None if limit is None else offset + limit
+                return self._fetch_emails_in_order(uid_list[offset:end])
+            elif isinstance(args[0], SavedSearch):
+                self._select_operating_folder(args[0].folder)
+                emails = self._fetch_emails_info(args[0]) if args[0] else []
+                self._restore_operating_folder()
+                return emails
             elif isinstance(args[0], int):
                 return self._get_emails_by_sequence(args[0], ids_only=ids_only)
             else:
@@ -354,6 +660,283 @@ class IMAP:
             # no parameters - fetch all emails in folder
             return self._get_emails_by_sequence(ids_only=ids_only)
 
+    @is_logged
+    def search(
+        self, query: Q, result: Iterable[str] = ("MIN", "MAX", "COUNT", "ALL")
+    ) -> SearchResult:
+        """Searches for emails in selected folder and returns requested
+        result values (any of MIN, MAX, COUNT and ALL). When server supports
+        ESEARCH (RFC 4731) only requested values are sent by server and
+        matching UIDs are returned as a compact sequence set.
+        """
+        result = [r.upper() for r in result]
+        if not self.has_capability("ESEARCH"):
+            data = self._uid_search(query)
+            uids = UIDSet(data[0].split()) if data and data[0] else UIDSet()
+            return SearchResult.from_uids(uids, result)
+
+        return self._esearch(query, result)
+
+    @is_logged
+    def save_search(self, query: Q) -> SavedSearch:
+        """Searches for emails in selected folder and keeps the result for
+        mark_many(), copy_many(), move_many(), delete_many() and emails().
+        With SEARCHRES (RFC 5182) the result stays on server and is referred
+        to as "$"; otherwise matching UIDs are kept locally.
+        """
+        saved = SavedSearch(folder=self.selected_folder or "", query=query)
+        self._save_search(saved)
+        return saved
+
+    def _save_search(self, saved: SavedSearch) -> None:
+        """Saves search result on server or fetches matching UIDs"""
+        if self.has_capability("SEARCHRES"):
+            saved.count = self._esearch(saved.query, ["SAVE", "COUNT"]).count or 0
+            self._search_generation += 1
+            saved.generation = self._search_generation
+        else:
+            saved.uids = self.search(saved.query, ["ALL"]).uids or UIDSet()
+            saved.count = len(saved.uids)
+
+    def _sequence_set(self, uids: Union[UIDSet, SavedSearch]) -> str:
+        """Returns UIDs as sequence set for use in commands. Search saved on
+        server is repeated if its result ($) was reset in the meantime."""
+        if isinstance(uids, SavedSearch) and uids.uids is None:
+            if uids.generation != self._search_generation:
+                self._save_search(uids)
+            return "$"
+        return str(uids)
+
+    def _esearch(self, query: Q, result: List[str]) -> SearchResult:
+        """Sends UID SEARCH RETURN (...) command and returns parsed
+        ESEARCH response"""
+        self.imap.untagged_responses.pop("ESEARCH", None)
+        self._uid_search(query, "RETURN", "(" + " ".join(result) + ")")
+        responses = self.imap.untagged_responses.pop("ESEARCH", [])
+        search_result = SearchResult()
+        if responses and isinstance(responses[-1], bytes):
+            search_result = SearchResult.from_esearch(responses[-1])
+        # values are omitted by server when nothing was found
+        if "COUNT" in result and search_result.count is None:
+            search_result.count = 0
+        if "ALL" in result and search_result.uids is None:
+            search_result.uids = UIDSet()
+        if search_result.partial is None and any(
+            r.startswith("PARTIAL") for r in result
+        ):
+            search_result.partial = UIDSet()
+        return search_result
+
+    @is_logged
+    def search_page(
+        self,
+        query: Q,
+        page_size: int = 50,
+        cursor: int = 0,
+        reverse: bool = False,
+        fetch: bool = True,
+    ) -> SearchPage:
+        """Returns page of emails matching query which starts at cursor
+        position (0 for the first page, counted from the newest email if
+        reverse is True). Server sends only UIDs on the page when it supports
+        PARTIAL (RFC 9394) or CONTEXT=SEARCH (RFC 5267) search results; the
+        latter takes an extra COUNT search for reverse pages since it has no
+        ranges counted from the end.
+        """
+        if page_size < 1 or cursor < 0:
+            raise InvalidSearchQuery(
+                "Page size should be positive and cursor cannot be negative."
+            )
+        if self.has_capability("PARTIAL") or (
+            self.has_capability("CONTEXT=SEARCH") and not reverse
+        ):
+            first, last = cursor + 1, cursor + page_size
+            partial = f"-{first}:-{last}" if reverse else f"{first}:{last}"
+            result = self._esearch(query, ["COUNT", f"PARTIAL {partial}"])
+            uids = result.partial or UIDSet()
+            total = result.count or 0
+        elif self.has_capability("CONTEXT=SEARCH"):
+            # RFC 5267 ranges are positive only: count matching emails
+            # first to find the page counted from the oldest email
+            total = self._esearch(query, ["COUNT"]).count or 0
+            first, last = max(total - cursor - page_size, 0) + 1, total - cursor
+            uids = UIDSet()
+            if first <= last:
+                partial = f"PARTIAL {first}:{last}"
+                uids = self._esearch(query, [partial]).partial or UIDSet()
+        else:
+            all_uids = self.search(query, ["ALL"]).uids or UIDSet()
+            total = len(all_uids)
+            if reverse:
+                uids = all_uids.slice(
+                    max(total - cursor - page_size, 0), total - cursor
+                )
+            else:
+                uids = all_uids.slice(cursor, cursor + page_size)
+        uid_list = list(reversed(list(uids)) if reverse else uids)
+        next_cursor = cursor + page_size
+        return SearchPage(
+            uids=uid_list,
+            total=total,
+            cursor=next_cursor if next_cursor < total else None,
+            emails=self._fetch_emails_in_order(uid_list) if fetch else [],
+        )
+
+    @is_logged
+    def search_all(
+        self,
+        query: Q,
+        folders: Optional[Iterable[str]] = None,
+        pool: Optional[ConnectionPool] = None,
+        pool_size: int = 4,
+    ) -> Iterator[Tuple[str, int]]:
+        """Searches for emails in several folders (all selectable folders by
+        default) and yields (folder, uid) pairs as results arrive. A single
+        ESEARCH command is sent when server supports MULTISEARCH (RFC 7377),
+        otherwise folders are searched in parallel using passed connection
+        pool or a temporary pool of up to pool_size connections.
+        """
+        if folders is None:
+            folder_list = self._selectable_folders(self.folders())
+        else:
+            folder_list = [utils.u(f) for f in folders]
+        for folder_name in folder_list:
+            if folder_name not in self.mail_folders:
+                raise NonexistentFolderError(
+                    f"The folder you are trying to search ({folder_name}) doesn't exist."
+                )
+        if not folder_list:
+            return iter(())
+        if self.has_capability("MULTISEARCH"):
+            return self._multisearch(query, folder_list)
+        return self._fan_out_search(query, folder_list, pool, pool_size)
+
+    def _multisearch(self, query: Q, folders: List[str]) -> Iterator[Tuple[str, int]]:
+        """Sends ESEARCH IN (mailboxes ...) command and yields matches
+        from untagged responses as soon as they are received"""
+        query.capabilities = self.capabilities
+        use_query = query.get_query()
+        # one-or-more-mailbox of RFC 5465: "(" mailbox *(SP mailbox) ")"
+        mailboxes = " ".join(self._mailbox_arg(f) for f in folders)
+        self.imap.untagged_responses.pop("ESEARCH", None)
+        if query.non_ascii_params:
+            # sent after the command and reset by imaplib
+            self.imap.literal = utils.str_to_b(query.non_ascii_params[0])
+        tag = self.imap._command(
+            "ESEARCH", "IN", f"(mailboxes ({mailboxes}))", "RETURN", "(ALL)", *use_query
+        )
+        try:
+            while self.imap.tagged_commands.get(tag) is None:
+                self.imap._get_response()
+                yield from self._pop_multisearch_results()
+        except GeneratorExit:
+            # iteration stopped early, skip the rest of server responses
+            self.imap._command_complete("ESEARCH", tag)
+            self.imap.untagged_responses.pop("ESEARCH", None)
+            raise
+        self.imap._command_complete("ESEARCH", tag)
+        yield from self._pop_multisearch_results()
+
+    def _pop_multisearch_results(self) -> Iterator[Tuple[str, int]]:
+        """Yields (folder, uid) pairs from received ESEARCH responses"""
+        for response in self.imap.untagged_responses.pop("ESEARCH", []):
+            if not isinstance(response, bytes):
+                continue
+            result = SearchResult.from_esearch(response)
+            if result.mailbox is None or not result.uids:
+                continue
+            folder_name = utils.utf7_to_unicode(result.mailbox.encode())
+            for uid in result.uids:
+                yield folder_name, uid
+
+    def _fan_out_search(
+        self,
+        query: Q,
+        folders: List[str],
+        pool: Optional[ConnectionPool],
+        pool_size: int,
+    ) -> Iterator[Tuple[str, int]]:
+        """Searches folders in parallel and yields matches of every folder
+        as soon as it is searched"""
+        # prepare query once, before it is shared between threads
+        query.capabilities = self.capabilities
+        query.get_query()
+        own_pool = pool is None
+        if pool is None:
+            pool = ConnectionPool.from_connection(self, min(pool_size, len(folders)))
+        executor = ThreadPoolExecutor(max_workers=pool.size)
+        try:
+            futures = [
+                executor.submit(self._search_folder, pool, query, f) for f in folders
+            ]
+            for future in as_completed(futures):
+                folder_name, uids = future.result()
+                for uid in uids:
+                    yield folder_name, uid
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if own_pool:
+                pool.close()
+
+    @staticmethod
+    def _search_folder(
+        pool: ConnectionPool, query: Q, folder_name: str
+    ) -> Tuple[str, UIDSet]:
+        """Searches single folder using connection from the pool"""
+        with pool.connection() as connection:
+            connection.examine(folder_name)
+            return folder_name, connection.search(query, ["ALL"]).uids or UIDSet()
+
+    def _uid_search(
+        self, query: Q, *options: str, command: str = "SEARCH"
+    ) -> List[Any]:
+        """Sends UID SEARCH (or SORT) command and returns its response data"""
+        query.capabilities = self.capabilities
+        use_query = query.get_query()
+        if command == "SORT":
+            # charset is a mandatory argument of SORT command
+            if use_query[:1] == ["CHARSET"]:
+                use_query = use_query[2:]
+            charset = "UTF-8" if query.non_ascii_params else "US-ASCII"
+            options += (charset,)
+        if query.non_ascii_params:
+            # search using charset
+            old_literal = self.imap.literal
+            self.imap.literal = utils.str_to_b(query.non_ascii_params[0])
+            _, data = self.imap.uid(command, *options, *use_query)
+            self.imap.literal = old_literal
+        else:
+            _, data = self.imap.uid(command, *options, *use_query)
+        return data
+
+    def _sorted_uids(self, query: Q, sort: Union[str, List[str]]) -> List[int]:
+        """Returns UIDs of emails matching query sorted by sort criteria
+        (RFC 5256). Emails are sorted by server when it supports SORT,
+        otherwise their internal dates, sizes and (if needed) headers are
+        fetched and sorted locally.
+        """
+        criteria = sorting.parse_sort_criteria(sort)
+        if self.has_capability("SORT"):
+            sort_keys = " ".join(
+                ("REVERSE " if reverse else "") + c for c, reverse in criteria
+            )
+            data = self._uid_search(query, f"({sort_keys})", command="SORT")
+            return [int(uid) for uid in data[0].split()] if data and data[0] else []
+
+        uids = self.search(query, ["ALL"]).uids
+        if not uids:
+            return []
+        _, data = self.imap.uid("FETCH", str(uids), sorting.fetch_items(criteria))
+        return sorting.sort_uids(sorting.parse_metadata(data or []), criteria)
+
+    def _fetch_emails_in_order(self, uids: List[int]) -> List[Union[EmailMessage, str]]:
+        """Fetches emails and returns them in the order of passed UIDs"""
+        if not uids:
+            return []
+        position = {str(uid): i for i, uid in enumerate(uids)}
+        emails = self._fetch_emails_info(UIDSet(uids))
+        return sorted(emails, key=lambda e: position.get(e.uid, len(position)))
+
     def _get_emails_by_sequence(
         self,
         from_id: Optional[int] = None,
@@ -397,56 +980,200 @@ class IMAP:
         return []
 
     @is_logged
-    def _fetch_emails_info(self, email_uids: List[str]) -> List[EmailMessage]:
+    def _fetch_emails_info(
+        self, email_uids: Union[List[str], UIDSet, SavedSearch]
+    ) -> List[EmailMessage]:
         """Fetches email info from server and returns as parsed email
         objects
         """
-        emails = []
         # fetch email without changing 'Seen' state
         if self.imap and len(email_uids) > 0:
-            uids = ",".join(email_uids)
+            if isinstance(email_uids, (UIDSet, SavedSearch)):
+                uids = self._sequence_set(email_uids)
+            else:
+                uids = ",".join(email_uids)
             _result, data = self.imap.uid("FETCH", uids, "(FLAGS BODY.PEEK[])")
             if data:
-                total = len(data)
-                for i, inputs in enumerate(data):
-                    if isinstance(inputs, tuple):
-                        email_id, raw_email = inputs
-                        # Check for email flags/uid added after email contents
-                        if (i + 1) < total and isinstance(data[i + 1], bytes):
-                            email_id += b" " + data[i + 1]
-                        email_id_str = utils.b_to_str(email_id)
-                        raw_email_str = utils.b_to_str(raw_email)
-                        # get UID
-                        uid_match = re.match(r".*UID (?P<uid>[0-9]+)", email_id_str)
-                        uid = uid_match.group("uid") if uid_match else ""
-                        # get FLAGS
-                        flags = []
-                        flags_match = re.match(
-                            r".*FLAGS \((?P<flags>.*?)\)", email_id_str
-                        )
-                        # cleanup standard tags
-                        if flags_match:
-                            for f in flags_match.group("flags").split():
-                                flag_name = f.upper().lstrip("\\")
-                                if flag_name in EmailFlag.__members__:
-                                    flags.append(EmailFlag[flag_name])
-                                else:
-                                    flags.append(f)
-                        email_obj = email.message_from_string(raw_email_str)
-                        email_parsed = self.msg_class(
-                            folder=self.selected_folder or "",
-                            uid=uid,
-                            flags=flags,
-                            email_obj=email_obj,
-                            imap_obj=self,
-                        )
-                        emails.append(email_parsed)
+                return self._parse_fetched_emails(data)
+        return []
 
+    def _parse_fetched_emails(self, data: List[Any]) -> List[EmailMessage]:
+        """Returns email objects parsed from FETCH response"""
+        emails = []
+        total = len(data)
+        for i, inputs in enumerate(data):
+            if isinstance(inputs, tuple):
+                email_id, raw_email = inputs
+                # Check for email flags/uid added after email contents
+                if (i + 1) < total and isinstance(data[i + 1], bytes):
+                    email_id += b" " + data[i + 1]
+                emails.append(self._make_email(email_id, raw_email))
         return emails
 
+    def _make_email(self, email_id: bytes, raw_email: bytes) -> EmailMessage:
+        """Creates email object from message data and FETCH items
+        (UID and FLAGS) sent with it"""
+        uid, flags = self._fetched_items(email_id)
+        folder_name = self.selected_folder or ""
+        size = len(raw_email)
+        with parse_phase(self.observers, "mime", folder_name, uid, size):
+            email_obj = email.message_from_string(utils.b_to_str(raw_email))
+        return self._new_email(uid, flags, email_obj, size)
+
+    def _fetched_items(
+        self, email_id: bytes
+    ) -> Tuple[str, List[Union[EmailFlag, str]]]:
+        """Returns UID and flags sent with message data"""
+        email_id_str = utils.b_to_str(email_id)
+        # get UID
+        uid_match = re.match(r".*UID (?P<uid>[0-9]+)", email_id_str)
+        uid = uid_match.group("uid") if uid_match else ""
+        # get FLAGS
+        flags: List[Union[EmailFlag, str]] = []
+        flags_match = re.match(r".*FLAGS \((?P<flags>.*?)\)", email_id_str)
+        # cleanup standard tags
+        if flags_match:
+            for f in flags_match.group("flags").split():
+                flag_name = f.upper().lstrip("\\")
+                if flag_name in EmailFlag.__members__:
+                    flags.append(EmailFlag[flag_name])
+                else:
+                    flags.append(f)
+        return uid, flags
+
+    def _new_email(
+        self,
+        uid: str,
+        flags: List[Union[EmailFlag, str]],
+        email_obj: Message,
+        size: int,
+    ) -> EmailMessage:
+        """Creates email object of msg_class from parsed message"""
+        folder_name = self.selected_folder or ""
+        with parse_phase(self.observers, "message", folder_name, uid, size):
+            return self.msg_class(
+                folder=folder_name,
+                uid=uid,
+                flags=flags,
+                email_obj=email_obj,
+                imap_obj=self,
+            )
+
     @is_logged
-    def mark(self, tags: Union[EmailFlag, List[EmailFlag]], uid: str) -> None:
-        """Adds or removes standard IMAP flags to message identified by UID"""
+    def iter_emails(
+        self,
+        uids: Union[Q, UIDSet, SavedSearch, Iterable[Union[str, int]]],
+        byte_budget: Optional[int] = None,
+        large_message_size: Optional[int] = None,
+    ) -> Iterator[EmailMessage]:
+        """Yields emails matching query (or with passed UIDs) in UID order.
+        Message sizes are fetched first and messages are requested in batches
+        of at most byte_budget bytes. Messages bigger than large_message_size
+        (byte budget by default) are fetched alone in byte_budget sized parts.
+        Without byte_budget batch size is adapted to server latency and
+        throughput by fetch_batch_size controller.
+        """
+        if isinstance(uids, Q):
+            uids = self.search(uids, ["ALL"]).uids or UIDSet()
+        elif not isinstance(uids, (UIDSet, SavedSearch)):
+            uids = UIDSet(uids)
+        if not uids:
+            return iter(())
+        controller = (
+            self.fetch_batch_size
+            if byte_budget is None
+            else scheduler.AdaptiveBatchSize.fixed(byte_budget)
+        )
+        _, data = self.imap.uid("FETCH", self._sequence_set(uids), "(RFC822.SIZE)")
+        batches = scheduler.iter_batches(
+            scheduler.parse_sizes(data or []), controller, large_message_size
+        )
+        return self._fetch_batches(batches, controller)
+
+    def _fetch_batches(
+        self,
+        batches: Iterator[scheduler.FetchBatch],
+        controller: scheduler.AdaptiveBatchSize,
+    ) -> Iterator[EmailMessage]:
+        """Fetches batches one by one reporting their timing to controller"""
+        for batch in batches:
+            if batch.large:
+                message = self._fetch_large_email(batch.uids[0], controller)
+                if message is not None:
+                    yield message
+            else:
+                data = self._timed_fetch(
+                    str(batch.uid_set), "(FLAGS BODY.PEEK[])", controller
+                )
+                yield from self._parse_fetched_emails(data)
+
+    def _timed_fetch(
+        self, uids: str, items: str, controller: scheduler.AdaptiveBatchSize
+    ) -> List[Any]:
+        """Sends UID FETCH command measuring time to the first response
+        line and to the command completion"""
+        start = time.monotonic()
+        tag = self.imap._command("UID", "FETCH", uids, items)
+        typ, data = self.imap._command_complete("UID", tag)
+        elapsed = time.monotonic() - start
+        first_response = self.transport.first_response
+        ttfb = elapsed if first_response is None else first_response - start
+        _, data = self.imap._untagged_response(typ, data, "FETCH")
+        data = [d for d in data or [] if d is not None]
+        size = sum(len(d[1]) for d in data if isinstance(d, tuple))
+        controller.update(size, elapsed, ttfb)
+        return data
+
+    def _fetch_large_email(
+        self, uid: int, controller: scheduler.AdaptiveBatchSize
+    ) -> Optional[EmailMessage]:
+        """Fetches large message in parts of byte budget size using partial
+        FETCH (BODY.PEEK[]<offset.size>) until the server sends a short or
+        empty part, so a wrong RFC822.SIZE does not truncate the message.
+        Parts are fed to the parser as they arrive, so the whole raw message
+        is never kept in memory."""
+        email_id = None
+        decoder = codecs.getincrementaldecoder("utf-8")("ignore")
+        parser = FeedParser()
+        offset = 0
+        while True:
+            chunk_size = controller.size
+            items = f"BODY.PEEK[]<{offset}.{chunk_size}>"
+            if email_id is None:
+                items = "FLAGS " + items
+            data = self._timed_fetch(str(uid), f"({items})", controller)
+            literals = [d for d in data if isinstance(d, tuple)]
+            if not literals:
+                break
+            chunk = literals[0][1]
+            if email_id is None:
+                email_id = literals[0][0]
+                position = data.index(literals[0])
+                # flags and UID sent after the literal
+                if position + 1 < len(data) and isinstance(data[position + 1], bytes):
+                    email_id += b" " + data[position + 1]
+            parser.feed(decoder.decode(chunk))
+            received = len(chunk)
+            offset += received
+            del data, literals, chunk
+            if received < chunk_size:
+                # server sent less than requested: end of message
+                break
+        if email_id is None:
+            # message was expunged in the meantime
+            return None
+        uid_str, flags = self._fetched_items(email_id)
+        folder_name = self.selected_folder or ""
+        # parts were parsed while being received, closing completes parsing
+        with parse_phase(self.observers, "mime", folder_name, uid_str, offset):
+            parser.feed(decoder.decode(b"", final=True))
+            email_obj = parser.close()
+        return self._new_email(uid_str, flags, email_obj, offset)
+
+    def _split_flags(
+        self, tags: Union[EmailFlag, List[EmailFlag]]
+    ) -> Tuple[List[EmailFlag], List[EmailFlag]]:
+        """Splits flags into lists of flags to be added and removed"""
         add_tags = []
         remove_tags = []
         if not isinstance(tags, list):
@@ -474,17 +1201,167 @@ class IMAP:
                         f"message is not supported. Please use one "
                         f"of the following: {allowed}"
                     )
+        return add_tags, remove_tags
+
+    @is_logged
+    def mark(self, tags: Union[EmailFlag, List[EmailFlag]], uid: str) -> None:
+        """Adds or removes standard IMAP flags to message identified by UID"""
+        add_tags, remove_tags = self._split_flags(tags)
 
         # add tags
         if add_tags and self.imap:
             tag_list = " ".join(f"\\{t.name}" for t in add_tags)
             self.imap.uid("STORE", uid, "+FLAGS", f"({tag_list})")
+            self._expunge_pending |= EmailFlag.DELETED in add_tags
         # remove tags
         if remove_tags and self.imap:
             tag_list = " ".join(f"\\{t.name}" for t in remove_tags)
             self.imap.uid("STORE", uid, "-FLAGS", f"({tag_list})")
         self._restore_operating_folder()
 
+    @is_logged
+    def mark_many(
+        self,
+        uids_or_messages: UIDsOrMessages,
+        tags: Union[EmailFlag, List[EmailFlag]],
+    ) -> "IMAP":
+        """Adds or removes standard IMAP flags to a number of messages using
+        a single silent UID STORE command per folder and operation.
+        Flags of passed message objects are updated as well.
+        """
+        if not isinstance(tags, list):
+            tags = [tags]
+        add_tags, remove_tags = self._split_flags(tags)
+        for folder, (uid_set, messages) in self._group_uids(uids_or_messages).items():
+            if not uid_set:
+                continue
+            self._select_operating_folder(folder)
+            if add_tags:
+                tag_list = " ".join(f"\\{t.name}" for t in add_tags)
+                self.imap.uid(
+                    "STORE",
+                    self._sequence_set(uid_set),
+                    "+FLAGS.SILENT",
+                    f"({tag_list})",
+                )
+                self._expunge_pending |= EmailFlag.DELETED in add_tags
+            if remove_tags:
+                tag_list = " ".join(f"\\{t.name}" for t in remove_tags)
+                self.imap.uid(
+                    "STORE",
+                    self._sequence_set(uid_set),
+                    "-FLAGS.SILENT",
+                    f"({tag_list})",
+                )
+            for msg in messages:
+                msg._update_flags(tags)
+        self._restore_operating_folder()
+        return self
+
+    def _group_uids(
+        self, uids_or_messages: UIDsOrMessages
+    ) -> Dict[str, Tuple[Union[UIDSet, SavedSearch], List[EmailMessage]]]:
+        """Groups UIDs by the folder they belong to. Plain UIDs are
+        considered to belong to the currently selected folder.
+        """
+        if isinstance(uids_or_messages, SavedSearch):
+            return {uids_or_messages.folder: (uids_or_messages, [])}
+        if isinstance(uids_or_messages, (str, int, EmailMessage)):
+            uids_or_messages = [uids_or_messages]
+        uids: Dict[str, List[Union[str, int]]] = {}
+        messages: Dict[str, List[EmailMessage]] = {}
+        for item in uids_or_messages:
+            if isinstance(item, EmailMessage):
+                uids.setdefault(item.folder, []).append(item.uid)
+                messages.setdefault(item.folder, []).append(item)
+            else:
+                uids.setdefault(self.selected_folder or "", []).append(item)
+        return {f: (UIDSet(u), messages.get(f, [])) for f, u in uids.items()}
+
+    def _select_operating_folder(self, folder: str) -> None:
+        """Temporarily selects folder, remembering the one to return to"""
+        if folder and folder != self.selected_folder:
+            if self.operating_folder is None:
+                self.operating_folder = self.selected_folder
+            self.folder(folder)
+
+    def has_capability(self, capability: str) -> bool:
+        """Returns True if server advertises specified capability"""
+        return capability.upper() in self.capabilities
+
+    def _mailbox_arg(self, mailbox: str) -> str:
+        """Returns mailbox name encoded and quoted for use in commands"""
+        return '"' + utils.str_to_utf7(utils.u(mailbox)).decode() + '"'
+
+    def _pop_copyuid(self) -> Dict[int, int]:
+        """Returns mapping of source to destination UIDs collected from
+        COPYUID response codes (RFC 4315)
+        """
+        mapping: Dict[int, int] = {}
+        for val in self.imap.untagged_responses.pop("COPYUID", []):
+            parts = (
+                utils.b_to_str(val) if isinstance(val, bytes) else str(val)
+            ).split()
+            if len(parts) != 3:
+                continue
+            source = utils.expand_sequence_set(parts[1])
+            target = utils.expand_sequence_set(parts[2])
+            mapping.update(zip(source, target))
+        return mapping
+
+    def _transfer_many(
+        self, uids_or_messages: UIDsOrMessages, mailbox: str, move: bool
+    ) -> Dict[str, str]:
+        """Copies or moves sets of messages to mailbox, updating UIDs and
+        folders of the passed message objects
+        """
+        result: Dict[str, str] = {}
+        target = self._mailbox_arg(mailbox)
+        for folder, (uid_set, messages) in self._group_uids(uids_or_messages).items():
+            if not uid_set:
+                continue
+            self._select_operating_folder(folder)
+            self.imap.untagged_responses.pop("COPYUID", None)
+            if move and self.has_capability("MOVE"):
+                self.imap.uid("MOVE", self._sequence_set(uid_set), target)
+            else:
+                self.imap.uid("COPY", self._sequence_set(uid_set), target)
+                if move:
+                    self._delete_uid_set(uid_set, expunge=True)
+            mapping = self._pop_copyuid()
+            for source_uid, target_uid in mapping.items():
+                result[str(source_uid)] = str(target_uid)
+            for msg in messages:
+                if int(msg.uid) in mapping:
+                    msg.uid = str(mapping[int(msg.uid)])
+                    msg.folder = mailbox
+        self._restore_operating_folder()
+        return result
+
+    @is_logged
+    def copy_many(
+        self, uids_or_messages: UIDsOrMessages, mailbox: str
+    ) -> Dict[str, str]:
+        """Copies a number of messages to mailbox using a single UID COPY
+        command per folder. Returns mapping of original UIDs to the UIDs of
+        the copies when the server reports them (UIDPLUS); passed message
+        objects are updated to point to the copies.
+        """
+        return self._transfer_many(uids_or_messages, mailbox, move=False)
+
+    @is_logged
+    def move_many(
+        self, uids_or_messages: UIDsOrMessages, mailbox: str
+    ) -> Dict[str, str]:
+        """Moves a number of messages to mailbox without leaving current
+        folder. Uses UID MOVE (RFC 6851) when available and falls back to
+        UID COPY + UID STORE (+ UID EXPUNGE if server supports UIDPLUS).
+        Without UIDPLUS moved messages are only flagged as deleted in the
+        source folder until it is closed.
+        Returns mapping of original UIDs to the new ones.
+        """
+        return self._transfer_many(uids_or_messages, mailbox, move=True)
+
     def _restore_operating_folder(self) -> None:
         """Selects operating folder"""
         if self.operating_folder:
@@ -495,18 +1372,18 @@ class IMAP:
         """Alias for make_folder() function"""
         return self.make_folder(folder_name)
 
-    @refresh_folders
     @is_logged
     def make_folder(self, folder_name: Union[str, List[str]]) -> "IMAP":
         """
-        Creates mailbox subfolder with a given name under currently
-        selected folder.
+        Creates mailbox subfolder (or list of subfolders) with a given name
+        under currently selected folder.
         """
         if isinstance(folder_name, str):
             names = [folder_name]
         else:
             names = folder_name
 
+        stale = False
         for n in names:
             if self.separator and self.separator in n:
                 raise InvalidFolderName(
@@ -515,10 +1392,18 @@ class IMAP:
             parent_path = ""
             if self.selected_folder:
                 parent_path = self.selected_folder + (self.separator or "")
-            name = utils.str_to_utf7('"' + utils.u(parent_path) + utils.u(n) + '"')
+            full_name = utils.u(parent_path) + utils.u(n)
+            name = utils.str_to_utf7('"' + full_name + '"')
             if self.imap and name is not None:
-                self.imap.create(name.decode())
+                status, _ = self.imap.create(name.decode())
+                if status == "OK":
+                    self._folders_changed(lambda f: f.add_folder(full_name))
+                else:
+                    stale = True
 
+        if stale:
+            # e.g. folder was created by another client in the meantime
+            self._update_folder_info()
         return self
 
     @is_logged
@@ -560,44 +1445,150 @@ class IMAP:
         if folder != self.selected_folder:
             self.folder(folder)
         self.imap.uid("STORE", uid, "+FLAGS", f"({EmailFlag.DELETED.name})")
+        self._expunge_pending = True
         self._restore_operating_folder()
 
+    def _delete_uid_set(
+        self, uid_set: Union[UIDSet, SavedSearch], expunge: bool
+    ) -> None:
+        """Flags set of messages in selected folder as deleted and expunges
+        exactly these messages if server supports UIDPLUS
+        """
+        self.imap.uid(
+            "STORE", self._sequence_set(uid_set), "+FLAGS.SILENT", "(\\Deleted)"
+        )
+        if expunge and self.has_capability("UIDPLUS"):
+            self.imap.uid("EXPUNGE", self._sequence_set(uid_set))
+        else:
+            self._expunge_pending = True
+
+    @is_logged
+    def delete_many(
+        self, uids_or_messages: UIDsOrMessages, expunge: bool = True
+    ) -> "IMAP":
+        """Deletes a number of messages using a single UID STORE command per
+        folder. If expunge is True and the server supports UIDPLUS, only the
+        deleted messages are expunged with UID EXPUNGE; otherwise they are
+        removed when the folder is closed.
+        """
+        for folder, (uid_set, messages) in self._group_uids(uids_or_messages).items():
+            if not uid_set:
+                continue
+            self._select_operating_folder(folder)
+            self._delete_uid_set(uid_set, expunge)
+            for msg in messages:
+                msg._update_flags([EmailFlag.DELETED])
+        self._restore_operating_folder()
+        return self
+
     @is_logged
     def info(self) -> Dict[str, Optional[int]]:
         """Request named status conditions for mailbox."""
-        info: Dict[str, Optional[int]] = {
-            "total": None,
-            "recent": None,
-            "unseen": None,
-            "uidnext": None,
-            "uidvalidity": None,
-        }
+        info = self._parse_status("")
         if self.selected_folder_utf7 and self.imap:
             _status, result = self.imap.status(
-                '"' + self.selected_folder_utf7.decode() + '"',
-                "(MESSAGES RECENT UIDNEXT UIDVALIDITY UNSEEN)",
+                '"' + self.selected_folder_utf7.decode() + '"', STATUS_ITEMS
             )
             if result and isinstance(result[0], bytes):
-                where = result[0].decode()
-                messages = re.search(r"MESSAGES ([0-9]+)", where)
-                if messages:
-                    info["total"] = int(messages.group(1))
-                recent = re.search(r"RECENT ([0-9]+)", where)
-                if recent:
-                    info["recent"] = int(recent.group(1))
-                unseen = re.search(r"UNSEEN ([0-9]+)", where)
-                if unseen:
-                    info["unseen"] = int(unseen.group(1))
-                uidnext = re.search(r"UIDNEXT ([0-9]+)", where)
-                if uidnext:
-                    info["uidnext"] = int(uidnext.group(1))
-                uidvalidity = re.search(r"UIDVALIDITY ([0-9]+)", where)
-                if uidvalidity:
-                    info["uidvalidity"] = int(uidvalidity.group(1))
+                info = self._parse_status(result[0].decode())
 
         return info
 
-    @refresh_folders
+    @is_logged
+    def info_all(
+        self, pattern: str = "*", batch_size: int = 100
+    ) -> Dict[str, Dict[str, Optional[int]]]:
+        """Returns status conditions (same as info()) of all folders matching
+        LIST pattern without selecting them. Uses single LIST-STATUS command
+        (RFC 5819) when supported or pipelined STATUS commands otherwise.
+        """
+        if self.has_capability("LIST-STATUS"):
+            self.imap.untagged_responses.pop("STATUS", None)
+            folders = MailFolder().get_folders(
+                self._list(pattern, return_options=["STATUS " + STATUS_ITEMS])
+            )
+            statuses = self._pop_status_responses()
+        else:
+            regexp = utils.list_pattern_to_regex(pattern, self.separator)
+            folders = [f for f in self.folders() if regexp.fullmatch(f)]
+            statuses = self._pipeline_status(
+                self._selectable_folders(folders), batch_size
+            )
+        # non-selectable folders have no status
+        return {f: statuses.get(f) or self._parse_status("") for f in folders}
+
+    def _selectable_folders(self, folders: List[str]) -> List[str]:
+        """Returns folders which are not marked as Noselect or NonExistent"""
+        folders_info = getattr(self.mail_folder_class, "folders_info", {})
+        return [
+            f
+            for f in folders
+            if not {"Noselect", "NonExistent"}.intersection(
+                folders_info.get(f, {}).get("full_attributes", [])
+            )
+        ]
+
+    def _pipeline_status(
+        self, folders: List[str], batch_size: int
+    ) -> Dict[str, Dict[str, Optional[int]]]:
+        """Sends STATUS commands in batches without waiting for replies to
+        each of them"""
+        statuses = {}
+        self.imap.untagged_responses.pop("STATUS", None)
+        for start in range(0, len(folders), batch_size):
+            tags = [
+                self.imap._command("STATUS", self._mailbox_arg(f), STATUS_ITEMS)
+                for f in folders[start : start + batch_size]
+            ]
+            for tag in tags:
+                # folders which cannot be selected are refused with NO
+                self.imap._command_complete("STATUS", tag)
+            statuses.update(self._pop_status_responses())
+        return statuses
+
+    def _pop_status_responses(self) -> Dict[str, Dict[str, Optional[int]]]:
+        """Returns status conditions of mailboxes collected from untagged
+        STATUS responses"""
+        statuses = {}
+        mailbox = None
+        for item in self.imap.untagged_responses.pop("STATUS", []):
+            if isinstance(item, tuple):
+                # mailbox name sent as literal, status items follow it
+                mailbox = item[1]
+                continue
+            if not isinstance(item, bytes):
+                continue
+            if mailbox is not None:
+                name, items = mailbox, item.strip()[1:-1]
+                mailbox = None
+            else:
+                match = STATUS_RESPONSE.match(item)
+                if not match:
+                    continue
+                if match.group("quoted") is not None:
+                    name = re.sub(rb"\\(.)", rb"\1", match.group("quoted"))
+                else:
+                    name = match.group("atom")
+                items = match.group("items")
+            statuses[utils.utf7_to_unicode(name)] = self._parse_status(
+                utils.b_to_str(items)
+            )
+        return statuses
+
+    def _parse_status(self, items: str) -> Dict[str, Optional[int]]:
+        """Returns mailbox status conditions parsed from STATUS response"""
+        info: Dict[str, Optional[int]] = {}
+        for key, item in (
+            ("total", "MESSAGES"),
+            ("recent", "RECENT"),
+            ("unseen", "UNSEEN"),
+            ("uidnext", "UIDNEXT"),
+            ("uidvalidity", "UIDVALIDITY"),
+        ):
+            match = re.search(item + r" ([0-9]+)", items)
+            info[key] = int(match.group(1)) if match else None
+        return info
+
     @is_logged
     def rename(self, folder_name: str) -> "IMAP":
         """Renames currently selected folder"""
@@ -620,16 +1611,19 @@ class IMAP:
             (like outlook.com) cannot rename currently selected folder & return
             "NO [CANNOT] Cannot rename selected folder." response
             """
+            old_name = self.selected_folder or ""
             self.folder()
-            self.imap.rename(
+            status, _ = self.imap.rename(
                 '"' + folder_to_rename.decode() + '"', '"' + new_name.decode() + '"'
             )
-            self._update_folder_info()
-            self.folder(utils.b_to_str(new_name))
+            if status == "OK":
+                self._folders_changed(lambda f: f.rename_folder(old_name, folder_name))
+            else:
+                self._update_folder_info()
+            self.folder(folder_name)
 
         return self
 
-    @refresh_folders
     @is_logged
     def delete(self, folder_names: Optional[Union[str, List[str]]] = None) -> "IMAP":
         """Deletes list of specified folder names or currently selected
@@ -641,14 +1635,37 @@ class IMAP:
                 folder_names = [folder_names]
             if self.selected_folder in folder_names:
                 self.folder()
+            stale = False
             for f_name in folder_names:
-                if self.imap:
-                    self.imap.delete(
-                        '"' + utils.str_to_utf7(utils.u(f_name)).decode() + '"'
-                    )
+                if self.imap and not self._delete_folder(f_name):
+                    stale = True
+            if stale:
+                self._update_folder_info()
         else:
-            current_folder = self.selected_folder_utf7
+            current_folder = self.selected_folder
             if current_folder and self.imap:
                 self.folder()
-                self.imap.delete('"' + current_folder.decode() + '"')
+                if not self._delete_folder(current_folder):
+                    self._update_folder_info()
         return self
+
+    def _delete_folder(self, folder_name: str) -> bool:
+        """Deletes a single folder and removes it from folder tree.
+        Returns False if server refused to delete the folder."""
+        status, _ = self.imap.delete(
+            '"' + utils.str_to_utf7(utils.u(folder_name)).decode() + '"'
+        )
+        if status != "OK":
+            return False
+        self._folders_changed(lambda f: f.remove_folder(utils.u(folder_name)))
+        return True
+
+    def _folders_changed(self, update: Callable[[MailFolder], None]) -> None:
+        """Applies a change to the folder tree in place instead of
+        listing all folders again"""
+        if not getattr(self.mail_folder_class, "separator", None):
+            # folder tree wasn't built yet
+            self._update_folder_info()
+            return
+        update(self.mail_folder_class)
+        self.mail_folders = self.mail_folder_class.folders
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.literal
+    ~~~~~~~~~~~~~
+
+    This module contains Literal class used to send email messages
+    to IMAP server as literals without re-serialising them. Data coming
+    from files is streamed to the socket in chunks.
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import io
+import mmap
+import os
+from pathlib import Path
+from email.mime.base import MIMEBase
+from typing import Any, Callable, Optional
+
+from .exceptions import UnknownEmailMessageType
+
+# size of data chunks sent to socket when streaming literals
+CHUNK_SIZE = 64 * 1024
+
+
+class Literal:
+    """Message data sent to server as IMAP literal. Source can be bytes-like
+    object, binary file object or path to a file.
+    Note that raw data is sent as is and must use CRLF line endings.
+    """
+
+    def __init__(
+        self, source: Any, size: Optional[int] = None, use_mmap: bool = False
+    ) -> None:
+        self.source = source
+        self.use_mmap = use_mmap
+        self.size: int = self._get_size() if size is None else size
+
+    @classmethod
+    def from_message(cls, message: Any, use_mmap: bool = False) -> "Literal":
+        """Creates literal from email message object, bytes-like object,
+        binary file object or path to a file (str or os.PathLike).
+        Strings which are not paths of existing files are rejected.
+        """
+        if isinstance(message, Literal):
+            return message
+        if isinstance(message, MIMEBase):
+            # IMAP requires CRLF line endings
+            policy = message.policy.clone(linesep="\r\n")
+            return cls(message.as_bytes(policy=policy))
+        if isinstance(message, (bytes, bytearray, memoryview, os.PathLike)):
+            return cls(message, use_mmap=use_mmap)
+        if isinstance(message, str) and os.path.isfile(message):
+            return cls(Path(message), use_mmap=use_mmap)
+        if hasattr(message, "read"):
+            try:
+                return cls(message, use_mmap=use_mmap)
+            except (OSError, io.UnsupportedOperation):
+                # not seekable stream, size cannot be known in advance
+                return cls(message.read())
+        raise UnknownEmailMessageType(
+            "Message should be a subclass of email.mime.base.MIMEBase, "
+            "bytes-like object, binary file object or path to a file"
+        )
+
+    def _get_size(self) -> int:
+        """Returns size of literal data in bytes"""
+        if isinstance(self.source, memoryview):
+            return self.source.nbytes
+        if isinstance(self.source, (bytes, bytearray)):
+            return len(self.source)
+        if isinstance(self.source, os.PathLike):
+            return os.path.getsize(self.source)
+        # file object: remaining data from the current position
+        position = self.source.tell()
+        end = self.source.seek(0, io.SEEK_END)
+        self.source.seek(position)
+        return end - position
+
+    def header(self, non_synchronizing: bool = False) -> bytes:
+        """Returns literal size specification, e.g. b'{123}'"""
+        return b"{%d%s}" % (self.size, b"+" if non_synchronizing else b"")
+
+    def write(self, send: Callable[[Any], Any]) -> None:
+        """Sends literal data in chunks using passed function"""
+        if isinstance(self.source, (bytes, bytearray, memoryview)):
+            self._write_buffer(memoryview(self.source), send)
+        elif isinstance(self.source, os.PathLike):
+            with open(self.source, "rb") as f:
+                self._write_file(f, send)
+        else:
+            self._write_file(self.source, send)
+
+    def _write_buffer(self, view: memoryview, send: Callable[[Any], Any]) -> None:
+        """Sends slices of the buffer without copying them"""
+        with view.cast("B") as data:
+            for start in range(0, self.size, CHUNK_SIZE):
+                with data[start : start + CHUNK_SIZE] as chunk:
+                    send(chunk)
+
+    def _fileno(self, f: Any) -> Optional[int]:
+        """Returns file descriptor of a file object if it has one"""
+        try:
+            return f.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+
+    def _write_file(self, f: Any, send: Callable[[Any], Any]) -> None:
+        """Streams file contents starting at the current position"""
+        fileno = self._fileno(f) if self.use_mmap and self.size else None
+        if fileno is not None:
+            offset = f.tell()
+            with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    with view[offset : offset + self.size] as data:
+                        self._write_buffer(data, send)
+            return
+        remaining = self.size
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise EOFError("File ended before literal was sent completely")
+            send(chunk)
+            remaining -= len(chunk)
@@ -13,7 +13,7 @@
 
 import re
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from . import utils
 from .exceptions import EmailFolderParsingError
@@ -26,6 +26,7 @@ class MailFolder:
     folders: List[str] = field(default_factory=list)
     folders_tree: Dict[str, Any] = field(default_factory=dict)
     children: Dict[str, List[str]] = field(default_factory=dict)
+    folders_info: Dict[str, Any] = field(default_factory=dict)
     separator: str = field(init=False)
     raw_folders: List[Any] = field(init=False)
     folder_parts: re.Pattern = field(init=False)
@@ -37,8 +38,10 @@ class MailFolder:
             \(?(?P<attributes>.*?)?(?<!\\)\)\s?
             # separator
             \"(?P<separator>.*?)\"\s
+            # quoted name followed by extended data (RFC 5258)
+            (?:\"(?P<quoted_name>.*?)\"\s\((?P<extended>.*)\)
             # inbox name with/without separator
-            \"?(?P<name>.*?)\"?$
+            |\"?(?P<name>.*?)\"?)$
             """,
             re.VERBOSE,
         )
@@ -66,7 +69,6 @@ class MailFolder:
         """Construct Folders tree and dictionary holding folder children"""
         obj_list: Dict[str, Any] = {}
         self.folders = []
-        max_depth = 0
 
         for raw_folder in raw_folders:
             if not raw_folder:
@@ -83,70 +85,165 @@ class MailFolder:
 
             attributes = [a.lstrip("\\") for a in match.group("attributes").split()]
             self.separator = utils.to_unescaped_str(match.group("separator"))
-            full_name = match.group("name")
-            name = full_name.split(self.separator)[-1]
-
-            parent_name = ""
-            if self.separator in full_name:
-                parent_parts = full_name.split(self.separator)
-                parent_name = self.separator.join(parent_parts[:-1])
-
-            depth = full_name.count(self.separator)
-            max_depth = max(max_depth, depth)
+            full_name = match.group("quoted_name") or match.group("name")
 
             self.folders.append(full_name)
-
-            obj_list[full_name] = {
-                "full_name": full_name,
-                "name": name,
-                "standard_attributes": attributes.copy(),
-                "full_attributes": attributes,
-                "children": {},
-                "parent_name": parent_name,
-                "depth": depth,
-            }
-
-        tree, children = self._create_tree_and_children(max_depth, obj_list)
-        return tree, children
+            obj_list[full_name] = self._folder_info(full_name, attributes)
+
+        self.folders_info = obj_list
+        return self._create_tree_and_children(obj_list)
+
+    def _folder_info(self, full_name: str, attributes: List[str]) -> Dict[str, Any]:
+        """Returns dictionary describing a single folder"""
+        parent_name, _, name = full_name.rpartition(self.separator)
+        return {
+            "full_name": full_name,
+            "name": name,
+            "standard_attributes": attributes.copy(),
+            "full_attributes": attributes,
+            "children": {},
+            "parent_name": parent_name,
+            "depth": full_name.count(self.separator),
+        }
+
+    def _closest_ancestor_info(self, folder_name: str) -> Optional[Dict[str, Any]]:
+        """Returns info of the closest listed ancestor of a folder"""
+        parent_name = folder_name.rpartition(self.separator)[0]
+        while parent_name and parent_name not in self.folders_info:
+            parent_name = parent_name.rpartition(self.separator)[0]
+        return self.folders_info[parent_name] if parent_name else None
+
+    def _closest_ancestor(self, folder_name: str) -> Dict[str, Any]:
+        """Returns tree level of the closest listed ancestor of a folder"""
+        ancestor = self._closest_ancestor_info(folder_name)
+        return ancestor["children"] if ancestor else self.folders_tree
+
+    def _update_children_attribute(self, folder_info: Dict[str, Any]) -> None:
+        """Sets \\HasChildren or \\HasNoChildren attribute (RFC 3348) the
+        way LIST would return it after subfolders were added or removed.
+        Folders listed without these attributes are left unchanged."""
+        if not {"HasChildren", "HasNoChildren"} & set(folder_info["full_attributes"]):
+            return
+        if folder_info["children"]:
+            old, new = "HasNoChildren", "HasChildren"
+        else:
+            old, new = "HasChildren", "HasNoChildren"
+        for attributes in (
+            folder_info["standard_attributes"],
+            folder_info["full_attributes"],
+        ):
+            if old in attributes:
+                attributes.remove(old)
+            if new not in attributes:
+                attributes.append(new)
+
+    def add_folder(
+        self, full_name: str, attributes: Optional[List[str]] = None
+    ) -> None:
+        """Adds created folder to folder list and tree without re-listing.
+        Re-created folder which was kept as \\Noselect becomes selectable."""
+        if full_name in self.folders_info:
+            folder_info = self.folders_info[full_name]
+            for attrs in (
+                folder_info["standard_attributes"],
+                folder_info["full_attributes"],
+            ):
+                if "Noselect" in attrs:
+                    attrs.remove("Noselect")
+            return
+        folder_info = self._folder_info(full_name, list(attributes or []))
+        self.folders.append(full_name)
+        self.folders_info[full_name] = folder_info
+        self.children[full_name] = []
+        parent_name = folder_info["parent_name"]
+        if parent_name in self.children:
+            self.children[parent_name].append(full_name)
+        level = self._closest_ancestor(full_name)
+        # descendants which were attached higher up now belong to new folder
+        prefix = full_name + self.separator
+        for name, info in list(level.items()):
+            if info["full_name"].startswith(prefix):
+                del level[name]
+                folder_info["children"].setdefault(name, info)
+                if info["parent_name"] == full_name:
+                    self.children[full_name].append(info["full_name"])
+        level.setdefault(folder_info["name"], folder_info)
+        self._update_children_attribute(folder_info)
+        ancestor = self._closest_ancestor_info(full_name)
+        if ancestor:
+            self._update_children_attribute(ancestor)
+
+    def remove_folder(self, full_name: str) -> None:
+        """Removes deleted folder from folder list and tree. Folder having
+        subfolders stays in the tree as \\Noselect (RFC 3501)."""
+        if full_name not in self.folders_info:
+            return
+        folder_info = self.folders_info[full_name]
+        if folder_info["children"]:
+            for attributes in (
+                folder_info["standard_attributes"],
+                folder_info["full_attributes"],
+            ):
+                if "Noselect" not in attributes:
+                    attributes.append("Noselect")
+            return
+        ancestor = self._closest_ancestor_info(full_name)
+        level, name = self._closest_ancestor(full_name), folder_info["name"]
+        if level.get(name) is folder_info:
+            del level[name]
+        if ancestor:
+            self._update_children_attribute(ancestor)
+        del self.folders_info[full_name]
+        del self.children[full_name]
+        self.folders.remove(full_name)
+        parent_name = folder_info["parent_name"]
+        if full_name in self.children.get(parent_name, []):
+            self.children[parent_name].remove(full_name)
+
+    def rename_folder(self, old_name: str, new_name: str) -> None:
+        """Renames folder and all of its subfolders in folder list and tree"""
+        if old_name not in self.folders_info:
+            return
+        prefix = old_name + self.separator
+        renamed = [
+            name for name in self.folders if name == old_name or name.startswith(prefix)
+        ]
+        attributes = {
+            name: self.folders_info[name]["full_attributes"] for name in renamed
+        }
+        # remove subfolders first so that each of them is a leaf when removed
+        for name in sorted(renamed, key=len, reverse=True):
+            self.remove_folder(name)
+        for name in sorted(renamed, key=len):
+            self.add_folder(new_name + name[len(old_name) :], attributes[name])
 
     def get_parent_name(self, folder_name: str) -> str:
         """Returns name of a parent folder or itself if it is already topmost folder."""
         if self.separator not in folder_name:
             return folder_name
-        parent_parts = folder_name.split(self.separator)[:-1]
-        return self.separator.join(parent_parts)
+        return folder_name.rpartition(self.separator)[0]
 
     def _create_tree_and_children(
-        self, max_depth: int, obj_list: Dict[str, Any]
+        self, obj_list: Dict[str, Any]
     ) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
-        """Returns folders merged into tree-like dictionary and dictionary containing the children of each folder"""
+        """Returns folders merged into tree-like dictionary and dictionary
+        containing the children of each folder. Each folder is linked to its
+        parent (or to the closest listed ancestor) in a single pass."""
         result: Dict[str, Any] = {}
-        children: Dict[str, List[str]] = {}
-
-        for current_depth in range(max_depth + 1):
-            for folder_name, folder_info in obj_list.items():
-                if folder_info["depth"] == current_depth:
-                    parent_name = folder_info["parent_name"]
-                    if parent_name:
-                        path = result
-                        for i, name in enumerate(folder_name.split(self.separator)):
-                            local_name = self.separator.join(
-                                folder_name.split(self.separator)[: i + 1]
-                            )
-                            if (
-                                name != self.separator
-                                and name not in path
-                                and local_name in obj_list
-                            ):
-                                path[name] = obj_list[local_name]
-                            if name in path:
-                                path = path[name]["children"]
-                        if parent_name in children:
-                            children[parent_name].append(folder_name)
-                            children[folder_name] = []
-                    else:
-                        result[folder_name] = folder_info
-                        children[folder_name] = []
+        children: Dict[str, List[str]] = {name: [] for name in obj_list}
+
+        for folder_name, folder_info in obj_list.items():
+            parent_name = folder_info["parent_name"]
+            if parent_name in children:
+                children[parent_name].append(folder_name)
+            # server may omit some of the ancestors
+            while parent_name and parent_name not in obj_list:
+                parent_name = parent_name.rpartition(self.separator)[0]
+            if parent_name:
+                path = obj_list[parent_name]["children"]
+            else:
+                path = result
+            path.setdefault(folder_info["name"], folder_info)
 
         return result, children
 
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.metrics
+    ~~~~~~~~~~~~~
+
+    This module contains simple counters and histograms rendered in the
+    Prometheus text exposition format, and MetricsObserver which records
+    them from IMAP connections and connection pools. Only the standard
+    library is used.
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import math
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .hooks import CommandEvent, Observer, ParseEvent
+
+# upper bounds (seconds) of duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape(value: str) -> str:
+    """Escapes label value"""
+    return _escape_help(value).replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric(ABC):
+    """Base class of metrics with optional label names"""
+
+    type = ""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} requires labels: {', '.join(self.labelnames)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """Returns (name, formatted labels, value) of every sample"""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+
+    type = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only be increased")
+        key = self._label_values(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self._label_values(labels), 0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self.values.items())
+        return [
+            (self.name, _format_labels(self.labelnames, key), value)
+            for key, value in values
+        ]
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # bucket counts (not cumulative), sum and count for every labels
+        self.values: Dict[Labels, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total, count = self.values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(
+                (k, (list(c), t, n)) for k, (c, t, n) in self.values.items()
+            )
+        samples: List[Tuple[str, str, float]] = []
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                samples.append((self.name + "_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, count))
+        return samples
+
+
+class MetricsObserver(Observer):
+    """Observer recording metrics of IMAP connections and connection pools,
+    e.g. IMAP(..., observers=[metrics]). Metrics are rendered in the
+    Prometheus text format by render(). Names are prefixed with namespace.
+    """
+
+    def __init__(
+        self, namespace: str = "imapy", buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        prefix = namespace + "_" if namespace else ""
+        self.commands = Counter(
+            prefix + "commands_total",
+            "IMAP commands by command and tagged status",
+            ["command", "status"],
+        )
+        self.command_duration = Histogram(
+            prefix + "command_duration_seconds",
+            "Time from sending IMAP command to its completion",
+            ["command"],
+            buckets,
+        )
+        self.bytes_sent = Counter(
+            prefix + "bytes_sent_total", "Bytes sent to server", ["command"]
+        )
+        self.bytes_received = Counter(
+            prefix + "bytes_received_total", "Bytes received from server", ["command"]
+        )
+        self.messages_fetched = Counter(
+            prefix + "messages_fetched_total", "Email messages fetched"
+        )
+        self.messages_parsed = Counter(
+            prefix + "messages_parsed_total", "Email messages parsed without errors"
+        )
+        self.parse_duration = Histogram(
+            prefix + "parse_duration_seconds",
+            "Time spent parsing fetched email messages",
+            ["phase"],
+            buckets,
+        )
+        self.reconnects = Counter(prefix + "reconnects_total", "Reconnections")
+        self.pool_checkouts = Counter(
+            prefix + "pool_checkouts_total", "Connections checked out from pools"
+        )
+        self.pool_wait = Histogram(
+            prefix + "pool_wait_seconds",
+            "Time spent waiting for a pool connection",
+            buckets=buckets,
+        )
+        self.metrics: List[Metric] = [
+            self.commands,
+            self.command_duration,
+            self.bytes_sent,
+            self.bytes_received,
+            self.messages_fetched,
+            self.messages_parsed,
+            self.parse_duration,
+            self.reconnects,
+            self.pool_checkouts,
+            self.pool_wait,
+        ]
+
+    def after_command(self, event: CommandEvent) -> None:
+        command = event.name or "UNKNOWN"
+        self.commands.inc(command=command, status=event.status or "UNKNOWN")
+        self.command_duration.observe(event.duration, command=command)
+        self.bytes_sent.inc(event.bytes_sent, command=command)
+        self.bytes_received.inc(event.bytes_received, command=command)
+
+    def before_parse(self, event: ParseEvent) -> None:
+        if event.phase == "mime":
+            self.messages_fetched.inc()
+
+    def after_parse(self, event: ParseEvent) -> None:
+        self.parse_duration.observe(event.duration, phase=event.phase)
+        if event.phase == "message" and event.error is None:
+            self.messages_parsed.inc()
+
+    def after_reconnect(self) -> None:
+        self.reconnects.inc()
+
+    def after_checkout(self, wait: float) -> None:
+        self.pool_checkouts.inc()
+        self.pool_wait.observe(wait)
+
+    def render(self, metrics: Optional[Sequence[Metric]] = None) -> str:
+        """Returns metrics in the Prometheus text exposition format"""
+        return "".join(m.render() for m in (metrics or self.metrics))
@@ -54,10 +54,16 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import re
 from typing import List, Set
 
 PRINTABLE: Set[int] = set(range(0x20, 0x26)) | set(range(0x27, 0x7F))
 
+# runs of characters encoded in the same way: printable ASCII characters
+# are kept as is, "&" is escaped and everything else is base64 encoded
+_ENCODE_RUNS = re.compile(r"([\x20-\x25\x27-\x7e]+)|(&+)|([^\x20-\x7e]+)")
+_NON_PRINTABLE = re.compile(r"[^\x20-\x25\x27-\x7e]")
+
 
 def encode(s: str) -> bytes:
     """Encode a folder name using IMAP modified UTF-7 encoding.
@@ -65,26 +71,20 @@ def encode(s: str) -> bytes:
     Input is str (Python 3 unicode string); output is bytes.
     If non-str input is provided, a TypeError is raised.
     """
+    if not isinstance(s, str):
+        raise TypeError("Input must be str")
+    if not _NON_PRINTABLE.search(s):
+        # fast path: nothing to encode
+        return s.encode("ascii")
+
     r: List[bytes] = []
-    _in: List[str] = []
-
-    def extend_result_if_chars_buffered() -> None:
-        if _in:
-            r.extend([b"&", modified_utf7("".join(_in)), b"-"])
-            del _in[:]
-
-    for c in s:
-        if ord(c) in PRINTABLE:
-            extend_result_if_chars_buffered()
-            r.append(c.encode("latin-1"))
-        elif c == "&":
-            extend_result_if_chars_buffered()
-            r.append(b"&-")
+    for printable, ampersands, other in _ENCODE_RUNS.findall(s):
+        if printable:
+            r.append(printable.encode("ascii"))
+        elif ampersands:
+            r.append(b"&-" * len(ampersands))
         else:
-            _in.append(c)
-
-    extend_result_if_chars_buffered()
-
+            r.extend([b"&", modified_utf7(other), b"-"])
     return b"".join(r)
 
 
@@ -96,24 +96,28 @@ def decode(s: bytes) -> str:
     """
     if not isinstance(s, bytes):
         raise TypeError("Input must be bytes")
+    if b"&" not in s:
+        # fast path: nothing to decode
+        return s.decode("latin-1")
 
     r: List[str] = []
-    _in: bytearray = bytearray()
-    for c in s:
-        if c == ord(b"&") and not _in:
-            _in.append(c)
-        elif c == ord(b"-") and _in:
-            if len(_in) == 1:
-                r.append("&")
-            else:
-                r.append(modified_deutf7(_in[1:]))
-            _in = bytearray()
-        elif _in:
-            _in.append(c)
+    position = 0
+    while True:
+        start = s.find(b"&", position)
+        if start == -1:
+            r.append(s[position:].decode("latin-1"))
+            break
+        r.append(s[position:start].decode("latin-1"))
+        end = s.find(b"-", start + 1)
+        if end == -1:
+            # unterminated base64 run
+            r.append(modified_deutf7(s[start + 1 :]))
+            break
+        if end == start + 1:
+            r.append("&")
         else:
-            r.append(chr(c))
-    if _in:
-        r.append(modified_deutf7(_in[1:]))
+            r.append(modified_deutf7(s[start + 1 : end]))
+        position = end + 1
     return "".join(r)
 
 
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.pool
+    ~~~~~~~~~~
+
+    This module contains ConnectionPool class which keeps a small number
+    of logged in connections to the same account. It is used to run
+    commands against several folders in parallel.
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+
+from .hooks import Observer
+
+# IMAP attributes needed to open another connection to the same account
+CONNECTION_SETTINGS = (
+    "host",
+    "username",
+    "password",
+    "ssl",
+    "auth_mechanism",
+    "auth_object",
+    "debug_level",
+    "port",
+    "starttls",
+    "connect_timeout",
+    "command_timeout",
+    # limits and observers are shared by all connections of the pool
+    "rate_limiter",
+    "observers",
+)
+
+
+class ConnectionPool:
+    """Pool of at most `size` connections created on demand by `factory`.
+    Connections are checked out by one thread at a time and logged out
+    when the pool is closed. Observers are notified about checkouts.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int = 4,
+        observers: Optional[List[Observer]] = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("Pool size should be positive")
+        self.factory = factory
+        self.size = size
+        self.observers = [] if observers is None else observers
+        self.connections: List[Any] = []
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_connection(cls, connection: Any, size: int = 4) -> "ConnectionPool":
+        """Creates pool opening new connections with the same settings
+        as the passed IMAP connection"""
+        settings = {name: getattr(connection, name) for name in CONNECTION_SETTINGS}
+        return cls(
+            lambda: type(connection)(**settings), size, settings.get("observers")
+        )
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+    def _acquire(self) -> Any:
+        """Returns idle connection, opens a new one if the pool is not full
+        or waits until another thread returns its connection"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = len(self.connections) < self.size
+            if create:
+                # reserve place in the pool before connecting
+                self.connections.append(None)
+        if not create:
+            return self._idle.get()
+        try:
+            connection = self.factory()
+        except Exception:
+            with self._lock:
+                self.connections.remove(None)
+            raise
+        with self._lock:
+            self.connections[self.connections.index(None)] = connection
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Checks out connection for the duration of the with block"""
+        started = time.monotonic()
+        connection = self._acquire()
+        wait = time.monotonic() - started
+        for observer in self.observers:
+            observer.after_checkout(wait)
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        """Logs out all connections of the pool"""
+        with self._lock:
+            connections = [c for c in self.connections if c is not None]
+            self.connections = []
+        self._idle = queue.LifoQueue()
+        for connection in connections:
+            if connection.logged_in:
+                connection.logout()
@@ -5,11 +5,10 @@
 
     This module contains Q class for constructing queries
     for IMAP search function.
-    Note: this class allows to create simple, non-nested
-    AND queries. It means that all search conditions specified
-    by user should be met in search results. Class doesn't
-    currently support joining query conditions with OR and NOT
-    statements.
+    Note: search conditions added to the same Q object are joined
+    with AND. Q objects can be combined with | (OR), & (AND) and
+    ~ (NOT) operators into nested queries, e.g.
+    (Q().sender("a") | Q().sender("b")) & ~Q().seen()
 
     :copyright: (c) 2015 by Vladimir Goncharov.
     :license: MIT, see LICENSE for more details.
@@ -17,7 +16,7 @@
 import re
 from dataclasses import dataclass, field
 from datetime import date, datetime
-from typing import Any, Callable, List
+from typing import Any, Callable, Dict, List, Tuple
 
 from .exceptions import SearchSyntaxNotSupported, SizeParsingError, WrongDateFormat
 
@@ -96,6 +95,204 @@ def quote(func: Callable) -> Callable:
     return wrapper
 
 
+# number of arguments taken by search keys (RFC 3501)
+SEARCH_KEY_ARGUMENTS = {
+    "BCC": 1,
+    "BEFORE": 1,
+    "BODY": 1,
+    "CC": 1,
+    "FROM": 1,
+    "HEADER": 2,
+    "KEYWORD": 1,
+    "LARGER": 1,
+    "ON": 1,
+    "SENTBEFORE": 1,
+    "SENTON": 1,
+    "SENTSINCE": 1,
+    "SINCE": 1,
+    "SMALLER": 1,
+    "SUBJECT": 1,
+    "TEXT": 1,
+    "TO": 1,
+    "UID": 1,
+    "UNKEYWORD": 1,
+}
+
+# search keys without arguments (RFC 3501)
+SEARCH_KEYS_WITHOUT_ARGUMENTS = {
+    "ALL",
+    "ANSWERED",
+    "DELETED",
+    "DRAFT",
+    "FLAGGED",
+    "NEW",
+    "OLD",
+    "RECENT",
+    "SEEN",
+    "UNANSWERED",
+    "UNDELETED",
+    "UNDRAFT",
+    "UNFLAGGED",
+    "UNSEEN",
+}
+
+# message sequence set used as a search key, e.g. 1:5,7
+SEQUENCE_SET_PATTERN = re.compile(r"^[0-9*:,]+$")
+
+# keys which are negations of each other
+OPPOSITE_KEYS = {
+    "ANSWERED": "UNANSWERED",
+    "DELETED": "UNDELETED",
+    "DRAFT": "UNDRAFT",
+    "FLAGGED": "UNFLAGGED",
+    "KEYWORD": "UNKEYWORD",
+    "SEEN": "UNSEEN",
+}
+OPPOSITE_KEYS.update({v: k for k, v in OPPOSITE_KEYS.items()})
+
+# bounds which can be merged when used together: key -> choose stricter value
+MERGEABLE_BOUNDS = {
+    "BEFORE": min,
+    "SENTBEFORE": min,
+    "SINCE": max,
+    "SENTSINCE": max,
+    "SMALLER": min,
+    "LARGER": max,
+}
+
+# query tree node: ("KEY", [tokens]), ("AND", [nodes]), ("OR", [nodes])
+# or ("NOT", [node])
+Node = Tuple[str, List[Any]]
+
+
+def parse_query(tokens: List[Any]) -> Node:
+    """Returns query tree parsed from list of search keys joined with AND.
+    Raises ValueError for search keys with unknown number of arguments
+    (e.g. extension keys like X-GM-RAW or MODSEQ)."""
+    position = 0
+
+    def parse_key() -> Node:
+        nonlocal position
+        token = tokens[position]
+        position += 1
+        name = str(token).upper()
+        if token == "(":
+            children = []
+            while position < len(tokens) and tokens[position] != ")":
+                children.append(parse_key())
+            position += 1
+            return ("AND", children)
+        if name == "OR":
+            return ("OR", [parse_key(), parse_key()])
+        if name == "NOT":
+            return ("NOT", [parse_key()])
+        if name in SEARCH_KEY_ARGUMENTS:
+            arguments = SEARCH_KEY_ARGUMENTS[name]
+        elif name in SEARCH_KEYS_WITHOUT_ARGUMENTS or SEQUENCE_SET_PATTERN.match(name):
+            arguments = 0
+        else:
+            raise ValueError(f"Unknown search key: {token}")
+        position += arguments
+        return ("KEY", tokens[position - arguments - 1 : position])
+
+    children = []
+    while position < len(tokens):
+        children.append(parse_key())
+    return ("AND", children)
+
+
+def serialize_query(node: Node, nested: bool = False) -> List[Any]:
+    """Returns list of tokens representing query tree. Nested groups of
+    search keys are enclosed in parentheses."""
+    kind, children = node
+    if kind == "KEY":
+        return list(children)
+    if kind == "NOT":
+        return ["NOT"] + serialize_query(children[0], nested=True)
+    if kind == "OR":
+        # OR takes exactly two search keys
+        tokens = serialize_query(children[-1], nested=True)
+        for child in reversed(children[:-1]):
+            tokens = ["OR"] + serialize_query(child, nested=True) + tokens
+        return tokens
+    tokens = [t for child in children for t in serialize_query(child, nested)]
+    if nested and not children:
+        # empty query matches all messages
+        return ["ALL"]
+    if nested and len(children) > 1:
+        return ["("] + tokens + [")"]
+    return tokens
+
+
+def optimise_query(node: Node) -> Node:
+    """Returns equivalent query tree with redundant nesting flattened,
+    double negations removed, duplicate keys dropped and bounds of the
+    same kind (e.g. two SINCE dates) merged into the stricter one"""
+    kind, children = node
+    if kind == "KEY":
+        return node
+    children = [optimise_query(child) for child in children]
+    if kind == "NOT":
+        child_kind, child_children = children[0]
+        if child_kind == "NOT":
+            return child_children[0]
+        if child_kind == "KEY":
+            name = str(child_children[0]).upper()
+            if name in OPPOSITE_KEYS:
+                return ("KEY", [OPPOSITE_KEYS[name]] + child_children[1:])
+        return ("NOT", children)
+
+    flattened: List[Node] = []
+    for child in children:
+        # (a b) c -> a b c, OR a (OR b c) -> OR a OR b c
+        if child[0] == kind:
+            flattened.extend(child[1])
+        else:
+            flattened.append(child)
+    if kind == "AND":
+        flattened = _merge_bounds(flattened)
+    unique: List[Node] = []
+    for child in flattened:
+        if child not in unique:
+            unique.append(child)
+    if len(unique) == 1:
+        return unique[0]
+    return (kind, unique)
+
+
+def _merge_bounds(nodes: List[Node]) -> List[Node]:
+    """Merges search keys of the same kind which limit date or size"""
+    merged: List[Node] = []
+    bounds: Dict[str, int] = {}
+    for node in nodes:
+        name = str(node[1][0]).upper() if node[0] == "KEY" else ""
+        if name not in MERGEABLE_BOUNDS:
+            merged.append(node)
+            continue
+        if name in bounds:
+            i = bounds[name]
+            try:
+                value = MERGEABLE_BOUNDS[name](
+                    merged[i][1][1], node[1][1], key=_bound_value
+                )
+            except ValueError:
+                merged.append(node)
+                continue
+            merged[i] = ("KEY", [merged[i][1][0], value])
+        else:
+            bounds[name] = len(merged)
+            merged.append(node)
+    return merged
+
+
+def _bound_value(value: Any) -> Any:
+    """Returns comparable value of date or size search key argument"""
+    value = str(value).strip('"')
+    if value.isdigit():
+        return int(value)
+    return datetime.strptime(value, "%d-%b-%Y")
+
+
 @dataclass
 class Q:
     """Class for constructing queries for IMAP search function."""
@@ -115,7 +312,7 @@ class Q:
         return True
 
     def get_query(self) -> List[Any]:
-        """Returns list containing queries"""
+        """Returns list containing optimised queries"""
         non_ascii = self._get_non_ascii_params()
 
         if len(non_ascii) > 1:
@@ -124,17 +321,56 @@ class Q:
                 "containing non-ascii characters is "
                 "not supported"
             )
+        tokens = self.optimise().queries
+        query: List[Any] = []
+        for token in tokens:
+            # parentheses are attached to the adjacent search keys
+            if query and (str(query[-1]).endswith("(") or token == ")"):
+                query[-1] = f"{query[-1]}{token}"
+            else:
+                query.append(token)
         if non_ascii:
-            if "CHARSET" not in self.queries:
-                self.queries = ["CHARSET", "UTF-8"] + self.queries
+            query = ["CHARSET", "UTF-8"] + query
 
+        return query
+
+    def optimise(self) -> "Q":
+        """Returns equivalent query with redundant nesting flattened and
+        search keys merged where possible. Queries containing unknown
+        search keys are returned unchanged."""
+        try:
+            node = parse_query(self._keys())
+        except ValueError:
+            return Q(queries=list(self._keys()))
+        return Q(queries=serialize_query(optimise_query(node)))
+
+    def _keys(self) -> List[Any]:
+        """Returns search keys without charset specification"""
+        if self.queries[:1] == ["CHARSET"]:
+            return self.queries[2:]
         return self.queries
 
+    def _operand(self) -> List[Any]:
+        """Returns search keys as a single (parenthesised if needed) key"""
+        try:
+            return serialize_query(parse_query(self._keys()), nested=True)
+        except ValueError:
+            return ["("] + self._keys() + [")"]
+
+    def __and__(self, other: "Q") -> "Q":
+        return Q(queries=self._keys() + other._keys())
+
+    def __or__(self, other: "Q") -> "Q":
+        return Q(queries=["OR"] + self._operand() + other._operand())
+
+    def __invert__(self) -> "Q":
+        return Q(queries=["NOT"] + self._operand())
+
     def _get_non_ascii_params(self) -> List[str]:
         """Checks how much query parameters have non-ascii symbols and
         returns them"""
         if not self.non_ascii_params:
-            for q in self.queries:
+            for q in self._keys():
                 if not isinstance(q, int) and not self.is_ascii(str(q)):
                     self.non_ascii_params.append(str(q))
         return self.non_ascii_params
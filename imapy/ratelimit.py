@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.ratelimit
+    ~~~~~~~~~~~~~~~
+
+    This module contains token bucket rate limiter used to keep number of
+    commands and amount of data sent to and received from IMAP server
+    within limits set by mail providers.
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Bucket refilled with `rate` tokens per second up to `capacity`
+    tokens. Taking more tokens than available puts the bucket into debt
+    which the caller waits out, so requests bigger than capacity are
+    allowed but paced.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("Rate should be positive")
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: float = 1) -> float:
+        """Takes tokens waiting until they are available and returns
+        number of seconds spent waiting"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """Limits commands per second and bytes per second (sent and received
+    together) of IMAP connections. The same limiter can be passed to
+    several connections (e.g. connection pool or connections to different
+    accounts) to share the limits between them. Burst is number of seconds
+    worth of tokens which may be used at once after a pause.
+    """
+
+    def __init__(
+        self,
+        commands_per_second: Optional[float] = None,
+        bytes_per_second: Optional[float] = None,
+        burst: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.commands = (
+            TokenBucket(
+                commands_per_second,
+                max(1.0, commands_per_second * burst),
+                clock,
+                sleep,
+            )
+            if commands_per_second
+            else None
+        )
+        self.bytes = (
+            TokenBucket(bytes_per_second, bytes_per_second * burst, clock, sleep)
+            if bytes_per_second
+            else None
+        )
+        # total time callers were delayed for
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _wait(self, bucket: TokenBucket, amount: float) -> None:
+        wait = bucket.consume(amount)
+        if wait:
+            with self._lock:
+                self.waited += wait
+
+    def command(self) -> None:
+        """Waits until next command can be sent"""
+        if self.commands is not None:
+            self._wait(self.commands, 1)
+
+    def transfer(self, size: int) -> None:
+        """Accounts size bytes of transferred data, waiting if they
+        exceed the limit"""
+        if self.bytes is not None and size:
+            self._wait(self.bytes, size)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.scheduler
+    ~~~~~~~~~~~~~~~
+
+    This module contains functions used to split UID FETCH commands into
+    batches by message size instead of number of messages, so that every
+    command transfers roughly the same amount of data, and a controller
+    which adapts batch size to observed latency and throughput.
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Union
+
+from .structures import UIDSet
+
+# default amount of message data requested by a single FETCH command
+DEFAULT_BYTE_BUDGET = 8 * 1024 * 1024
+# limits of adaptive byte budget
+MIN_BYTE_BUDGET = 256 * 1024
+MAX_BYTE_BUDGET = 64 * 1024 * 1024
+
+FETCH_SIZE = re.compile(rb"UID (\d+)|RFC822\.SIZE (\d+)")
+
+
+@dataclass
+class FetchBatch:
+    """UIDs fetched with a single command and their total size. Large
+    batch holds one message which is fetched in parts.
+    """
+
+    uids: List[int] = field(default_factory=list)
+    size: int = 0
+    large: bool = False
+
+    @property
+    def uid_set(self) -> UIDSet:
+        return UIDSet(self.uids)
+
+
+def parse_sizes(data: List[Any]) -> Dict[int, int]:
+    """Returns message sizes keyed by UID parsed from
+    UID FETCH (RFC822.SIZE) response"""
+    sizes = {}
+    for item in data:
+        if isinstance(item, tuple):
+            item = item[0]
+        if not isinstance(item, bytes):
+            continue
+        uid = size = None
+        for uid_match, size_match in FETCH_SIZE.findall(item):
+            uid = int(uid_match) if uid_match else uid
+            size = int(size_match) if size_match else size
+        if uid is not None and size is not None:
+            sizes[uid] = size
+    return sizes
+
+
+@dataclass
+class BatchStats:
+    """Measurements of a single FETCH command"""
+
+    budget: int
+    size: int
+    elapsed: float
+    ttfb: float
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second"""
+        return self.size / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class AdaptiveBatchSize:
+    """Byte budget of FETCH batches adjusted after every batch (AIMD): it
+    grows by `increase` bytes while the server responds in time and
+    shrinks by `decrease` factor when time to first byte exceeds
+    `max_ttfb` seconds or throughput falls below `slowdown` part of its
+    moving average. Budget is kept between min_size and max_size.
+    """
+
+    size: int = DEFAULT_BYTE_BUDGET
+    min_size: int = MIN_BYTE_BUDGET
+    max_size: int = MAX_BYTE_BUDGET
+    increase: int = 1024 * 1024
+    decrease: float = 0.5
+    max_ttfb: float = 2.0
+    slowdown: float = 0.5
+    throughput: float = 0.0
+    batches: int = 0
+    history: Deque[BatchStats] = field(default_factory=lambda: deque(maxlen=100))
+
+    def __post_init__(self) -> None:
+        if not 0 < self.min_size <= self.max_size:
+            raise ValueError("Batch size limits should be positive")
+        self.size = min(max(self.size, self.min_size), self.max_size)
+
+    @classmethod
+    def fixed(cls, size: int) -> "AdaptiveBatchSize":
+        """Returns controller which always uses the same byte budget"""
+        if size < 1:
+            raise ValueError("Byte budget should be positive")
+        return cls(size=size, min_size=size, max_size=size)
+
+    def update(self, size: int, elapsed: float, ttfb: float) -> int:
+        """Records batch of size bytes received in elapsed seconds and
+        returns new byte budget"""
+        stats = BatchStats(self.size, size, elapsed, ttfb)
+        self.history.append(stats)
+        self.batches += 1
+        slow = bool(self.throughput) and (
+            stats.throughput < self.throughput * self.slowdown
+        )
+        if ttfb > self.max_ttfb or slow:
+            self.size = max(self.min_size, int(self.size * self.decrease))
+        elif size * 2 >= self.size:
+            # grow only when the budget was actually used
+            self.size = min(self.max_size, self.size + self.increase)
+        self.throughput = (
+            stats.throughput
+            if not self.throughput
+            else 0.8 * self.throughput + 0.2 * stats.throughput
+        )
+        return self.size
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns current byte budget, moving average of throughput
+        (bytes/sec) and budgets used by recent batches"""
+        last = self.history[-1] if self.history else None
+        return {
+            "size": self.size,
+            "batches": self.batches,
+            "throughput": self.throughput,
+            "ttfb": last.ttfb if last else None,
+            "sizes": [h.budget for h in self.history],
+        }
+
+
+def iter_batches(
+    sizes: Dict[int, int],
+    byte_budget: Union[int, AdaptiveBatchSize] = DEFAULT_BYTE_BUDGET,
+    large_message_size: Optional[int] = None,
+) -> Iterator[FetchBatch]:
+    """Yields batches of UIDs (in ascending order) which do not exceed byte
+    budget. Budget of adaptive controller is read again for every batch.
+    Messages bigger than large_message_size (byte budget by default) are
+    put into separate large batches.
+    """
+    if isinstance(byte_budget, int):
+        byte_budget = AdaptiveBatchSize.fixed(byte_budget)
+    batch = FetchBatch()
+    for uid in sorted(sizes):
+        size = sizes[uid]
+        budget = byte_budget.size
+        if size > (budget if large_message_size is None else large_message_size):
+            if batch.uids:
+                yield batch
+                batch = FetchBatch()
+            yield FetchBatch([uid], size, large=True)
+            continue
+        if batch.uids and batch.size + size > budget:
+            yield batch
+            batch = FetchBatch()
+        batch.uids.append(uid)
+        batch.size += size
+    if batch.uids:
+        yield batch
+
+
+def plan_batches(
+    sizes: Dict[int, int],
+    byte_budget: int = DEFAULT_BYTE_BUDGET,
+    large_message_size: Optional[int] = None,
+) -> List[FetchBatch]:
+    """Groups UIDs (in ascending order) into batches which do not exceed
+    byte budget. Messages bigger than large_message_size (byte budget by
+    default) are put into separate large batches.
+    """
+    return list(iter_batches(sizes, byte_budget, large_message_size))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.sorting
+    ~~~~~~~~~~~~~
+
+    This module contains functions used to sort email messages on the
+    client side in the same way as server-side SORT command (RFC 5256)
+    does. It is used when server doesn't support SORT extension.
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import email
+import email.errors
+import re
+from datetime import datetime, timezone
+from email.header import decode_header, make_header
+from email.utils import getaddresses, parsedate_to_datetime
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from .exceptions import InvalidSearchQuery
+
+SORT_CRITERIA = ("ARRIVAL", "CC", "DATE", "FROM", "SIZE", "SUBJECT", "TO")
+HEADER_CRITERIA = ("CC", "DATE", "FROM", "SUBJECT", "TO")
+
+# "Re:", "Fwd:", "[list]" prefixes and "(fwd)" suffix of subjects
+SUBJECT_PREFIX = re.compile(r"^\s*((re|fwd?)\s*(\[[^\]]*\])?\s*:|\[[^\]]*\])\s*", re.I)
+SUBJECT_SUFFIX = re.compile(r"\s*\(fwd\)\s*$", re.I)
+
+
+def parse_sort_criteria(sort: Union[str, Sequence[str]]) -> List[Tuple[str, bool]]:
+    """Returns list of (criterion, reverse) tuples parsed from sort criteria,
+    e.g. ["REVERSE", "ARRIVAL", "SUBJECT"]
+    """
+    if isinstance(sort, str):
+        sort = [sort]
+    criteria = []
+    reverse = False
+    for word in " ".join(sort).upper().split():
+        if word == "REVERSE":
+            reverse = True
+        elif word in SORT_CRITERIA:
+            criteria.append((word, reverse))
+            reverse = False
+        else:
+            raise InvalidSearchQuery(
+                f"Unknown sort criterion: {word}. Please use one of the "
+                f"following: {', '.join(SORT_CRITERIA)} (optionally preceded "
+                "by REVERSE)"
+            )
+    if reverse or not criteria:
+        raise InvalidSearchQuery("Sort criteria should end with a sort key")
+    return criteria
+
+
+def fetch_items(criteria: List[Tuple[str, bool]]) -> str:
+    """Returns FETCH items needed to sort messages by given criteria"""
+    items = ["UID", "INTERNALDATE", "RFC822.SIZE"]
+    headers = [c for c in HEADER_CRITERIA if c in {c for c, _ in criteria}]
+    if headers:
+        items.append(f"BODY.PEEK[HEADER.FIELDS ({' '.join(headers)})]")
+    return "(" + " ".join(items) + ")"
+
+
+def parse_metadata(data: List[Any]) -> Dict[int, Dict[str, Any]]:
+    """Returns message metadata (internal date, size and headers)
+    parsed from FETCH response and keyed by message UID
+    """
+    metadata: Dict[int, Dict[str, Any]] = {}
+    total = len(data)
+    for i, item in enumerate(data):
+        headers = b""
+        if isinstance(item, tuple):
+            item, headers = item
+            # items sent after the literal
+            if (i + 1) < total and isinstance(data[i + 1], bytes):
+                item += b" " + data[i + 1]
+        elif not isinstance(item, bytes) or (i and isinstance(data[i - 1], tuple)):
+            continue
+        uid = re.search(rb"UID (\d+)", item)
+        if not uid:
+            continue
+        internal_date = re.search(rb'INTERNALDATE "([^"]+)"', item)
+        size = re.search(rb"RFC822\.SIZE (\d+)", item)
+        metadata[int(uid.group(1))] = {
+            "internal_date": _internal_date(internal_date.group(1))
+            if internal_date
+            else 0.0,
+            "size": int(size.group(1)) if size else 0,
+            "headers": email.message_from_bytes(headers) if headers else {},
+        }
+    return metadata
+
+
+def sort_uids(
+    metadata: Dict[int, Dict[str, Any]], criteria: List[Tuple[str, bool]]
+) -> List[int]:
+    """Returns UIDs sorted by given criteria. Ties are broken by UID."""
+    uids = sorted(metadata)
+    # stable sorts applied from the least significant criterion
+    for criterion, reverse in reversed(criteria):
+        uids.sort(key=lambda uid: _sort_key(metadata[uid], criterion), reverse=reverse)
+    return uids
+
+
+def _sort_key(info: Dict[str, Any], criterion: str) -> Any:
+    """Returns value used to sort message by a single criterion"""
+    if criterion == "ARRIVAL":
+        return info["internal_date"]
+    if criterion == "SIZE":
+        return info["size"]
+    value = info["headers"].get(criterion, "") or ""
+    if criterion == "DATE":
+        return _sent_date(value) or info["internal_date"]
+    if criterion == "SUBJECT":
+        return _base_subject(value)
+    # FROM, TO, CC: local part of the first address
+    addresses = getaddresses([value])
+    return addresses[0][1].split("@")[0].lower() if addresses else ""
+
+
+def _internal_date(value: bytes) -> float:
+    """Returns timestamp of INTERNALDATE, e.g. b'17-Jul-1996 02:44:25 -0700'"""
+    try:
+        date = datetime.strptime(value.decode().strip(), "%d-%b-%Y %H:%M:%S %z")
+    except ValueError:
+        return 0.0
+    return date.timestamp()
+
+
+def _sent_date(value: str) -> float:
+    """Returns timestamp of Date header or 0 if it cannot be parsed"""
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp()
+
+
+def _base_subject(value: str) -> str:
+    """Returns subject without reply/forward markers (RFC 5256)"""
+    try:
+        value = str(make_header(decode_header(value)))
+    except (LookupError, UnicodeDecodeError, email.errors.HeaderParseError):
+        pass
+    subject = " ".join(value.split())
+    previous = None
+    while subject != previous:
+        previous = subject
+        subject = SUBJECT_PREFIX.sub("", SUBJECT_SUFFIX.sub("", subject))
+    return subject.lower()
@@ -10,7 +10,17 @@ This module contains data structures used by Imapy
 """
 
 
-from typing import Any, Optional, Union
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+QUOTED = r'"(?:[^"\\]|\\.)*"'
+# "(TAG ... MAILBOX ... UIDVALIDITY ...)" prefix of ESEARCH response
+ESEARCH_CORRELATOR = re.compile(r"^\s*\(((?:[^()\"]|%s)*)\)" % QUOTED)
+ESEARCH_MAILBOX = re.compile(
+    r'MAILBOX\s+(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<atom>[^\s)]+))', re.I
+)
 
 
 class CaseInsensitiveDict(dict[str, Any]):
@@ -38,3 +48,207 @@ class CaseInsensitiveDict(dict[str, Any]):
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({super().__repr__()})"
+
+
+class UIDSet:
+    """Range-based set of message UIDs which renders itself as a compact
+    IMAP sequence set (e.g. "1:3,7,10:12")
+    """
+
+    def __init__(self, uids: Iterable[Union[int, str]] = ()) -> None:
+        self._ranges: List[Tuple[int, int]] = self._merge(
+            (uid, uid) for uid in set(int(u) for u in uids)
+        )
+
+    @classmethod
+    def parse(cls, sequence_set: Union[str, bytes]) -> "UIDSet":
+        """Creates UIDSet from IMAP sequence set string without expanding
+        its ranges"""
+        if isinstance(sequence_set, bytes):
+            sequence_set = sequence_set.decode()
+        ranges = []
+        for part in sequence_set.strip().split(","):
+            if part:
+                start, _, end = part.partition(":")
+                first, last = int(start), int(end or start)
+                ranges.append((min(first, last), max(first, last)))
+        uid_set = cls()
+        uid_set._ranges = cls._merge(ranges)
+        return uid_set
+
+    def slice(self, start: int, stop: int) -> "UIDSet":
+        """Returns UIDs at positions from start to stop (exclusive) in
+        ascending order without expanding ranges"""
+        ranges = []
+        position = 0
+        for first, last in self._ranges:
+            size = last - first + 1
+            if position + size > start and position < stop:
+                ranges.append(
+                    (
+                        first + max(start - position, 0),
+                        first + min(stop - position, size) - 1,
+                    )
+                )
+            position += size
+            if position >= stop:
+                break
+        uid_set = UIDSet()
+        uid_set._ranges = ranges
+        return uid_set
+
+    @staticmethod
+    def _merge(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Returns sorted list of ranges with overlapping and adjacent
+        ranges joined"""
+        merged: List[Tuple[int, int]] = []
+        for start, end in sorted(ranges):
+            if merged and merged[-1][1] + 1 >= start:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        return self._ranges
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self._ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self._ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self._ranges:
+            yield from range(start, end + 1)
+
+    def __contains__(self, uid: Any) -> bool:
+        try:
+            uid = int(uid)
+        except (TypeError, ValueError):
+            return False
+        i = bisect_right(self._ranges, (uid, float("inf"))) - 1
+        return i >= 0 and self._ranges[i][0] <= uid <= self._ranges[i][1]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, UIDSet):
+            return self._ranges == other._ranges
+        return NotImplemented
+
+    def __str__(self) -> str:
+        return ",".join(
+            str(start) if start == end else f"{start}:{end}"
+            for start, end in self._ranges
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self)!r})"
+
+
+@dataclass
+class SearchResult:
+    """Result of UID SEARCH: lowest and highest matching UID, number of
+    matching messages, set of all of them and UIDs of requested PARTIAL
+    range. Values which were not requested are None. Results of
+    multi-mailbox search also hold (modified UTF-7) name of the mailbox.
+    """
+
+    min: Optional[int] = None
+    max: Optional[int] = None
+    count: Optional[int] = None
+    uids: Optional[UIDSet] = None
+    partial: Optional[UIDSet] = None
+    mailbox: Optional[str] = None
+
+    @classmethod
+    def from_uids(
+        cls, uids: UIDSet, result: Iterable[str] = ("MIN", "MAX", "COUNT", "ALL")
+    ) -> "SearchResult":
+        """Creates search result from a set of UIDs keeping only
+        requested values"""
+        result = {r.upper() for r in result}
+        ranges = uids.ranges
+        return cls(
+            min=ranges[0][0] if ranges and "MIN" in result else None,
+            max=ranges[-1][1] if ranges and "MAX" in result else None,
+            count=len(uids) if "COUNT" in result else None,
+            uids=uids if "ALL" in result else None,
+        )
+
+    @classmethod
+    def from_esearch(cls, response: Union[str, bytes]) -> "SearchResult":
+        """Creates search result from ESEARCH response (RFC 4731, RFC 9394),
+        e.g. '(TAG "A1") UID MIN 4 MAX 28 COUNT 17 ALL 4:18,21,28' or
+        '(TAG "A1" MAILBOX "INBOX" UIDVALIDITY 1) UID ALL 1:3' (RFC 7377)
+        """
+        if isinstance(response, bytes):
+            response = response.decode()
+        search_result = cls()
+        # search correlator
+        correlator = ESEARCH_CORRELATOR.match(response)
+        if correlator:
+            mailbox = ESEARCH_MAILBOX.search(correlator.group(1))
+            if mailbox:
+                quoted = mailbox.group("quoted")
+                search_result.mailbox = (
+                    re.sub(r"\\(.)", r"\1", quoted)
+                    if quoted is not None
+                    else mailbox.group("atom")
+                )
+            response = response[correlator.end() :]
+        tokens = response.split()
+        i = 0
+        while i < len(tokens):
+            name = tokens[i].upper()
+            if name == "UID":
+                i += 1
+                continue
+            value = tokens[i + 1] if i + 1 < len(tokens) else ""
+            if name in ("MIN", "MAX", "COUNT"):
+                setattr(search_result, name.lower(), int(value))
+            elif name == "ALL":
+                search_result.uids = UIDSet.parse(value)
+            elif name == "PARTIAL":
+                # PARTIAL (range UIDs), UIDs are NIL when range is empty
+                value = tokens[i + 2] if i + 2 < len(tokens) else "NIL"
+                value = value.rstrip(")")
+                search_result.partial = UIDSet.parse(
+                    "" if value.upper() == "NIL" else value
+                )
+                i += 1
+            i += 2
+        return search_result
+
+
+@dataclass
+class SearchPage:
+    """Page of search results: UIDs (and emails if they were fetched) on
+    the page, total number of matching emails and cursor pointing to the
+    next page (None if this page is the last one)
+    """
+
+    uids: List[int]
+    total: int
+    cursor: Optional[int]
+    emails: List[Any] = field(default_factory=list)
+
+
+@dataclass
+class SavedSearch:
+    """Search result kept for follow-up commands. It is either saved on
+    server and referred to as "$" (RFC 5182) or kept as a set of UIDs.
+    """
+
+    folder: str
+    query: Any
+    count: int = 0
+    uids: Optional[UIDSet] = None
+    # server-side result is valid until folder is reselected
+    generation: int = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __str__(self) -> str:
+        return "$" if self.uids is None else str(self.uids)
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+    imapy.transport
+    ~~~~~~~~~~~~~~~
+
+    This module contains Transport class which wraps network I/O methods
+    of imaplib connection, so that every command and every sent or
+    received byte passes through Imapy (e.g. to be rate limited, to
+    enforce command deadlines or to notify observers).
+
+    :copyright: (c) 2015 by Vladimir Goncharov.
+    :license: MIT, see LICENSE for more details.
+"""
+import imaplib
+import re
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, NoReturn, Optional, Set, Type
+
+from .exceptions import CommandCancelled, CommandTimeout
+from .hooks import CommandEvent, Observer
+from .ratelimit import RateLimiter
+
+# size of data chunks read from socket when receiving is rate limited
+READ_CHUNK_SIZE = 64 * 1024
+
+# line announcing literal which follows it, e.g. b"... {123}\r\n"
+LITERAL_HEADER = re.compile(rb"\{\d+\+?\}\r\n$")
+
+
+class Transport:
+    """Replaces send(), read(), readline() and _new_tag() methods of imaplib
+    connection with ones going through the transport.
+
+    Every command has to be completed within command_timeout seconds and
+    all commands have to be completed before deadline (time.monotonic()
+    value) if it is set. Socket operations time out after timeout seconds.
+    Connection is closed when a command times out or is cancelled.
+    Observers are notified before and after every command.
+    """
+
+    def __init__(
+        self,
+        connection: imaplib.IMAP4,
+        rate_limiter: Optional[RateLimiter] = None,
+        timeout: Optional[float] = None,
+        command_timeout: Optional[float] = None,
+        folder: Optional[Callable[[], Optional[str]]] = None,
+        on_close: Optional[Callable[[], None]] = None,
+        observers: Optional[List[Observer]] = None,
+    ) -> None:
+        self.connection = connection
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.command_timeout = command_timeout
+        self.deadline: Optional[float] = None
+        self.folder = folder
+        self.on_close = on_close
+        self.observers = [] if observers is None else observers
+        # name of the last command, e.g. "UID FETCH"
+        self.command: Optional[str] = None
+        # time.monotonic() when the first line after the last command was
+        # received (time to first byte of the response)
+        self.first_response: Optional[float] = None
+        self.cancelled = False
+        self._tag: Optional[bytes] = None
+        self._command_deadline: Optional[float] = None
+        self._lock = threading.Lock()
+        # tags of commands sent and not completed yet
+        self._pending: Set[bytes] = set()
+        # events of commands in progress keyed by tag
+        self._events: Dict[bytes, CommandEvent] = {}
+        self._send = connection.send
+        self._read = connection.read
+        self._readline = connection.readline
+        self._new_tag = connection._new_tag
+        self._get_tagged_response = connection._get_tagged_response
+        self._command_complete = connection._command_complete
+        connection.send = self.send  # type: ignore
+        connection.read = self.read  # type: ignore
+        connection.readline = self.readline  # type: ignore
+        connection._new_tag = self.new_tag  # type: ignore
+        connection._get_tagged_response = self.get_tagged_response  # type: ignore
+        connection._command_complete = self.command_complete  # type: ignore
+
+    def new_tag(self) -> bytes:
+        """Returns tag of a new command; called once for every command"""
+        if self.rate_limiter:
+            self.rate_limiter.command()
+        self._tag = self._new_tag()
+        with self._lock:
+            self._pending.add(self._tag)
+        self.command = None
+        self.first_response = None
+        self._command_deadline = (
+            time.monotonic() + self.command_timeout if self.command_timeout else None
+        )
+        if self.observers:
+            self._events[self._tag] = CommandEvent(
+                tag=self._tag.decode("ascii", "replace"), started=time.monotonic()
+            )
+        return self._tag
+
+    def get_tagged_response(self, tag: bytes, *args: Any, **kwargs: Any) -> Any:
+        """Waits for command completion and notifies observers"""
+        try:
+            result = self._get_tagged_response(tag, *args, **kwargs)
+        except Exception as e:
+            self._finish(tag, type(e).__name__)
+            raise
+        self._finish(tag, result[0])
+        return result
+
+    def command_complete(self, name: str, tag: bytes) -> Any:
+        """Waits for command completion; command is finished when it fails
+        before its tagged response is read (e.g. server sent BYE)"""
+        try:
+            return self._command_complete(name, tag)
+        except Exception as e:
+            self._finish(tag, type(e).__name__)
+            raise
+
+    def send(self, data: Any) -> None:
+        if self.command is None and self._tag and isinstance(data, bytes):
+            self.command = self._command_name(data)
+            event = self._events.get(self._tag)
+            if event is not None:
+                event.name = self.command or ""
+                event.folder = self.folder() if self.folder else None
+                for observer in self.observers:
+                    observer.before_command(event)
+        if self.rate_limiter:
+            self.rate_limiter.transfer(len(data))
+        try:
+            self._call(self._send, data)
+        except Exception as e:
+            # command which could not be sent is never completed
+            if self._tag is not None:
+                self._finish(self._tag, type(e).__name__)
+            raise
+        if self._events and self._tag in self._events:
+            event = self._events[self._tag]
+            event.bytes_sent += len(data)
+            if isinstance(data, bytes) and LITERAL_HEADER.search(data):
+                event.literals_sent += 1
+
+    def read(self, size: int) -> bytes:
+        data = self._read_limited(size)
+        if self._events:
+            self._received(len(data))
+        return data
+
+    def _read_limited(self, size: int) -> bytes:
+        if not self.rate_limiter or self.rate_limiter.bytes is None:
+            return self._call(self._read, size)
+        # literals are read in parts to keep transfer rate even
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = self._call(self._read, min(remaining, READ_CHUNK_SIZE))
+            if not chunk:
+                break
+            self.rate_limiter.transfer(len(chunk))
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def readline(self) -> bytes:
+        line = self._call(self._readline)
+        if self.first_response is None:
+            self.first_response = time.monotonic()
+        if self.rate_limiter:
+            self.rate_limiter.transfer(len(line))
+        if self._events:
+            self._received(len(line), literal=bool(LITERAL_HEADER.search(line)))
+        return line
+
+    def _received(self, size: int, literal: bool = False) -> None:
+        """Counts received data for the oldest command in progress"""
+        event = next(iter(self._events.values()), None)
+        if event is not None:
+            event.bytes_received += size
+            event.literals_received += literal
+
+    def _finish(self, tag: bytes, status: str) -> None:
+        """Notifies observers about completed command"""
+        with self._lock:
+            self._pending.discard(tag)
+        event = self._events.pop(tag, None)
+        if event is None:
+            return
+        event.status = status
+        event.duration = time.monotonic() - event.started
+        for observer in self.observers:
+            observer.after_command(event)
+
+    def cancel(self) -> None:
+        """Interrupts running command; may be called from another thread.
+        Does nothing when no command is in progress."""
+        with self._lock:
+            if not self._pending:
+                return
+            self.cancelled = True
+            sock = getattr(self.connection, "sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        """Closes connection without logging out"""
+        with self._lock:
+            if self.connection.state == "LOGOUT":
+                return
+            self.connection.state = "LOGOUT"
+            self._pending.clear()
+        try:
+            self.connection.shutdown()
+        except OSError:
+            pass
+        if self.on_close:
+            self.on_close()
+
+    def _command_name(self, data: bytes) -> Optional[str]:
+        """Returns name of the command sent in data, e.g. "UID FETCH" """
+        words = data.split(None, 3)
+        if len(words) < 2 or words[0] != self._tag:
+            return None
+        name = words[1]
+        if name.upper() == b"UID" and len(words) > 2:
+            name += b" " + words[2]
+        return name.decode("ascii", "replace").upper()
+
+    def _remaining(self) -> Optional[float]:
+        """Returns socket timeout for the next socket operation"""
+        deadlines = [d for d in (self._command_deadline, self.deadline) if d]
+        if not deadlines:
+            return self.timeout
+        remaining = min(deadlines) - time.monotonic()
+        if remaining <= 0:
+            self._fail(CommandTimeout, "timed out")
+        return remaining if self.timeout is None else min(remaining, self.timeout)
+
+    def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Calls socket I/O method within time left for the command"""
+        if self.cancelled:
+            self._fail(CommandCancelled, "was cancelled")
+        sock = getattr(self.connection, "sock", None)
+        if sock is not None:
+            sock.settimeout(self._remaining())
+        try:
+            result = method(*args)
+        except socket.timeout:
+            self._fail(CommandTimeout, "timed out")
+        except (OSError, ValueError):
+            if self.cancelled:
+                self._fail(CommandCancelled, "was cancelled")
+            raise
+        if self.cancelled:
+            self._fail(CommandCancelled, "was cancelled")
+        return result
+
+    def _fail(self, exception: Type[CommandTimeout], reason: str) -> NoReturn:
+        """Closes connection and raises exception naming command and
+        folder it was sent for"""
+        message = f"{self.command or 'Command'} {reason}"
+        folder = self.folder() if self.folder else None
+        if folder:
+            message += f' (folder "{folder}")'
+        for tag in list(self._events):
+            self._finish(tag, exception.__name__)
+        self.close()
+        raise exception(message)
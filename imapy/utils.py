@@ -9,14 +9,20 @@
     :copyright: (c) 2015 by Vladimir Goncharov.
     :license: MIT, see LICENSE for more details.
 """
+import re
+from functools import lru_cache
+
 from .packages import imap_utf7
 
 
+# folder names are encoded and decoded over and over again
+@lru_cache(maxsize=4096)
 def utf7_to_unicode(text):
     """Convert string in utf-7 to unicode"""
     return imap_utf7.decode(text)
 
 
+@lru_cache(maxsize=4096)
 def str_to_utf7(text):
     """Convert string to UTF-7"""
     return imap_utf7.encode(text)
@@ -40,3 +46,38 @@ def b_to_str(text):
 def str_to_b(text):
     """Convert string to bytes"""
     return text.encode("utf-8")
+
+
+def expand_sequence_set(text):
+    """Expand IMAP sequence set (e.g. "1:3,7") into a list of numbers
+    preserving the order in which they were specified
+    """
+    numbers = []
+    for part in text.split(","):
+        if ":" in part:
+            start, end = (int(n) for n in part.split(":"))
+            step = 1 if end >= start else -1
+            numbers.extend(range(start, end + step, step))
+        elif part:
+            numbers.append(int(part))
+    return numbers
+
+
+@lru_cache(maxsize=256)
+def list_pattern_to_regex(pattern, separator=None, wildcards="*%"):
+    """Compile IMAP LIST pattern into regular expression. "*" matches
+    any characters, "%" matches any characters except hierarchy separator.
+    Only characters in wildcards are treated as wildcards; wildcards
+    escaped with backslash are matched literally.
+    """
+    regexp = ""
+    parts = re.split(r"((?<!\\)[" + re.escape(wildcards) + "])", pattern)
+    for i, part in enumerate(parts):
+        # wildcards are at odd positions of the split result
+        if i % 2 == 0:
+            regexp += re.escape(part)
+        elif part == "%" and separator:
+            regexp += "[^" + re.escape(separator) + "]*"
+        else:
+            regexp += ".*"
+    return re.compile(regexp, re.DOTALL)
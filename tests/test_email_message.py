@@ -9,6 +9,7 @@ from imapy.email_message import (
     EmailParser,
     EmailRecipients,
     EmailSender,
+    FlagSet,
 )
 from imapy.exceptions import EmailParsingError
 
@@ -96,6 +97,39 @@ def test_email_message_mark(sample_email_message):
     assert EmailFlag.FLAGGED in sample_email_message.flags
 
 
+def test_email_message_unmark(sample_email_message):
+    sample_email_message.mark([EmailFlag.FLAGGED, EmailFlag.UNSEEN])
+    assert sample_email_message.flags == [EmailFlag.FLAGGED]
+    assert sample_email_message.flag_set == FlagSet.FLAGGED
+    sample_email_message.mark(EmailFlag.UNFLAGGED)
+    assert sample_email_message.flags == []
+
+
+def test_email_message_keyword_flags(sample_email_obj):
+    msg = EmailMessage(
+        folder="INBOX",
+        uid="1234",
+        flags=["$Forwarded", EmailFlag.DRAFT, EmailFlag.SEEN, "$Forwarded"],
+        email_obj=sample_email_obj,
+        imap_obj=Mock(),
+    )
+    assert msg.flags == [EmailFlag.SEEN, EmailFlag.DRAFT, "$Forwarded"]
+    assert msg.flag_set == FlagSet.SEEN | FlagSet.DRAFT
+
+
+def test_email_message_slots(sample_email_message):
+    assert not hasattr(sample_email_message, "__dict__")
+    assert not hasattr(sample_email_message.sender, "__dict__")
+    assert not hasattr(sample_email_message.recipients, "__dict__")
+    assert not hasattr(sample_email_message.recipients[0], "__dict__")
+
+
+def test_email_message_headers(sample_email_message):
+    assert sample_email_message._headers is None
+    assert sample_email_message.headers["subject"] == ["Test Subject"]
+    assert sample_email_message.headers is sample_email_message.headers
+
+
 def test_email_message_delete(sample_email_message):
     sample_email_message.delete()
     sample_email_message._imap_obj.delete_message.assert_called_once_with(
@@ -0,0 +1,73 @@
+from unittest.mock import Mock
+
+import pytest
+
+from imapy.hooks import (
+    CommandEvent,
+    Observer,
+    ParseEvent,
+    StatsCollector,
+    parse_phase,
+    percentile,
+)
+
+
+def test_percentile():
+    samples = [5, 1, 4, 2, 3]
+    assert percentile(samples, 0) == 1
+    assert percentile(samples, 50) == 3
+    assert percentile(samples, 90) == pytest.approx(4.6)
+    assert percentile(samples, 100) == 5
+    assert percentile([], 50) is None
+
+
+def test_parse_phase_notifies_observers():
+    observer = Mock(spec=Observer)
+    with parse_phase([observer], "mime", "INBOX", "7", 100):
+        observer.before_parse.assert_called_once()
+        observer.after_parse.assert_not_called()
+    event = observer.after_parse.call_args.args[0]
+    assert (event.phase, event.folder, event.uid, event.size) == (
+        "mime",
+        "INBOX",
+        "7",
+        100,
+    )
+    assert event.duration >= 0
+
+
+def test_stats_collector():
+    collector = StatsCollector(max_samples=3)
+    for duration, status in [(0.1, "OK"), (0.2, "OK"), (0.3, "NO"), (0.4, "OK")]:
+        collector.after_command(
+            CommandEvent(
+                tag="A1",
+                started=0,
+                name="UID FETCH",
+                status=status,
+                duration=duration,
+                bytes_sent=10,
+                bytes_received=100,
+            )
+        )
+    collector.after_parse(ParseEvent("mime", "INBOX", "1", 10, duration=0.5))
+    # only the last 3 samples are kept
+    assert collector.percentile("UID FETCH", 0) == 0.2
+    summary = collector.summary(percentiles=(50,))
+    assert summary["UID FETCH"] == {
+        "count": 3,
+        "p50": pytest.approx(0.3),
+        "statuses": {"OK": 3, "NO": 1},
+        "bytes_sent": 40,
+        "bytes_received": 400,
+    }
+    assert summary["parse:mime"] == {"count": 1, "p50": 0.5}
+    assert collector.percentile("NOOP", 50) is None
+
+
+def test_parse_phase_error():
+    observer = Mock(spec=Observer)
+    with pytest.raises(ValueError):
+        with parse_phase([observer], "message", "INBOX", "7", 100):
+            raise ValueError
+    assert observer.after_parse.call_args.args[0].error == "ValueError"
@@ -1,24 +1,45 @@
+import imaplib
+import io
+import re
+import socket
+import time
 from email.mime.text import MIMEText
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 
 import pytest
 
 from imapy.email_message import EmailFlag, EmailMessage
 from imapy.exceptions import (
+    AppendFailed,
+    CommandTimeout,
     ConnectionRefused,
+    ConnectionTimeout,
+    ExtensionNotSupported,
     ImapyLoggedOut,
     InvalidHost,
     NonexistentFolderError,
     UnknownEmailMessageType,
 )
+from imapy.hooks import Observer
 from imapy.imap import IMAP
 from imapy.mail_folder import MailFolder
+from imapy.pool import ConnectionPool
+from imapy.scheduler import AdaptiveBatchSize
 from imapy.query_builder import Q
+from imapy.structures import SearchResult, UIDSet
+from imapy.transport import Transport
+
+
+CAPABILITIES = b"IMAP4rev1 UNSELECT IDLE NAMESPACE QUOTA ID XLIST CHILDREN X-GM-EXT-1 UIDPLUS COMPRESS=DEFLATE ENABLE MOVE CONDSTORE ESEARCH UTF8=ACCEPT LIST-EXTENDED LIST-STATUS LITERAL- SPECIAL-USE APPENDLIMIT=35651584"
 
 
 @pytest.fixture
 def mock_imap():
-    with patch("imaplib.IMAP4_SSL"), patch("imapy.imap.IMAP._update_folder_info"):
+    with patch("imaplib.IMAP4_SSL") as mock_imap4_ssl, patch(
+        "imapy.imap.IMAP._update_folder_info"
+    ):
+        mock_imap4_ssl.return_value.response.return_value = ("CAPABILITY", [None])
+        mock_imap4_ssl.return_value.capability.return_value = ("OK", [CAPABILITIES])
         mock_imap = IMAP(
             host="imap.example.com", username="user", password="pass", ssl=True
         )
@@ -36,20 +57,13 @@ def mock_imap():
         mock_mail_folder.get_folders.return_value = ["INBOX", "Sent", "Trash"]
         mock_mail_folder.get_separator.return_value = "/"
         mock_mail_folder.separator = "/"
+        mock_mail_folder.folders = ["INBOX", "Sent", "Trash"]
         mock_mail_folder.get_children.return_value = []
         mock_mail_folder.get_parent_name.return_value = "INBOX"
 
         mock_imap.mail_folder_class = mock_mail_folder
 
-        mock_imap.folder_capabilities = {"INBOX": ["CAPABILITY1", "CAPABILITY2"]}
-
         mock_imap.imap.list.return_value = ("OK", [b'(\\HasNoChildren) "/" "INBOX"'])
-        mock_imap.imap.capability.return_value = (
-            "OK",
-            [
-                b"IMAP4rev1 UNSELECT IDLE NAMESPACE QUOTA ID XLIST CHILDREN X-GM-EXT-1 UIDPLUS COMPRESS=DEFLATE ENABLE MOVE CONDSTORE ESEARCH UTF8=ACCEPT LIST-EXTENDED LIST-STATUS LITERAL- SPECIAL-USE APPENDLIMIT=35651584"
-            ],
-        )
 
         yield mock_imap
 
@@ -68,6 +82,105 @@ def mock_imap_base():
         yield mock_imap4, mock_imap4_ssl
 
 
+class ScriptedIMAP4(imaplib.IMAP4):
+    """imaplib connection to an in-memory server which answers every
+    command with the next scripted response (untagged lines followed by
+    tagged status). Data sent by client is kept in `sent`, complete
+    commands (including literals) in `commands`."""
+
+    def __init__(self):
+        self.sent = []
+        self.commands = []
+        self.replies = []
+        self._received = b""
+        self._pending = b""
+        self._literal = 0
+        super().__init__()
+        # forget CAPABILITY command sent when connecting
+        self.sent, self.commands = [], []
+        self.tagpre = b"A"
+        self.tagre = re.compile(rb"(?P<tag>A\d+) (?P<type>[A-Z]+) (?P<data>.*)")
+        self.tagnum = 1
+        self.state = "SELECTED"
+        # seconds it takes to receive every literal
+        self.read_delay = 0
+
+    def open(self, host="", port=imaplib.IMAP4_PORT, timeout=None):
+        self.file = io.BytesIO(b"* OK [CAPABILITY IMAP4rev1] ready\r\n")
+
+    def reply(self, *untagged, status=b"OK done"):
+        """Queues response to the next command; server never completes
+        the command when status is None"""
+        self.replies.append((untagged, status))
+
+    def read(self, size):
+        time.sleep(self.read_delay)
+        return super().read(size)
+
+    def readline(self):
+        line = super().readline()
+        if not line:
+            # nothing was scripted: server does not answer
+            raise socket.timeout("timed out")
+        return line
+
+    def shutdown(self):
+        self.file.close()
+
+    def _write(self, data):
+        position = self.file.tell()
+        self.file.seek(0, io.SEEK_END)
+        self.file.write(data)
+        self.file.seek(position)
+
+    def send(self, data):
+        self.sent.append(bytes(data))
+        self._pending += bytes(data)
+        while True:
+            if self._literal:
+                part = self._pending[: self._literal]
+                self._pending = self._pending[len(part) :]
+                self._received += part
+                self._literal -= len(part)
+                if self._literal:
+                    return
+            end = self._pending.find(b"\r\n")
+            if end < 0:
+                return
+            line, self._pending = self._pending[: end + 2], self._pending[end + 2 :]
+            self._received += line
+            literal = re.search(rb"\{(\d+)(\+?)\}\r\n$", line)
+            if literal:
+                self._literal = int(literal.group(1))
+                if not literal.group(2):
+                    self._write(b"+ go ahead\r\n")
+                continue
+            self._complete(self._received)
+            self._received = b""
+
+    def _complete(self, command):
+        self.commands.append(command)
+        untagged, status = self.replies.pop(0) if self.replies else ((), b"OK done")
+        for response in untagged:
+            self._write(response)
+        if status is not None:
+            self._write(command.split(b" ", 1)[0] + b" " + status + b"\r\n")
+
+
+@pytest.fixture
+def server(mock_imap):
+    """Replaces mocked imaplib connection with one talking to a scripted
+    server, so that tests check data sent over the wire"""
+    mock_imap.imap = ScriptedIMAP4()
+    mock_imap.transport = Transport(
+        mock_imap.imap,
+        folder=lambda: mock_imap.selected_folder,
+        on_close=mock_imap._connection_closed,
+        observers=mock_imap.observers,
+    )
+    return mock_imap.imap
+
+
 @patch("imapy.imap.IMAP.connect")
 def test_connect_custom_port(mock_connect, mock_imap_base):
     _, mock_imap4_ssl = mock_imap_base
@@ -120,19 +233,197 @@ def test_connect_invalid_host():
             ).connect()
 
 
+@patch("imapy.imap.IMAP.connect")
+def test_connect_timeouts(mock_connect, mock_imap_base):
+    _, mock_imap4_ssl = mock_imap_base
+    imap = IMAP(
+        host="imap.example.com",
+        username="user",
+        password="pass",
+        connect_timeout=10,
+        command_timeout=30,
+    )
+    mock_imap4_ssl.assert_called_once_with("imap.example.com", port=993, timeout=10)
+    assert imap.transport.timeout == 10
+    assert imap.transport.command_timeout == 30
+
+
+def test_connect_timed_out():
+    with patch("imaplib.IMAP4_SSL", side_effect=socket.timeout):
+        with pytest.raises(ConnectionTimeout, match="imap.example.com:993"):
+            IMAP(
+                host="imap.example.com",
+                username="user",
+                password="pass",
+                connect_timeout=1,
+            )
+
+
+def test_deadline(mock_imap):
+    with mock_imap.deadline(60):
+        outer = mock_imap.transport.deadline
+        with mock_imap.deadline(3600):
+            # inner block cannot extend the deadline
+            assert mock_imap.transport.deadline == outer
+        with mock_imap.deadline(1):
+            assert mock_imap.transport.deadline < outer
+    assert mock_imap.transport.deadline is None
+
+
+def test_command_timeout_closes_session(mock_imap):
+    mock_imap._selected_mailbox = "INBOX"
+    mock_imap.transport.on_close()
+    assert not mock_imap.logged_in
+    assert mock_imap.selected_folder == "INBOX"
+    with pytest.raises(ImapyLoggedOut):
+        mock_imap.emails()
+
+
+def test_reconnect(mock_imap):
+    mock_imap.logged_in = False
+    mock_imap.imap.is_readonly = True
+    observer = Mock(spec=Observer)
+    mock_imap.observers.append(observer)
+    with patch.object(IMAP, "_open") as mock_open, patch.object(
+        IMAP, "connect"
+    ) as mock_connect, patch.object(IMAP, "folder") as mock_folder:
+        mock_imap.reconnect()
+    mock_open.assert_called_once_with()
+    mock_connect.assert_called_once_with()
+    mock_folder.assert_called_once_with("INBOX", True)
+    mock_imap.imap.logout.assert_not_called()
+    observer.after_reconnect.assert_called_once_with()
+
+
+def test_connect_capabilities_from_login_response(mock_imap_base):
+    _, mock_imap4_ssl = mock_imap_base
+    mock_instance = mock_imap4_ssl.return_value
+    mock_instance.response.return_value = ("CAPABILITY", [b"IMAP4rev1 MOVE"])
+    mock_instance.list.return_value = ("OK", [b'(\\HasNoChildren) "/" "INBOX"'])
+
+    imap = IMAP(host="imap.example.com", username="user", password="pass")
+    assert imap.capabilities == ["IMAP4REV1", "MOVE"]
+    assert imap.has_capability("move")
+    mock_instance.capability.assert_not_called()
+
+
+def test_connect_capabilities_requested_once(mock_imap_base):
+    _, mock_imap4_ssl = mock_imap_base
+    mock_instance = mock_imap4_ssl.return_value
+    mock_instance.response.return_value = ("CAPABILITY", [None])
+    mock_instance.capability.return_value = ("OK", [b"IMAP4rev1 UIDPLUS"])
+    mock_instance.select.return_value = ("OK", [b"1"])
+    mock_instance.list.return_value = (
+        "OK",
+        [b'(\\HasNoChildren) "/" "INBOX"', b'(\\HasNoChildren) "/" "Sent"'],
+    )
+
+    imap = IMAP(host="imap.example.com", username="user", password="pass")
+    imap.folder("INBOX")
+    imap.folder("Sent")
+    assert imap.capabilities == ["IMAP4REV1", "UIDPLUS"]
+    mock_instance.capability.assert_called_once()
+
+
+def test_connect_starttls(mock_imap_base):
+    mock_imap4, _ = mock_imap_base
+    mock_instance = mock_imap4.return_value
+    mock_instance.response.return_value = ("CAPABILITY", [b"IMAP4rev1"])
+    mock_instance.list.return_value = ("OK", [b'(\\HasNoChildren) "/" "INBOX"'])
+    IMAP(
+        host="imap.example.com",
+        username="user",
+        password="pass",
+        ssl=False,
+        starttls=True,
+    )
+    mock_instance.starttls.assert_called_once()
+
+
+def test_enable_refreshes_capabilities(mock_imap):
+    mock_imap.imap.response.return_value = ("CAPABILITY", [None])
+    mock_imap.imap.capability.return_value = ("OK", [b"IMAP4rev1 UTF8=ACCEPT"])
+    mock_imap.enable("UTF8=ACCEPT")
+    mock_imap.imap.enable.assert_called_once_with("UTF8=ACCEPT")
+    assert mock_imap.capabilities == ["IMAP4REV1", "UTF8=ACCEPT"]
+
+
 def test_logout(mock_imap):
     mock_imap.logout()
-    mock_imap.imap.close.assert_called_once()
+    mock_imap.imap.close.assert_not_called()
     mock_imap.imap.logout.assert_called_once()
     assert mock_imap.logged_in is False
     assert mock_imap.selected_folder is None
     assert mock_imap.selected_folder_utf7 is None
 
 
+def test_logout_expunge_pending(mock_imap):
+    mock_imap._expunge_pending = True
+    mock_imap.logout()
+    mock_imap.imap.close.assert_called_once()
+    mock_imap.imap.logout.assert_called_once()
+
+
+def test_command_timeout_in_with_block(mock_imap, server):
+    server.reply(status=None)
+    with pytest.raises(CommandTimeout):
+        with mock_imap:
+            mock_imap.info()
+    # connection was closed by the transport, so LOGOUT was not sent
+    assert _command_names(server) == ["STATUS"]
+    assert server.state == "LOGOUT"
+    assert mock_imap.logged_in is False
+    assert mock_imap.selected_folder is None
+
+
 def test_folders(mock_imap):
     assert mock_imap.folders() == ["INBOX", "Sent", "Trash"]
 
 
+def test_folders_search(mock_imap):
+    mock_imap.mail_folders = ["INBOX", "Work", "Work/Projects", "Archive/Work", "50%"]
+    assert mock_imap.folders("Wo*") == ["Work", "Archive/Work"]
+    assert mock_imap.folders("Proj%") == []
+    assert mock_imap.folders("50%") == ["50%"]
+
+
+def test_list_folders(mock_imap):
+    mock_imap.imap.list.return_value = (
+        "OK",
+        [b'(\\HasNoChildren) "/" "Work/Projects"'],
+    )
+    assert mock_imap.list_folders("Work/%") == ["Work/Projects"]
+    mock_imap.imap.list.assert_called_once_with('""', '"Work/%"')
+    mock_imap.mail_folder_class.get_folders.assert_not_called()
+
+
+def test_list_folders_extended(mock_imap):
+    mock_imap.imap._simple_command.return_value = ("OK", [None])
+    mock_imap.imap._untagged_response.return_value = (
+        "OK",
+        [b'(\\HasNoChildren \\Subscribed) "/" "Sent" ("CHILDINFO" ("SUBSCRIBED"))'],
+    )
+    folders = mock_imap.list_folders(
+        selection=["SUBSCRIBED"], return_options=["CHILDREN"], update=True
+    )
+    mock_imap.imap._simple_command.assert_called_once_with(
+        "LIST", "(SUBSCRIBED)", '""', '"*"', "RETURN", "(CHILDREN)"
+    )
+    mock_imap.mail_folder_class.get_folders.assert_called_once_with(
+        mock_imap.imap._untagged_response.return_value
+    )
+    assert folders == ["INBOX", "Sent", "Trash"]
+
+
+def test_list_folders_without_list_extended(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    mock_imap.imap.lsub.return_value = ("OK", [b'() "/" "Sent"'])
+    assert mock_imap.list_folders(selection=["SUBSCRIBED"]) == ["Sent"]
+    mock_imap.imap.lsub.assert_called_once_with('""', '"*"')
+    with pytest.raises(ExtensionNotSupported):
+        mock_imap.list_folders(selection=["SPECIAL-USE"])
+
+
 def test_folder_select(mock_imap):
     mock_imap.imap.select.return_value = ("OK", [b"1"])
     mock_imap.imap.close.reset_mock()
@@ -157,6 +448,55 @@ def test_folder_select(mock_imap):
     assert mock_imap.imap.select.call_count == 2
 
 
+def _command_names(server):
+    return [c.split()[1].decode() for c in server.commands]
+
+
+def test_folder_skips_reselect(mock_imap, server):
+    server.state = "AUTH"
+    mock_imap.folder("Sent")
+    mock_imap.folder("Sent")
+    mock_imap.folder("INBOX")
+    assert server.commands == [b'A1 SELECT "Sent"\r\n', b'A2 SELECT "INBOX"\r\n']
+
+
+def test_folder_examine(mock_imap, server):
+    server.state = "AUTH"
+    mock_imap.examine("Sent")
+    mock_imap.folder("Sent", readonly=True)
+    assert server.commands == [b'A1 EXAMINE "Sent"\r\n']
+
+    # switching to read-write mode requires new SELECT
+    mock_imap.folder("Sent")
+    assert server.commands[1:] == [b'A2 SELECT "Sent"\r\n']
+
+
+def test_folder_unselect(mock_imap, server):
+    server.state = "AUTH"
+    mock_imap.capabilities = ["IMAP4REV1", "UNSELECT"]
+    mock_imap.folder("Sent").folder()
+    assert _command_names(server) == ["SELECT", "UNSELECT"]
+    assert mock_imap.selected_folder is None
+
+
+def test_folder_closes_after_delete(mock_imap, server):
+    server.state = "AUTH"
+    mock_imap.capabilities = ["IMAP4REV1", "UNSELECT"]
+    mock_imap.folder("Sent")
+    mock_imap.delete_message("100", "Sent")
+    mock_imap.folder("INBOX")
+    mock_imap.delete_many(["1"], expunge=False)
+    mock_imap.folder()
+    assert _command_names(server) == [
+        "SELECT",
+        "UID",
+        "CLOSE",
+        "SELECT",
+        "UID",
+        "CLOSE",
+    ]
+
+
 def test_folder_nonexistent(mock_imap):
     with pytest.raises(NonexistentFolderError):
         mock_imap.folder("Nonexistent")
@@ -206,6 +546,55 @@ def test_append(mock_imap):
         mock_imap.append("Not a MIMEBase object")
 
 
+def test_append_raw_message(mock_imap, server, tmp_path):
+    mock_imap.capabilities = ["IMAP4REV1", "LITERAL+"]
+    path = tmp_path / "message.eml"
+    path.write_bytes(b"Subject: Hi\r\n\r\nBody")
+
+    mock_imap.append(path, flags=[EmailFlag.SEEN])
+    assert server.commands == [
+        b'A1 APPEND "INBOX" (\\SEEN) {19+}\r\nSubject: Hi\r\n\r\nBody\r\n'
+    ]
+
+
+def test_append_many_multiappend(mock_imap, server):
+    mock_imap.capabilities = ["IMAP4REV1", "MULTIAPPEND", "LITERAL+", "UIDPLUS"]
+    server.reply(status=b"OK [APPENDUID 38505 10:11] done")
+    uids = mock_imap.append_many(
+        [b"Subject: 1\r\n\r\nHi", b"Subject: 2\r\n\r\nHo"], flags=[EmailFlag.SEEN]
+    )
+
+    assert server.commands == [
+        b'A1 APPEND "INBOX" (\\SEEN) {16+}\r\nSubject: 1\r\n\r\nHi'
+        b" (\\SEEN) {16+}\r\nSubject: 2\r\n\r\nHo\r\n"
+    ]
+    assert uids == ["10", "11"]
+
+
+def test_append_many_synchronizing_literals(mock_imap, server):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    uids = mock_imap.append_many([b"one", b"two"])
+
+    # literal is sent after continuation request of the server
+    assert server.sent == [
+        b'A1 APPEND "INBOX" {3}\r\n',
+        b"one",
+        b"\r\n",
+        b'A2 APPEND "INBOX" {3}\r\n',
+        b"two",
+        b"\r\n",
+    ]
+    assert len(server.commands) == 2
+    assert uids == []
+
+
+def test_append_many_failure(mock_imap, server):
+    mock_imap.capabilities = ["IMAP4REV1", "LITERAL+"]
+    server.reply(status=b"NO [TRYCREATE] no such mailbox")
+    with pytest.raises(AppendFailed):
+        mock_imap.append_many([b"one"])
+
+
 def test_emails_by_sequence(mock_imap):
     mock_imap.imap.fetch.return_value = ("OK", [b"1 (UID 100)"])
     mock_imap._fetch_emails_info = Mock(return_value=[Mock(spec=EmailMessage)])
@@ -216,6 +605,7 @@ def test_emails_by_sequence(mock_imap):
 
 
 def test_emails_by_query(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
     query = Q().sender("test@example.com").seen()
     mock_imap.imap.uid.return_value = ("OK", [b"100 101 102"])
     mock_imap._fetch_emails_info = Mock(return_value=[Mock(spec=EmailMessage)] * 3)
@@ -224,6 +614,408 @@ def test_emails_by_query(mock_imap):
     mock_imap.imap.uid.assert_called_once_with(
         "SEARCH", "FROM", '"test@example.com"', "SEEN"
     )
+    mock_imap._fetch_emails_info.assert_called_once_with(UIDSet([100, 101, 102]))
+
+
+def test_emails_by_query_esearch(mock_imap):
+    mock_imap.imap.untagged_responses = {}
+
+    def uid_command(*args):
+        mock_imap.imap.untagged_responses["ESEARCH"] = [
+            b'(TAG "A5") UID ALL 4:18,21,28'
+        ]
+        return ("OK", [None])
+
+    mock_imap.imap.uid.side_effect = uid_command
+    mock_imap._fetch_emails_info = Mock(return_value=[])
+    mock_imap.emails(Q().seen())
+    mock_imap.imap.uid.assert_called_once_with("SEARCH", "RETURN", "(ALL)", "SEEN")
+    mock_imap._fetch_emails_info.assert_called_once_with(UIDSet.parse("4:18,21,28"))
+
+
+def test_emails_sorted_by_server(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1", "SORT"]
+    mock_imap.imap.uid.return_value = ("OK", [b"9 7 5 3 1"])
+    mock_imap._fetch_emails_info = Mock(
+        return_value=[Mock(spec=EmailMessage, uid=uid) for uid in ("5", "7")]
+    )
+    emails = mock_imap.emails(
+        Q().unseen(), sort=["REVERSE", "ARRIVAL"], limit=2, offset=1
+    )
+    mock_imap.imap.uid.assert_called_once_with(
+        "SORT", "(REVERSE ARRIVAL)", "US-ASCII", "UNSEEN"
+    )
+    mock_imap._fetch_emails_info.assert_called_once_with(UIDSet([5, 7]))
+    assert [e.uid for e in emails] == ["7", "5"]
+
+
+def test_emails_sorted_locally(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    mock_imap.imap.uid.side_effect = [
+        ("OK", [b"1 2 3"]),
+        (
+            "OK",
+            [
+                b'1 (UID 1 INTERNALDATE "01-Jan-2024 00:00:00 +0000" RFC822.SIZE 5)',
+                b'2 (UID 2 INTERNALDATE "03-Jan-2024 00:00:00 +0000" RFC822.SIZE 5)',
+                b'3 (UID 3 INTERNALDATE "02-Jan-2024 00:00:00 +0000" RFC822.SIZE 5)',
+            ],
+        ),
+    ]
+    mock_imap._fetch_emails_info = Mock(
+        return_value=[Mock(spec=EmailMessage, uid=uid) for uid in ("2", "3")]
+    )
+    emails = mock_imap.emails(Q().unseen(), sort=["REVERSE", "ARRIVAL"], limit=2)
+    assert mock_imap.imap.uid.call_args_list[1] == call(
+        "FETCH", "1:3", "(UID INTERNALDATE RFC822.SIZE)"
+    )
+    mock_imap._fetch_emails_info.assert_called_once_with(UIDSet([2, 3]))
+    assert [e.uid for e in emails] == ["2", "3"]
+
+
+def test_emails_page_without_sort(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    mock_imap.imap.uid.return_value = ("OK", [b"1 2 3 4 5"])
+    mock_imap._fetch_emails_info = Mock(return_value=[])
+    mock_imap.emails(Q().unseen(), limit=2, offset=3)
+    mock_imap._fetch_emails_info.assert_called_once_with(UIDSet([4, 5]))
+
+
+def test_search_page_partial(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1", "ESEARCH", "PARTIAL"]
+    mock_imap.imap.untagged_responses = {}
+
+    def uid_command(*args):
+        mock_imap.imap.untagged_responses["ESEARCH"] = [
+            b'(TAG "A5") UID PARTIAL (-51:-100 120:150,170:188) COUNT 1000'
+        ]
+        return ("OK", [None])
+
+    mock_imap.imap.uid.side_effect = uid_command
+    page = mock_imap.search_page(
+        Q().unseen(), page_size=50, cursor=50, reverse=True, fetch=False
+    )
+    mock_imap.imap.uid.assert_called_once_with(
+        "SEARCH", "RETURN", "(COUNT PARTIAL -51:-100)", "UNSEEN"
+    )
+    assert page.total == 1000
+    assert page.cursor == 100
+    assert page.uids[:2] == [188, 187]
+    assert len(page.uids) == 50
+    assert page.emails == []
+
+
+def test_search_page_context_search_reverse(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1", "ESEARCH", "CONTEXT=SEARCH"]
+    mock_imap.imap.untagged_responses = {}
+    responses = [
+        b'(TAG "A5") UID COUNT 120',
+        b'(TAG "A6") UID PARTIAL (21:70 101:150)',
+    ]
+
+    def uid_command(*args):
+        mock_imap.imap.untagged_responses["ESEARCH"] = [responses.pop(0)]
+        return ("OK", [None])
+
+    mock_imap.imap.uid.side_effect = uid_command
+    page = mock_imap.search_page(
+        Q().unseen(), page_size=50, cursor=50, reverse=True, fetch=False
+    )
+    assert mock_imap.imap.uid.call_args_list == [
+        call("SEARCH", "RETURN", "(COUNT)", "UNSEEN"),
+        call("SEARCH", "RETURN", "(PARTIAL 21:70)", "UNSEEN"),
+    ]
+    assert page.total == 120
+    assert page.uids[:2] == [150, 149]
+    assert len(page.uids) == 50
+    assert page.cursor == 100
+
+
+def test_search_page_without_partial(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    mock_imap.imap.uid.return_value = ("OK", [b"1 2 3 4 5"])
+    mock_imap._fetch_emails_info = Mock(
+        return_value=[Mock(spec=EmailMessage, uid=uid) for uid in ("1", "2")]
+    )
+    page = mock_imap.search_page(Q().unseen(), page_size=2, cursor=3, reverse=True)
+    mock_imap._fetch_emails_info.assert_called_once_with(UIDSet([1, 2]))
+    assert page.uids == [2, 1]
+    assert [e.uid for e in page.emails] == ["2", "1"]
+    assert page.total == 5
+    assert page.cursor is None
+
+
+def test_save_search(mock_imap, server):
+    mock_imap.capabilities = ["IMAP4REV1", "ESEARCH", "SEARCHRES", "MOVE"]
+    server.state = "AUTH"
+    server.reply()
+    server.reply(b'* ESEARCH (TAG "A2") UID COUNT 3\r\n')
+    mock_imap.folder("INBOX")
+    saved = mock_imap.save_search(Q().unseen())
+    assert len(saved) == 3
+    assert str(saved) == "$"
+    mock_imap.mark_many(saved, [EmailFlag.SEEN])
+    assert mock_imap.emails(saved) == []
+    mock_imap.move_many(saved, "Trash")
+    assert server.commands[1:] == [
+        b"A2 UID SEARCH RETURN (SAVE COUNT) UNSEEN\r\n",
+        b"A3 UID STORE $ +FLAGS.SILENT (\\SEEN)\r\n",
+        b"A4 UID FETCH $ (FLAGS BODY.PEEK[])\r\n",
+        b'A5 UID MOVE $ "Trash"\r\n',
+    ]
+
+
+def test_save_search_repeated_after_reselect(mock_imap, server):
+    mock_imap.capabilities = ["IMAP4REV1", "ESEARCH", "SEARCHRES", "MOVE"]
+    server.state = "AUTH"
+    server.reply()
+    server.reply(b'* ESEARCH (TAG "A2") UID COUNT 3\r\n')
+    server.reply()
+    server.reply()
+    server.reply(b'* ESEARCH (TAG "A5") UID COUNT 3\r\n')
+    mock_imap.folder("INBOX")
+    saved = mock_imap.save_search(Q().unseen())
+    mock_imap.folder("Sent")
+    mock_imap.copy_many(saved, "Trash")
+    # INBOX was reselected, so $ had to be saved again
+    assert server.commands == [
+        b'A1 SELECT "INBOX"\r\n',
+        b"A2 UID SEARCH RETURN (SAVE COUNT) UNSEEN\r\n",
+        b'A3 SELECT "Sent"\r\n',
+        b'A4 SELECT "INBOX"\r\n',
+        b"A5 UID SEARCH RETURN (SAVE COUNT) UNSEEN\r\n",
+        b'A6 UID COPY $ "Trash"\r\n',
+        b'A7 SELECT "Sent"\r\n',
+    ]
+    assert mock_imap.selected_folder == "Sent"
+
+
+def test_save_search_without_searchres(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1", "UIDPLUS"]
+    mock_imap.imap.uid.return_value = ("OK", [b"4 5 6 9"])
+    saved = mock_imap.save_search(Q().unseen())
+    mock_imap.delete_many(saved)
+    mock_imap._fetch_emails_info = Mock(return_value=[])
+    mock_imap.emails(saved)
+    assert mock_imap.imap.uid.call_args_list == [
+        call("SEARCH", "UNSEEN"),
+        call("STORE", "4:6,9", "+FLAGS.SILENT", "(\\Deleted)"),
+        call("EXPUNGE", "4:6,9"),
+    ]
+    mock_imap._fetch_emails_info.assert_called_once_with(saved)
+
+
+def test_search_esearch(mock_imap):
+    mock_imap.imap.untagged_responses = {}
+
+    def uid_command(*args):
+        mock_imap.imap.untagged_responses["ESEARCH"] = [
+            b'(TAG "A5") UID MIN 4 MAX 28 COUNT 17'
+        ]
+        return ("OK", [None])
+
+    mock_imap.imap.uid.side_effect = uid_command
+    result = mock_imap.search(Q().seen(), ["MIN", "MAX", "COUNT"])
+    mock_imap.imap.uid.assert_called_once_with(
+        "SEARCH", "RETURN", "(MIN MAX COUNT)", "SEEN"
+    )
+    assert result == SearchResult(min=4, max=28, count=17)
+
+
+def test_search_esearch_nothing_found(mock_imap):
+    mock_imap.imap.untagged_responses = {}
+
+    def uid_command(*args):
+        mock_imap.imap.untagged_responses["ESEARCH"] = [b'(TAG "A5") UID']
+        return ("OK", [None])
+
+    mock_imap.imap.uid.side_effect = uid_command
+    result = mock_imap.search(Q().seen())
+    assert result == SearchResult(count=0, uids=UIDSet())
+
+
+def test_search_without_esearch(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    mock_imap.imap.uid.return_value = ("OK", [b"7 3 4 5"])
+    result = mock_imap.search(Q().seen(), ["MAX", "COUNT"])
+    mock_imap.imap.uid.assert_called_once_with("SEARCH", "SEEN")
+    assert result == SearchResult(max=7, count=4)
+
+
+def test_search_all_multisearch(mock_imap):
+    mock_imap.capabilities = mock_imap.capabilities + ["MULTISEARCH"]
+    mock_imap.imap.untagged_responses = {}
+    mock_imap.imap.tagged_commands = {"A1": None}
+    mock_imap.imap._command.return_value = "A1"
+    responses = [
+        b'(TAG "A1" MAILBOX "INBOX" UIDVALIDITY 1) UID ALL 3:4',
+        b'(TAG "A1" MAILBOX "&BD8EQAQ4BDIENQRC-" UIDVALIDITY 5) UID ALL 7',
+    ]
+
+    def get_response():
+        mock_imap.imap.untagged_responses["ESEARCH"] = [responses.pop(0)]
+        if not responses:
+            mock_imap.imap.tagged_commands["A1"] = ("OK", [b"Done"])
+
+    mock_imap.imap._get_response.side_effect = get_response
+    mock_imap.mail_folders = ["INBOX", "привет"]
+    results = mock_imap.search_all(Q().seen(), folders=["INBOX", "привет"])
+    # first response is yielded before the second one is read
+    assert next(results) == ("INBOX", 3)
+    assert mock_imap.imap._get_response.call_count == 1
+    assert list(results) == [("INBOX", 4), ("привет", 7)]
+    mock_imap.imap._command.assert_called_once_with(
+        "ESEARCH",
+        "IN",
+        '(mailboxes ("INBOX" "&BD8EQAQ4BDIENQRC-"))',
+        "RETURN",
+        "(ALL)",
+        "SEEN",
+    )
+    mock_imap.imap._command_complete.assert_called_once_with("ESEARCH", "A1")
+
+
+def test_search_all_fan_out(mock_imap):
+    class Connection:
+        def __init__(self):
+            self.logged_in = True
+
+        def examine(self, folder_name):
+            self.folder_name = folder_name
+
+        def search(self, query, result):
+            uids = {"INBOX": [1, 2], "Sent": [], "Trash": [5]}[self.folder_name]
+            return SearchResult(uids=UIDSet(uids))
+
+        def logout(self):
+            self.logged_in = False
+
+    pool = ConnectionPool(Connection, size=2)
+    results = sorted(mock_imap.search_all(Q().seen(), pool=pool))
+    assert results == [("INBOX", 1), ("INBOX", 2), ("Trash", 5)]
+    assert len(pool.connections) <= 2
+    # passed pool stays open
+    assert all(c.logged_in for c in pool.connections)
+    mock_imap.imap._command.assert_not_called()
+
+
+def test_search_all_nonexistent_folder(mock_imap):
+    with pytest.raises(NonexistentFolderError):
+        mock_imap.search_all(Q().seen(), folders=["Spam"])
+
+
+def _fetch_response(number, items, data=None, trailer=b")"):
+    """Returns untagged FETCH response with optional message data literal"""
+    line = b"* %d FETCH (%s" % (number, items)
+    if data is None:
+        return line + b")\r\n"
+    return line + b" {%d}\r\n" % len(data) + data + trailer + b"\r\n"
+
+
+def test_iter_emails_by_byte_budget(mock_imap, server):
+    raw = b"From: a@example.com\r\n\r\n"
+    server.reply(
+        _fetch_response(1, b"UID 3 RFC822.SIZE 600"),
+        _fetch_response(2, b"UID 4 RFC822.SIZE 300"),
+        _fetch_response(3, b"UID 5 RFC822.SIZE 500"),
+    )
+    server.reply(
+        _fetch_response(1, b"UID 3 FLAGS (\\Seen) BODY[]", raw),
+        _fetch_response(2, b"UID 4 FLAGS () BODY[]", raw),
+    )
+    server.reply(_fetch_response(3, b"UID 5 FLAGS () BODY[]", raw))
+    emails = list(mock_imap.iter_emails(["3", "4", "5"], byte_budget=1000))
+    assert [e.uid for e in emails] == ["3", "4", "5"]
+    assert emails[0].flags == [EmailFlag.SEEN]
+    assert server.commands == [
+        b"A1 UID FETCH 3:5 (RFC822.SIZE)\r\n",
+        b"A2 UID FETCH 3:4 (FLAGS BODY.PEEK[])\r\n",
+        b"A3 UID FETCH 5 (FLAGS BODY.PEEK[])\r\n",
+    ]
+    # fixed budget does not change adaptive one
+    assert mock_imap.fetch_batch_size.batches == 0
+
+
+def test_iter_emails_large_message(mock_imap, server):
+    raw = b"From: a@example.com\r\nSubject: Large\r\n\r\n" + b"x" * 3
+    server.reply(_fetch_response(1, b"UID 7 RFC822.SIZE 42"))
+    server.reply(
+        _fetch_response(1, b"BODY[]<0>", raw[:16], trailer=b" UID 7 FLAGS (\\Flagged))")
+    )
+    server.reply(_fetch_response(1, b"UID 7 BODY[]<16>", raw[16:32]))
+    server.reply(_fetch_response(1, b"UID 7 BODY[]<32>", raw[32:]))
+    emails = list(mock_imap.iter_emails(UIDSet([7]), byte_budget=16))
+    assert len(emails) == 1
+    assert emails[0].uid == "7"
+    assert emails[0].flags == [EmailFlag.FLAGGED]
+    assert emails[0].subject == "Large"
+    assert server.commands[1:] == [
+        b"A2 UID FETCH 7 (FLAGS BODY.PEEK[]<0.16>)\r\n",
+        b"A3 UID FETCH 7 (BODY.PEEK[]<16.16>)\r\n",
+        b"A4 UID FETCH 7 (BODY.PEEK[]<32.16>)\r\n",
+    ]
+
+
+def test_iter_emails_large_message_size_under_reported(mock_imap, server):
+    raw = b"From: a@example.com\r\nSubject: Large\r\n\r\n" + b"x" * 5
+    server.reply(_fetch_response(1, b"UID 7 RFC822.SIZE 30"))
+    server.reply(_fetch_response(1, b"UID 7 FLAGS () BODY[]<0>", raw[:22]))
+    server.reply(_fetch_response(1, b"UID 7 BODY[]<22>", raw[22:]))
+    server.reply(_fetch_response(1, b'UID 7 BODY[]<44> ""'))
+    emails = list(mock_imap.iter_emails(UIDSet([7]), byte_budget=22))
+    assert emails[0].subject == "Large"
+    assert emails[0].text[0]["text"] == "xxxxx"
+    # parts are requested until the server sends an empty one
+    assert [c.split()[-1] for c in server.commands[1:]] == [
+        b"BODY.PEEK[]<0.22>)",
+        b"(BODY.PEEK[]<22.22>)",
+        b"(BODY.PEEK[]<44.22>)",
+    ]
+
+
+def test_iter_emails_adaptive_batch_size(mock_imap, server):
+    mock_imap.fetch_batch_size = AdaptiveBatchSize(
+        size=1000, min_size=500, max_size=4000, increase=1000, slowdown=0
+    )
+    raw = b"From: a@example.com\r\n\r\n" + b"x" * 577
+    server.reply(
+        *[_fetch_response(i, b"UID %d RFC822.SIZE 600" % i) for i in range(1, 6)]
+    )
+    for batch in ([1], [2, 3, 4], [5]):
+        server.reply(
+            *[_fetch_response(i, b"UID %d FLAGS () BODY[]" % i, raw) for i in batch]
+        )
+    emails = list(mock_imap.iter_emails(UIDSet([1, 2, 3, 4, 5])))
+    assert [e.uid for e in emails] == ["1", "2", "3", "4", "5"]
+    # budget grows after every batch which used it
+    assert [c.split()[3] for c in server.commands[1:]] == [b"1", b"2:4", b"5"]
+    assert mock_imap.fetch_batch_size.stats()["sizes"] == [1000, 2000, 3000]
+
+
+def test_iter_emails_slow_steady_server(mock_imap, server):
+    mock_imap.fetch_batch_size = AdaptiveBatchSize(
+        size=1000, min_size=500, max_size=4000, increase=1000, max_ttfb=0.05
+    )
+    raw = b"From: a@example.com\r\n\r\n" + b"x" * 577
+    server.reply(_fetch_response(1, b"UID 1 RFC822.SIZE 600"))
+    server.reply(_fetch_response(1, b"UID 1 FLAGS () BODY[]", raw))
+    # first response line arrives at once, message data takes longer
+    server.read_delay = 0.1
+    list(mock_imap.iter_emails(UIDSet([1])))
+    stats = mock_imap.fetch_batch_size.stats()
+    assert stats["ttfb"] < 0.05
+    assert stats["size"] == 2000
+
+
+def test_parse_hooks(mock_imap):
+    observer = Mock(spec=Observer)
+    mock_imap.observers.append(observer)
+    raw = b"From: a@example.com\r\n\r\n"
+    [message] = mock_imap._parse_fetched_emails([(b"1 (UID 3 BODY[] {23}", raw)])
+    assert message.uid == "3"
+    phases = [c.args[0].phase for c in observer.after_parse.call_args_list]
+    assert phases == ["mime", "message"]
+    assert observer.after_parse.call_args.args[0].size == len(raw)
 
 
 def test_mark(mock_imap):
@@ -231,10 +1023,70 @@ def test_mark(mock_imap):
     mock_imap.imap.uid.assert_called_once_with("STORE", "100", "+FLAGS", "(\\SEEN)")
 
 
+def test_mark_many(mock_imap):
+    mock_imap.mark_many(["100", "101", "102", "105"], [EmailFlag.SEEN])
+    mock_imap.imap.uid.assert_called_once_with(
+        "STORE", "100:102,105", "+FLAGS.SILENT", "(\\SEEN)"
+    )
+
+    mock_imap.imap.uid.reset_mock()
+    mock_imap.mark_many([1, 2], [EmailFlag.FLAGGED, EmailFlag.UNSEEN])
+    mock_imap.imap.uid.assert_any_call("STORE", "1:2", "+FLAGS.SILENT", "(\\FLAGGED)")
+    mock_imap.imap.uid.assert_any_call("STORE", "1:2", "-FLAGS.SILENT", "(\\SEEN)")
+    assert mock_imap.imap.uid.call_count == 2
+
+
+def test_mark_many_updates_messages(mock_imap):
+    messages = []
+    for uid in ("10", "11"):
+        msg = Mock(spec=EmailMessage)
+        msg.uid = uid
+        msg.folder = "INBOX"
+        messages.append(msg)
+    mock_imap.mark_many(messages, EmailFlag.SEEN)
+    mock_imap.imap.uid.assert_called_once_with(
+        "STORE", "10:11", "+FLAGS.SILENT", "(\\SEEN)"
+    )
+    for msg in messages:
+        msg._update_flags.assert_called_once_with([EmailFlag.SEEN])
+
+
+def test_mark_many_other_folder(mock_imap):
+    mock_imap.imap.select.return_value = ("OK", [b"1"])
+    msg = Mock(spec=EmailMessage)
+    msg.uid = "7"
+    msg.folder = "Sent"
+    mock_imap.mark_many([msg], EmailFlag.SEEN)
+    mock_imap.imap.select.assert_any_call('"Sent"')
+    mock_imap.imap.uid.assert_called_once_with(
+        "STORE", "7", "+FLAGS.SILENT", "(\\SEEN)"
+    )
+    assert mock_imap.selected_folder == "INBOX"
+
+
 def test_make_folder(mock_imap):
+    mock_imap.imap.create.return_value = ("OK", [b"CREATE completed"])
+    mock_imap._update_folder_info.reset_mock()
     mock_imap.make_folder("New Folder")
     mock_imap.imap.create.assert_called_once_with('"INBOX/New Folder"')
-    assert mock_imap._update_folder_info.call_count > 1
+    mock_imap.mail_folder_class.add_folder.assert_called_once_with("INBOX/New Folder")
+    mock_imap._update_folder_info.assert_not_called()
+
+
+def test_make_folder_batch(mock_imap):
+    mock_imap.imap.create.side_effect = [
+        ("OK", [b"CREATE completed"]),
+        ("NO", [b"[ALREADYEXISTS] Mailbox exists"]),
+        ("OK", [b"CREATE completed"]),
+    ]
+    mock_imap._update_folder_info.reset_mock()
+    mock_imap.make_folder(["A", "B", "C"])
+    assert mock_imap.imap.create.call_count == 3
+    assert mock_imap.mail_folder_class.add_folder.call_args_list == [
+        call("INBOX/A"),
+        call("INBOX/C"),
+    ]
+    mock_imap._update_folder_info.assert_called_once()
 
 
 def test_copy_message(mock_imap):
@@ -256,11 +1108,96 @@ def test_move_message(mock_imap):
     mock_imap.delete_message.assert_called_once_with("100", "INBOX")
 
 
+def test_copy_many(mock_imap):
+    mock_imap.imap.untagged_responses = {}
+
+    def uid_command(*args):
+        mock_imap.imap.untagged_responses["COPYUID"] = [b"38505 10:11,15 200:202"]
+        return ("OK", [None])
+
+    mock_imap.imap.uid.side_effect = uid_command
+    messages = []
+    for uid in ("10", "11", "15"):
+        msg = Mock(spec=EmailMessage)
+        msg.uid = uid
+        msg.folder = "INBOX"
+        messages.append(msg)
+
+    result = mock_imap.copy_many(messages, "Sent")
+    mock_imap.imap.uid.assert_called_once_with("COPY", "10:11,15", '"Sent"')
+    assert result == {"10": "200", "11": "201", "15": "202"}
+    assert [m.uid for m in messages] == ["200", "201", "202"]
+    assert all(m.folder == "Sent" for m in messages)
+    assert mock_imap.selected_folder == "INBOX"
+
+
+def test_move_many_uses_move(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1", "MOVE", "UIDPLUS"]
+    mock_imap.imap.untagged_responses = {}
+
+    def uid_command(*args):
+        mock_imap.imap.untagged_responses["COPYUID"] = [b"1 100:101 5:6"]
+        return ("OK", [None])
+
+    mock_imap.imap.uid.side_effect = uid_command
+    result = mock_imap.move_many(["100", "101"], "Trash")
+    mock_imap.imap.uid.assert_called_once_with("MOVE", "100:101", '"Trash"')
+    assert result == {"100": "5", "101": "6"}
+
+
+def test_move_many_fallback(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1", "UIDPLUS"]
+    mock_imap.imap.untagged_responses = {}
+    mock_imap.move_many(["100", "101", "103"], "Trash")
+    assert mock_imap.imap.uid.call_args_list == [
+        call("COPY", "100:101,103", '"Trash"'),
+        call("STORE", "100:101,103", "+FLAGS.SILENT", "(\\Deleted)"),
+        call("EXPUNGE", "100:101,103"),
+    ]
+
+
+def test_move_many_fallback_without_uidplus(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    mock_imap.imap.untagged_responses = {}
+    assert mock_imap.move_many("100", "Trash") == {}
+    assert mock_imap.imap.uid.call_args_list == [
+        call("COPY", "100", '"Trash"'),
+        call("STORE", "100", "+FLAGS.SILENT", "(\\Deleted)"),
+    ]
+
+
 def test_delete_message(mock_imap):
     mock_imap.delete_message("100", "INBOX")
     mock_imap.imap.uid.assert_called_once_with("STORE", "100", "+FLAGS", "(DELETED)")
 
 
+def test_delete_many(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1", "UIDPLUS"]
+    mock_imap.delete_many(["3", "1", "2", "9"])
+    assert mock_imap.imap.uid.call_args_list == [
+        call("STORE", "1:3,9", "+FLAGS.SILENT", "(\\Deleted)"),
+        call("EXPUNGE", "1:3,9"),
+    ]
+
+    mock_imap.imap.uid.reset_mock()
+    mock_imap.delete_many(["3"], expunge=False)
+    mock_imap.imap.uid.assert_called_once_with(
+        "STORE", "3", "+FLAGS.SILENT", "(\\Deleted)"
+    )
+
+
+def test_delete_many_without_uidplus(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    msg = Mock(spec=EmailMessage)
+    msg.uid = "5"
+    msg.folder = "INBOX"
+    mock_imap.delete_many([msg])
+    mock_imap.imap.uid.assert_called_once_with(
+        "STORE", "5", "+FLAGS.SILENT", "(\\Deleted)"
+    )
+    msg._update_flags.assert_called_once_with([EmailFlag.DELETED])
+
+
 def test_info(mock_imap):
     mock_imap.imap.status.return_value = (
         "OK",
@@ -276,35 +1213,134 @@ def test_info(mock_imap):
     }
 
 
+def test_info_all_list_status(mock_imap):
+    mock_imap.imap.untagged_responses = {}
+
+    def list_command(*args):
+        mock_imap.imap.untagged_responses["STATUS"] = [
+            b'"INBOX" (MESSAGES 12 RECENT 0 UIDNEXT 13 UIDVALIDITY 7 UNSEEN 2)',
+            b"&BD8EQAQ4BDIENQRC- (MESSAGES 1 UNSEEN 0)",
+        ]
+        return ("OK", [None])
+
+    mock_imap.imap._simple_command.side_effect = list_command
+    mock_imap.imap._untagged_response.return_value = (
+        "OK",
+        [
+            b'(\\HasNoChildren) "/" "INBOX"',
+            b'(\\HasNoChildren) "/" "&BD8EQAQ4BDIENQRC-"',
+            b'(\\Noselect \\HasChildren) "/" "Archive"',
+        ],
+    )
+    info = mock_imap.info_all()
+    mock_imap.imap._simple_command.assert_called_once_with(
+        "LIST",
+        '""',
+        '"*"',
+        "RETURN",
+        "(STATUS (MESSAGES RECENT UIDNEXT UIDVALIDITY UNSEEN))",
+    )
+    assert info["INBOX"] == {
+        "total": 12,
+        "recent": 0,
+        "unseen": 2,
+        "uidnext": 13,
+        "uidvalidity": 7,
+    }
+    assert info["привет"]["total"] == 1
+    assert info["привет"]["uidnext"] is None
+    assert info["Archive"]["total"] is None
+    mock_imap.imap.select.assert_not_called()
+
+
+def test_info_all_pipelined_status(mock_imap):
+    mock_imap.capabilities = ["IMAP4REV1"]
+    mock_imap.imap.untagged_responses = {}
+    mock_imap.imap._command.side_effect = ["A1", "A2", "A3"]
+
+    def command_complete(name, tag):
+        mock_imap.imap.untagged_responses.setdefault("STATUS", []).extend(
+            {
+                "A1": [b'"INBOX" (MESSAGES 3 UNSEEN 1)'],
+                "A2": [(b"{4}", b"Sent"), b" (MESSAGES 5 UNSEEN 0)"],
+                "A3": [b'"Trash" (MESSAGES 0 UNSEEN 0)'],
+            }[tag]
+        )
+        return ("OK", [b"STATUS completed"])
+
+    mock_imap.imap._command_complete.side_effect = command_complete
+    info = mock_imap.info_all(batch_size=2)
+    assert mock_imap.imap._command.call_args_list == [
+        call("STATUS", '"INBOX"', "(MESSAGES RECENT UIDNEXT UIDVALIDITY UNSEEN)"),
+        call("STATUS", '"Sent"', "(MESSAGES RECENT UIDNEXT UIDVALIDITY UNSEEN)"),
+        call("STATUS", '"Trash"', "(MESSAGES RECENT UIDNEXT UIDVALIDITY UNSEEN)"),
+    ]
+    assert {f: i["total"] for f, i in info.items()} == {
+        "INBOX": 3,
+        "Sent": 5,
+        "Trash": 0,
+    }
+    assert info["INBOX"]["unseen"] == 1
+    mock_imap.imap.select.assert_not_called()
+
+
 def test_rename(mock_imap):
     mock_imap.folder = Mock()
+    mock_imap.imap.rename.return_value = ("OK", [b"RENAME completed"])
+    mock_imap._update_folder_info.reset_mock()
     mock_imap.rename("New Name")
     mock_imap.imap.rename.assert_called_once_with('"INBOX"', '"New Name"')
-    assert mock_imap._update_folder_info.call_count > 1
+    mock_imap.mail_folder_class.rename_folder.assert_called_once_with(
+        "INBOX", "New Name"
+    )
+    mock_imap._update_folder_info.assert_not_called()
     assert mock_imap.folder.call_count == 2
 
 
 def test_delete(mock_imap):
+    mock_imap.imap.delete.return_value = ("OK", [b"DELETE completed"])
+    mock_imap._update_folder_info.reset_mock()
     mock_imap.delete()
     mock_imap.imap.delete.assert_called_once_with('"INBOX"')
-    assert mock_imap._update_folder_info.call_count >= 1
+    mock_imap.mail_folder_class.remove_folder.assert_called_once_with("INBOX")
+    mock_imap._update_folder_info.assert_not_called()
+
+
+def test_delete_refused(mock_imap):
+    mock_imap.imap.delete.return_value = ("NO", [b"Mailbox has children"])
+    mock_imap._update_folder_info.reset_mock()
+    mock_imap.delete(["Sent", "Trash"])
+    mock_imap.mail_folder_class.remove_folder.assert_not_called()
+    mock_imap._update_folder_info.assert_called_once()
 
 
 @pytest.mark.parametrize(
     "method",
     [
         "folders",
+        "list_folders",
         "folder",
         "children",
         "parent",
         "append",
+        "append_many",
         "emails",
+        "search",
+        "search_page",
+        "save_search",
+        "search_all",
+        "iter_emails",
         "mark",
+        "mark_many",
         "make_folder",
         "copy_message",
+        "copy_many",
         "move_message",
+        "move_many",
         "delete_message",
+        "delete_many",
         "info",
+        "info_all",
         "rename",
         "delete",
     ],
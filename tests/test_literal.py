@@ -0,0 +1,92 @@
+import io
+from email.mime.text import MIMEText
+
+import pytest
+
+from imapy import literal as literal_module
+from imapy.exceptions import UnknownEmailMessageType
+from imapy.literal import Literal
+
+RAW_EMAIL = b"Subject: Hi\r\n\r\nBody"
+
+
+def written(literal):
+    chunks = []
+    literal.write(lambda c: chunks.append(bytes(c)))
+    return b"".join(chunks)
+
+
+def test_literal_from_bytes():
+    literal = Literal.from_message(RAW_EMAIL)
+    assert literal.size == 19
+    assert literal.header() == b"{19}"
+    assert literal.header(non_synchronizing=True) == b"{19+}"
+    assert written(literal) == RAW_EMAIL
+
+
+def test_literal_from_memoryview():
+    literal = Literal.from_message(memoryview(bytearray(RAW_EMAIL)))
+    assert literal.size == 19
+    assert written(literal) == RAW_EMAIL
+
+
+def test_literal_from_file_object():
+    f = io.BytesIO(b"skip" + RAW_EMAIL)
+    f.read(4)
+    literal = Literal.from_message(f)
+    assert literal.size == 19
+    assert written(literal) == RAW_EMAIL
+
+
+def test_literal_from_path(tmp_path):
+    path = tmp_path / "1.eml"
+    path.write_bytes(RAW_EMAIL)
+    literal = Literal.from_message(path)
+    assert literal.size == 19
+    assert written(literal) == RAW_EMAIL
+
+
+def test_literal_from_str_path(tmp_path):
+    path = tmp_path / "1.eml"
+    path.write_bytes(RAW_EMAIL)
+    literal = Literal.from_message(str(path))
+    assert literal.size == 19
+    assert written(literal) == RAW_EMAIL
+
+
+def test_literal_mmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(literal_module, "CHUNK_SIZE", 4)
+    path = tmp_path / "1.eml"
+    path.write_bytes(RAW_EMAIL)
+    with path.open("rb") as f:
+        literal = Literal.from_message(f, use_mmap=True)
+        chunks = []
+        literal.write(lambda c: chunks.append((type(c), bytes(c))))
+    assert all(t is memoryview for t, _ in chunks)
+    assert max(len(c) for _, c in chunks) == 4
+    assert b"".join(c for _, c in chunks) == RAW_EMAIL
+
+
+def test_literal_mmap_without_file_descriptor():
+    literal = Literal.from_message(io.BytesIO(RAW_EMAIL), use_mmap=True)
+    assert written(literal) == RAW_EMAIL
+
+
+def test_literal_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr(literal_module, "CHUNK_SIZE", 5)
+    chunks = []
+    Literal.from_message(RAW_EMAIL).write(lambda c: chunks.append(bytes(c)))
+    assert [len(c) for c in chunks] == [5, 5, 5, 4]
+
+
+def test_literal_from_mime_message():
+    message = MIMEText("Test message")
+    message["Subject"] = "Test"
+    data = written(Literal.from_message(message))
+    assert b"Subject: Test\r\n" in data
+    assert b"\n" not in data.replace(b"\r\n", b"")
+
+
+def test_literal_unknown_type():
+    with pytest.raises(UnknownEmailMessageType):
+        Literal.from_message("Not a message")
@@ -90,3 +90,124 @@ def test_nested_folders(mail_folder):
     ]
     assert mail_folder.get_children("Parent") == ["Parent/Child1", "Parent/Child2"]
     assert mail_folder.get_children("Parent/Child2") == ["Parent/Child2/Grandchild"]
+
+
+def test_folder_without_listed_parent(mail_folder):
+    raw_folders = [
+        b'(\\HasChildren) "/" "Work"',
+        b'(\\HasNoChildren) "/" "Work/2024/Reports"',
+        b'(\\HasNoChildren) "/" "Archive/Old"',
+    ]
+    mail_folder.get_folders((None, raw_folders))
+
+    assert "Reports" in mail_folder.folders_tree["Work"]["children"]
+    assert "Old" in mail_folder.folders_tree
+    assert mail_folder.get_children("Work") == []
+
+
+def _folders(mail_folder):
+    raw_folders = [
+        b'(\\HasNoChildren) "/" "INBOX"',
+        b'(\\HasChildren) "/" "Work"',
+        b'(\\HasNoChildren) "/" "Work/Projects"',
+    ]
+    mail_folder.get_folders((None, raw_folders))
+    return mail_folder
+
+
+def test_add_folder(mail_folder):
+    _folders(mail_folder)
+    mail_folder.add_folder("Work/Tasks")
+    mail_folder.add_folder("Archive")
+
+    assert mail_folder.folders == [
+        "INBOX",
+        "Work",
+        "Work/Projects",
+        "Work/Tasks",
+        "Archive",
+    ]
+    assert mail_folder.get_children("Work") == ["Work/Projects", "Work/Tasks"]
+    assert "Tasks" in mail_folder.folders_tree["Work"]["children"]
+    assert mail_folder.folders_tree["Archive"]["children"] == {}
+    # server did not report children attributes of the new folder
+    assert mail_folder.folders_tree["Archive"]["full_attributes"] == []
+
+
+def test_add_folder_updates_parent_attributes(mail_folder):
+    _folders(mail_folder)
+    mail_folder.add_folder("INBOX/Receipts")
+
+    inbox = mail_folder.folders_info["INBOX"]
+    assert inbox["standard_attributes"] == ["HasChildren"]
+    assert inbox["full_attributes"] == ["HasChildren"]
+
+
+def test_add_missing_parent_folder(mail_folder):
+    mail_folder.get_folders((None, [b'(\\HasNoChildren) "/" "A/B/C"']))
+    mail_folder.add_folder("A/B")
+
+    assert mail_folder.get_children("A/B") == ["A/B/C"]
+    assert list(mail_folder.folders_tree) == ["B"]
+    assert "C" in mail_folder.folders_tree["B"]["children"]
+
+
+def test_remove_folder(mail_folder):
+    _folders(mail_folder)
+    mail_folder.remove_folder("Work/Projects")
+
+    assert mail_folder.folders == ["INBOX", "Work"]
+    assert mail_folder.get_children("Work") == []
+    assert mail_folder.folders_tree["Work"]["children"] == {}
+    assert mail_folder.folders_tree["Work"]["full_attributes"] == ["HasNoChildren"]
+
+
+def test_remove_folder_with_children(mail_folder):
+    _folders(mail_folder)
+    mail_folder.remove_folder("Work")
+
+    assert "Work" in mail_folder.folders
+    assert "Noselect" in mail_folder.folders_tree["Work"]["full_attributes"]
+
+
+def test_recreate_removed_folder_with_children(mail_folder):
+    _folders(mail_folder)
+    mail_folder.remove_folder("Work")
+    mail_folder.add_folder("Work")
+
+    info = mail_folder.folders_info["Work"]
+    assert info["standard_attributes"] == ["HasChildren"]
+    assert info["full_attributes"] == ["HasChildren"]
+
+
+def test_children_attributes_not_reported(mail_folder):
+    mail_folder.get_folders((None, [b'() "/" "Work"']))
+    mail_folder.add_folder("Work/Tasks")
+    mail_folder.remove_folder("Work/Tasks")
+
+    assert mail_folder.folders_info["Work"]["full_attributes"] == []
+
+
+def test_rename_folder(mail_folder):
+    _folders(mail_folder)
+    mail_folder.rename_folder("Work", "Job")
+
+    assert mail_folder.folders == ["INBOX", "Job", "Job/Projects"]
+    assert mail_folder.get_children("Job") == ["Job/Projects"]
+    assert mail_folder.folders_tree["Job"]["full_attributes"] == ["HasChildren"]
+    assert "Projects" in mail_folder.folders_tree["Job"]["children"]
+    assert "Work" not in mail_folder.folders_tree
+
+
+def test_extended_list_data(mail_folder):
+    raw_folders = [
+        b'(\\HasChildren \\Subscribed) "/" "Work" ("CHILDINFO" ("SUBSCRIBED"))',
+        b'(\\HasNoChildren) "/" "Work (old)"',
+    ]
+    folders = mail_folder.get_folders((None, raw_folders))
+
+    assert folders == ["Work", "Work (old)"]
+    assert mail_folder.folders_tree["Work"]["full_attributes"] == [
+        "HasChildren",
+        "Subscribed",
+    ]
@@ -0,0 +1,85 @@
+import pytest
+
+from imapy.hooks import CommandEvent, ParseEvent
+from imapy.metrics import Counter, Histogram, MetricsObserver
+
+
+def test_counter_render():
+    counter = Counter("imapy_commands_total", "IMAP commands", ["command", "status"])
+    counter.inc(command="UID FETCH", status="OK")
+    counter.inc(2, command="UID FETCH", status="OK")
+    counter.inc(command='X "quoted"', status="NO")
+    assert counter.get(command="UID FETCH", status="OK") == 3
+    assert counter.render() == (
+        "# HELP imapy_commands_total IMAP commands\n"
+        "# TYPE imapy_commands_total counter\n"
+        'imapy_commands_total{command="UID FETCH",status="OK"} 3\n'
+        'imapy_commands_total{command="X \\"quoted\\"",status="NO"} 1\n'
+    )
+
+
+def test_help_escaping():
+    counter = Counter("c", 'Say "hi"\\\nthere')
+    assert counter.render().splitlines()[0] == '# HELP c Say "hi"\\\\\\nthere'
+
+
+def test_counter_errors():
+    counter = Counter("c", "Counter", ["command"])
+    with pytest.raises(ValueError):
+        counter.inc(-1, command="NOOP")
+    with pytest.raises(ValueError):
+        counter.inc(status="OK")
+
+
+def test_histogram_render():
+    histogram = Histogram("wait_seconds", "Wait", buckets=[0.1, 1])
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    assert histogram.render() == (
+        "# HELP wait_seconds Wait\n"
+        "# TYPE wait_seconds histogram\n"
+        'wait_seconds_bucket{le="0.1"} 2\n'
+        'wait_seconds_bucket{le="1"} 3\n'
+        'wait_seconds_bucket{le="+Inf"} 4\n'
+        "wait_seconds_sum 3.65\n"
+        "wait_seconds_count 4\n"
+    )
+
+
+def test_metrics_observer():
+    metrics = MetricsObserver()
+    metrics.after_command(
+        CommandEvent(
+            tag="A1",
+            started=0,
+            name="UID FETCH",
+            status="OK",
+            duration=0.2,
+            bytes_sent=30,
+            bytes_received=5000,
+        )
+    )
+    event = ParseEvent("mime", "INBOX", "1", 5000, duration=0.01)
+    metrics.before_parse(event)
+    metrics.after_parse(event)
+    event = ParseEvent("message", "INBOX", "1", 5000, error="ValueError")
+    metrics.before_parse(event)
+    metrics.after_parse(event)
+    metrics.after_reconnect()
+    metrics.after_checkout(0.5)
+
+    assert metrics.messages_fetched.get() == 1
+    assert metrics.messages_parsed.get() == 0
+    text = metrics.render()
+    assert 'imapy_commands_total{command="UID FETCH",status="OK"} 1\n' in text
+    assert 'imapy_bytes_received_total{command="UID FETCH"} 5000\n' in text
+    assert (
+        'imapy_command_duration_seconds_bucket{command="UID FETCH",le="0.25"} 1\n'
+        in text
+    )
+    assert 'imapy_parse_duration_seconds_count{phase="mime"} 1\n' in text
+    assert "imapy_reconnects_total 1\n" in text
+    assert "imapy_pool_checkouts_total 1\n" in text
+    assert "imapy_pool_wait_seconds_sum 0.5\n" in text
+    # metrics without samples are rendered with HELP and TYPE only
+    assert "# TYPE imapy_messages_parsed_total counter\n" in text
@@ -0,0 +1,93 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from imapy.hooks import Observer
+from imapy.pool import ConnectionPool
+
+
+def test_pool_reuses_connections():
+    factory = Mock(side_effect=lambda: Mock(logged_in=True))
+    pool = ConnectionPool(factory, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert factory.call_count == 1
+
+
+def test_pool_notifies_observers():
+    observer = Mock(spec=Observer)
+    pool = ConnectionPool(lambda: Mock(logged_in=True), size=1, observers=[observer])
+    with pool.connection():
+        pass
+    observer.after_checkout.assert_called_once()
+    assert observer.after_checkout.call_args.args[0] >= 0
+
+
+def test_pool_waits_for_connection():
+    factory = Mock(side_effect=lambda: Mock(logged_in=True))
+    pool = ConnectionPool(factory, size=1)
+    checked_out = []
+
+    def worker():
+        with pool.connection() as connection:
+            checked_out.append(connection)
+
+    with pool.connection() as first:
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive()
+    thread.join()
+    assert checked_out == [first]
+    assert factory.call_count == 1
+
+
+def test_pool_failed_connection():
+    pool = ConnectionPool(Mock(side_effect=ConnectionError), size=1)
+    with pytest.raises(ConnectionError):
+        with pool.connection():
+            pass
+    assert pool.connections == []
+
+
+def test_pool_close():
+    pool = ConnectionPool(lambda: Mock(logged_in=True), size=2)
+    with pool:
+        with pool.connection() as connection:
+            pass
+    connection.logout.assert_called_once()
+    assert pool.connections == []
+
+
+def test_pool_from_connection():
+    class Connection:
+        def __init__(self, **settings):
+            self.__dict__.update(settings)
+
+    settings = {
+        "host": "imap.example.com",
+        "username": "user",
+        "password": "pass",
+        "ssl": True,
+        "auth_mechanism": None,
+        "auth_object": None,
+        "debug_level": 0,
+        "port": 993,
+        "starttls": False,
+        "connect_timeout": 10,
+        "command_timeout": None,
+        "rate_limiter": None,
+        "observers": [],
+    }
+    pool = ConnectionPool.from_connection(Connection(**settings), size=3)
+    assert pool.size == 3
+    with pool.connection() as connection:
+        assert connection.__dict__ == settings
+
+
+def test_pool_invalid_size():
+    with pytest.raises(ValueError):
+        ConnectionPool(Mock(), size=0)
@@ -194,3 +194,77 @@ def test_q_non_ascii():
         "FROM",
         '"test@example.com"',
     ]
+
+
+def test_q_or():
+    q = Q().sender("a@example.com") | Q().sender("b@example.com").seen()
+    assert q.get_query() == [
+        "OR",
+        "FROM",
+        '"a@example.com"',
+        "(FROM",
+        '"b@example.com"',
+        "SEEN)",
+    ]
+
+
+def test_q_and_not():
+    q = (Q().sender("a") | Q().sender("b")) & ~Q().seen().flagged()
+    assert q.get_query() == ["OR", "FROM", "a", "FROM", "b", "NOT", "(SEEN", "FLAGGED)"]
+
+
+def test_q_optimise_flattens_nesting():
+    q = Q().sender("a") | (Q().sender("b") | (Q().sender("c") & Q().sender("c")))
+    assert q.get_query() == ["OR", "FROM", "a", "OR", "FROM", "b", "FROM", "c"]
+    assert (~~Q().seen()).get_query() == ["SEEN"]
+    assert (~Q().seen()).get_query() == ["UNSEEN"]
+    assert (~Q().keyword("work")).get_query() == ["UNKEYWORD", "work"]
+
+
+def test_q_optimise_merges_bounds():
+    q = (
+        Q().since("1-Jan-2024").before("1-Jun-2024")
+        & Q().since("5-Feb-2024").larger(1000)
+        & Q().before("1-Mar-2024").larger(500)
+    )
+    assert q.optimise().queries == [
+        "SINCE",
+        "5-Feb-2024",
+        "BEFORE",
+        "1-Mar-2024",
+        "LARGER",
+        "1000",
+    ]
+
+
+def test_q_unknown_keys_not_optimised():
+    q = Q(queries=["X-GM-LABELS", "SEEN", "SEEN", "MODSEQ", 720162338])
+    assert q.get_query() == ["X-GM-LABELS", "SEEN", "SEEN", "MODSEQ", 720162338]
+    assert (~q).get_query() == [
+        "NOT",
+        "(X-GM-LABELS",
+        "SEEN",
+        "SEEN",
+        "MODSEQ",
+        "720162338)",
+    ]
+
+
+def test_q_int_tokens():
+    q = Q(queries=["LARGER", 5]) & Q(queries=["LARGER", 10])
+    assert q.get_query() == ["LARGER", 10]
+    assert (~Q(queries=["LARGER", 5, "1:5"])).get_query() == [
+        "NOT",
+        "(LARGER",
+        5,
+        "1:5)",
+    ]
+
+
+def test_q_empty_operand():
+    assert (Q() | Q().seen()).get_query() == ["OR", "ALL", "SEEN"]
+
+
+def test_q_combined_non_ascii():
+    q = Q().subject("テスト") | Q().sender("a")
+    assert q.get_query() == ["CHARSET", "UTF-8", "OR", "SUBJECT", "テスト", "FROM", "a"]
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from imapy.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_burst_and_wait():
+    clock = FakeClock()
+    bucket = TokenBucket(2, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.consume() == 0
+    assert bucket.consume() == 0
+    assert bucket.consume() == 0.5
+    clock.now += 10
+    # refilled only up to capacity
+    assert bucket.consume(2) == 0
+    assert bucket.consume() == 0.5
+    assert clock.sleeps == [0.5, 0.5]
+
+
+def test_token_bucket_request_bigger_than_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+    assert bucket.consume(500) == 4.0
+    assert bucket.consume(100) == 1.0
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_rate_limiter():
+    clock = FakeClock()
+    limiter = RateLimiter(
+        commands_per_second=1, bytes_per_second=1000, clock=clock, sleep=clock.sleep
+    )
+    limiter.command()
+    limiter.command()
+    limiter.transfer(1500)
+    assert clock.sleeps == [1.0, 0.5]
+    assert limiter.waited == 1.5
+
+
+def test_rate_limiter_without_limits():
+    limiter = RateLimiter()
+    limiter.command()
+    limiter.transfer(10**9)
+    assert limiter.waited == 0
+
+
+def test_rate_limiter_shared_by_threads():
+    # clock stands still, so every command waits one second longer
+    limiter = RateLimiter(
+        commands_per_second=1, clock=lambda: 0.0, sleep=lambda s: None
+    )
+
+    def send_commands():
+        for _ in range(50):
+            limiter.command()
+
+    threads = [threading.Thread(target=send_commands) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.waited == sum(range(400))
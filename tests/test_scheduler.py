@@ -0,0 +1,82 @@
+import pytest
+
+from imapy.scheduler import (
+    AdaptiveBatchSize,
+    FetchBatch,
+    iter_batches,
+    parse_sizes,
+    plan_batches,
+)
+
+
+def test_parse_sizes():
+    data = [
+        b"1 (UID 10 RFC822.SIZE 2048)",
+        b"2 (RFC822.SIZE 512 UID 11)",
+        b"3 (UID 12)",
+        None,
+    ]
+    assert parse_sizes(data) == {10: 2048, 11: 512}
+
+
+def test_plan_batches_by_byte_budget():
+    sizes = {1: 400, 2: 400, 3: 300, 4: 900, 5: 100}
+    batches = plan_batches(sizes, byte_budget=1000)
+    assert batches == [
+        FetchBatch([1, 2], 800),
+        FetchBatch([3], 300),
+        FetchBatch([4, 5], 1000),
+    ]
+    assert str(batches[0].uid_set) == "1:2"
+
+
+def test_plan_batches_large_messages():
+    sizes = {1: 10, 2: 5000, 3: 10, 4: 20}
+    batches = plan_batches(sizes, byte_budget=1000, large_message_size=4000)
+    assert batches == [
+        FetchBatch([1], 10),
+        FetchBatch([2], 5000, large=True),
+        FetchBatch([3, 4], 30),
+    ]
+
+
+def test_plan_batches_invalid_budget():
+    with pytest.raises(ValueError):
+        plan_batches({1: 10}, byte_budget=0)
+
+
+def test_adaptive_batch_size_increase_and_decrease():
+    controller = AdaptiveBatchSize(
+        size=1000, min_size=400, max_size=2500, increase=1000, max_ttfb=1.0
+    )
+    assert controller.update(1000, elapsed=1.0, ttfb=0.1) == 2000
+    assert controller.update(2000, elapsed=2.0, ttfb=0.1) == 2500
+    # slow first byte halves the budget
+    assert controller.update(2500, elapsed=3.0, ttfb=1.5) == 1250
+    # throughput dropped below half of its average
+    assert controller.update(1250, elapsed=10.0, ttfb=0.1) == 625
+    assert controller.update(100, elapsed=10.0, ttfb=5.0) == 400
+    stats = controller.stats()
+    assert stats["sizes"] == [1000, 2000, 2500, 1250, 625]
+    assert stats["size"] == 400
+    assert stats["batches"] == 5
+
+
+def test_adaptive_batch_size_does_not_grow_when_unused():
+    controller = AdaptiveBatchSize(size=1000, min_size=100, max_size=5000)
+    assert controller.update(100, elapsed=0.1, ttfb=0.01) == 1000
+
+
+def test_iter_batches_reads_adaptive_budget():
+    controller = AdaptiveBatchSize.fixed(1000)
+    batches = iter_batches({1: 600, 2: 600, 3: 600}, controller)
+    assert next(batches).uids == [1]
+    controller.size = 2000
+    assert next(batches).uids == [2, 3]
+
+
+def test_adaptive_batch_size_invalid_limits():
+    with pytest.raises(ValueError):
+        AdaptiveBatchSize(min_size=0)
+    with pytest.raises(ValueError):
+        AdaptiveBatchSize(min_size=10, max_size=5)
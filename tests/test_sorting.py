@@ -0,0 +1,58 @@
+import pytest
+
+from imapy import sorting
+from imapy.exceptions import InvalidSearchQuery
+
+FETCH_DATA = [
+    (
+        b'1 (UID 10 INTERNALDATE "17-Jul-2024 02:44:25 +0000" RFC822.SIZE 300 '
+        b"BODY[HEADER.FIELDS (SUBJECT)] {20}",
+        b"Subject: Re: Beta\r\n\r\n",
+    ),
+    b")",
+    (
+        b'2 (UID 11 INTERNALDATE " 2-Aug-2024 10:00:00 +0200" RFC822.SIZE 100 '
+        b"BODY[HEADER.FIELDS (SUBJECT)] {21}",
+        b"Subject: alpha\r\n\r\n",
+    ),
+    b")",
+    (
+        b'3 (INTERNALDATE "01-Jan-2023 00:00:00 +0000" RFC822.SIZE 200 '
+        b"BODY[HEADER.FIELDS (SUBJECT)] {30}",
+        b"Subject: Fwd: [list] Alpha\r\n\r\n",
+    ),
+    b" UID 12)",
+]
+
+
+def test_parse_sort_criteria():
+    assert sorting.parse_sort_criteria(["REVERSE", "ARRIVAL", "subject"]) == [
+        ("ARRIVAL", True),
+        ("SUBJECT", False),
+    ]
+    assert sorting.parse_sort_criteria("REVERSE DATE") == [("DATE", True)]
+    with pytest.raises(InvalidSearchQuery):
+        sorting.parse_sort_criteria(["NEWEST"])
+    with pytest.raises(InvalidSearchQuery):
+        sorting.parse_sort_criteria(["REVERSE"])
+
+
+def test_fetch_items():
+    assert sorting.fetch_items([("ARRIVAL", True)]) == "(UID INTERNALDATE RFC822.SIZE)"
+    assert sorting.fetch_items([("SUBJECT", False), ("FROM", False)]) == (
+        "(UID INTERNALDATE RFC822.SIZE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)])"
+    )
+
+
+def test_sort_uids():
+    metadata = sorting.parse_metadata(FETCH_DATA)
+    assert sorted(metadata) == [10, 11, 12]
+    assert sorting.sort_uids(metadata, [("ARRIVAL", True)]) == [11, 10, 12]
+    assert sorting.sort_uids(metadata, [("SIZE", False)]) == [11, 12, 10]
+    # base subjects of 11 and 12 are equal, ties are broken by UID
+    assert sorting.sort_uids(metadata, [("SUBJECT", False)]) == [11, 12, 10]
+    assert sorting.sort_uids(metadata, [("SUBJECT", False), ("SIZE", True)]) == [
+        12,
+        11,
+        10,
+    ]
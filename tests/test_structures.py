@@ -0,0 +1,77 @@
+from imapy.structures import SearchResult, UIDSet
+
+
+def test_uid_set_compression():
+    uid_set = UIDSet(["5", 1, 2, 3, "7", 8, 3])
+    assert str(uid_set) == "1:3,5,7:8"
+    assert uid_set.ranges == [(1, 3), (5, 5), (7, 8)]
+    assert len(uid_set) == 6
+    assert list(uid_set) == [1, 2, 3, 5, 7, 8]
+
+
+def test_uid_set_membership():
+    uid_set = UIDSet([1, 2, 3, 10])
+    assert 2 in uid_set
+    assert "10" in uid_set
+    assert 4 not in uid_set
+    assert 0 not in uid_set
+    assert "abc" not in uid_set
+
+
+def test_uid_set_empty():
+    uid_set = UIDSet()
+    assert not uid_set
+    assert str(uid_set) == ""
+    assert len(uid_set) == 0
+
+
+def test_uid_set_parse():
+    assert str(UIDSet.parse("7,1:3")) == "1:3,7"
+    assert list(UIDSet.parse(b"3:1")) == [1, 2, 3]
+
+
+def test_uid_set_parse_keeps_ranges():
+    uids = UIDSet.parse("1:1000000,5:10,1000001,2000000:1999990")
+    assert uids.ranges == [(1, 1000001), (1999990, 2000000)]
+    assert len(uids) == 1000012
+
+
+def test_search_result_from_esearch():
+    result = SearchResult.from_esearch(
+        b'(TAG "A282") UID MIN 4 MAX 28 COUNT 17 ALL 4:18,21,28'
+    )
+    assert result.min == 4
+    assert result.max == 28
+    assert result.count == 17
+    assert str(result.uids) == "4:18,21,28"
+
+
+def test_search_result_from_multisearch():
+    result = SearchResult.from_esearch(
+        b'(TAG "A3" MAILBOX "Sent \\"old\\" (2)" UIDVALIDITY 7) UID ALL 2:3'
+    )
+    assert result.mailbox == 'Sent "old" (2)'
+    assert str(result.uids) == "2:3"
+
+
+def test_search_result_from_uids():
+    result = SearchResult.from_uids(UIDSet([5, 3, 9]), ["MIN", "COUNT"])
+    assert result == SearchResult(min=3, count=3)
+
+
+def test_uid_set_slice():
+    uids = UIDSet.parse("1:5,10,20:1000000")
+    assert str(uids.slice(0, 3)) == "1:3"
+    assert str(uids.slice(3, 8)) == "4:5,10,20:21"
+    assert str(uids.slice(999980, 2000000)) == "999994:1000000"
+    assert not uids.slice(2000000, 2000010)
+
+
+def test_search_result_partial():
+    result = SearchResult.from_esearch(
+        b'(TAG "A1") UID PARTIAL (1:3 200:202) COUNT 1000'
+    )
+    assert list(result.partial) == [200, 201, 202]
+    assert result.count == 1000
+    empty = SearchResult.from_esearch(b'(TAG "A1") UID PARTIAL (1:3 NIL) COUNT 0')
+    assert empty.partial == UIDSet()
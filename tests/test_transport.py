@@ -0,0 +1,218 @@
+import itertools
+import socket
+import threading
+import time
+from unittest.mock import Mock, call
+
+import pytest
+
+from imapy import transport as transport_module
+from imapy.exceptions import CommandCancelled, CommandTimeout
+from imapy.hooks import Observer
+from imapy.ratelimit import RateLimiter
+from imapy.transport import Transport
+
+
+def make_connection():
+    connection = Mock()
+    connection._new_tag.return_value = b"A1"
+    connection.readline.return_value = b"* OK\r\n"
+    return connection
+
+
+def test_transport_without_limiter():
+    connection = make_connection()
+    original_read = connection.read
+    Transport(connection)
+    original_read.return_value = b"data"
+    assert connection._new_tag() == b"A1"
+    assert connection.read(4) == b"data"
+    original_read.assert_called_once_with(4)
+
+
+def test_transport_rate_limits_commands_and_bytes(monkeypatch):
+    monkeypatch.setattr(transport_module, "READ_CHUNK_SIZE", 4)
+    connection = make_connection()
+    original_send, original_read = connection.send, connection.read
+    original_read.side_effect = [b"abcd", b"ef"]
+    limiter = Mock(spec=RateLimiter(bytes_per_second=1))
+    Transport(connection, limiter)
+
+    connection._new_tag()
+    connection.send(b"A1 NOOP\r\n")
+    assert connection.readline() == b"* OK\r\n"
+    assert connection.read(6) == b"abcdef"
+
+    limiter.command.assert_called_once_with()
+    assert limiter.transfer.call_args_list == [call(9), call(6), call(4), call(2)]
+    original_send.assert_called_once_with(b"A1 NOOP\r\n")
+    assert original_read.call_args_list == [call(4), call(2)]
+
+
+class SocketConnection:
+    """Minimal imaplib-like connection over a socket pair"""
+
+    def __init__(self):
+        self.sock, self.server = socket.socketpair()
+        self.file = self.sock.makefile("rb")
+        self.state = "SELECTED"
+        self.tags = (b"A%d" % i for i in itertools.count(1))
+
+    def _new_tag(self):
+        return next(self.tags)
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def read(self, size):
+        return self.file.read(size)
+
+    def readline(self):
+        return self.file.readline()
+
+    def _get_tagged_response(self, tag, expect_bye=False):
+        line = self.readline()
+        return line.split()[1].decode(), [line]
+
+    def _command_complete(self, name, tag):
+        return self._get_tagged_response(tag)
+
+    def shutdown(self):
+        self.file.close()
+        self.sock.close()
+
+
+@pytest.fixture
+def socket_connection():
+    connection = SocketConnection()
+    yield connection
+    connection.server.close()
+
+
+def send_command(connection, command):
+    tag = connection._new_tag()
+    connection.send(tag + b" " + command + b"\r\n")
+
+
+def test_transport_command_completed_in_time(socket_connection):
+    Transport(socket_connection, command_timeout=5)
+    send_command(socket_connection, b"NOOP")
+    socket_connection.server.sendall(b"A1 OK NOOP completed\r\n")
+    assert socket_connection.readline() == b"A1 OK NOOP completed\r\n"
+
+
+def test_transport_command_timeout(socket_connection):
+    on_close = Mock()
+    transport = Transport(
+        socket_connection,
+        command_timeout=0.05,
+        folder=lambda: "INBOX",
+        on_close=on_close,
+    )
+    send_command(socket_connection, b"UID FETCH 1:* (FLAGS)")
+    assert transport.command == "UID FETCH"
+    with pytest.raises(
+        CommandTimeout, match='UID FETCH timed out \\(folder "INBOX"\\)'
+    ):
+        socket_connection.readline()
+    assert socket_connection.state == "LOGOUT"
+    on_close.assert_called_once_with()
+
+
+def test_transport_deadline(socket_connection):
+    transport = Transport(socket_connection)
+    send_command(socket_connection, b"SEARCH ALL")
+    transport.deadline = time.monotonic() - 1
+    with pytest.raises(CommandTimeout, match="SEARCH timed out"):
+        socket_connection.readline()
+
+
+def test_transport_cancel(socket_connection):
+    transport = Transport(socket_connection)
+    send_command(socket_connection, b"FETCH 1:* (BODY[])")
+    socket_connection.server.sendall(b"* 1 FETCH (BODY[] {100}\r\n")
+    assert socket_connection.readline() == b"* 1 FETCH (BODY[] {100}\r\n"
+    threading.Timer(0.05, transport.cancel).start()
+    with pytest.raises(CommandCancelled, match="FETCH was cancelled"):
+        socket_connection.read(100)
+    assert socket_connection.state == "LOGOUT"
+
+
+def test_transport_cancel_when_idle(socket_connection):
+    transport = Transport(socket_connection)
+    send_command(socket_connection, b"NOOP")
+    socket_connection.server.sendall(b"A1 OK NOOP completed\r\n")
+    assert socket_connection._get_tagged_response(b"A1")[0] == "OK"
+    # nothing to cancel, so the next command is not affected
+    transport.cancel()
+    send_command(socket_connection, b"NOOP")
+    socket_connection.server.sendall(b"A2 OK NOOP completed\r\n")
+    assert socket_connection._get_tagged_response(b"A2")[0] == "OK"
+    assert socket_connection.state == "SELECTED"
+
+
+def test_transport_notifies_observers(socket_connection):
+    observer = Mock(spec=Observer)
+    Transport(socket_connection, folder=lambda: "INBOX", observers=[observer])
+    send_command(socket_connection, b"UID FETCH 1 (BODY[])")
+    before = observer.before_command.call_args.args[0]
+    assert (before.tag, before.name, before.folder) == ("A1", "UID FETCH", "INBOX")
+    response = b"* 1 FETCH (UID 1 BODY[] {5}\r\nHello)\r\nA1 OK Done\r\n"
+    socket_connection.server.sendall(response)
+    socket_connection.readline()
+    socket_connection.read(5)
+    socket_connection.readline()
+    assert socket_connection._get_tagged_response(b"A1") == (
+        "OK",
+        [b"A1 OK Done\r\n"],
+    )
+    event = observer.after_command.call_args.args[0]
+    assert event is before
+    assert event.status == "OK"
+    assert event.bytes_sent == len(b"A1 UID FETCH 1 (BODY[])\r\n")
+    assert event.bytes_received == len(response)
+    assert event.literals_received == 1
+    assert event.duration > 0
+
+
+def test_transport_finishes_timed_out_command(socket_connection):
+    observer = Mock(spec=Observer)
+    Transport(socket_connection, command_timeout=0.01, observers=[observer])
+    send_command(socket_connection, b"NOOP")
+    with pytest.raises(CommandTimeout):
+        socket_connection.readline()
+    assert observer.after_command.call_args.args[0].status == "CommandTimeout"
+
+
+def test_transport_finishes_aborted_commands():
+    observer = Mock(spec=Observer)
+    connection = make_connection()
+    connection._new_tag.side_effect = [b"A1", b"A2", b"A3"]
+    original_send = connection.send
+    connection._command_complete.side_effect = OSError("BYE")
+    connection._get_tagged_response.return_value = ("OK", [b"done"])
+    Transport(connection, observers=[observer])
+
+    # server said BYE before tagged response of NOOP
+    connection._new_tag()
+    connection.send(b"A1 NOOP\r\n")
+    with pytest.raises(OSError):
+        connection._command_complete("NOOP", b"A1")
+    # connection failed while sending
+    original_send.side_effect = OSError("broken pipe")
+    connection._new_tag()
+    with pytest.raises(OSError):
+        connection.send(b"A2 CHECK\r\n")
+    assert [c.args[0].status for c in observer.after_command.call_args_list] == [
+        "OSError",
+        "OSError",
+    ]
+
+    # received data is counted for the command in progress
+    original_send.side_effect = None
+    connection._new_tag()
+    connection.send(b"A3 UID FETCH 1 (FLAGS)\r\n")
+    connection.readline()
+    connection._get_tagged_response(b"A3")
+    event = observer.after_command.call_args.args[0]
+    assert (event.name, event.bytes_received) == ("UID FETCH", len(b"* OK\r\n"))
@@ -13,6 +13,17 @@ def test_str_to_utf7():
     assert utils.str_to_utf7("Hello ö") == b"Hello &APY-"
 
 
+def test_utf7_runs():
+    assert utils.str_to_utf7("A && B/Отчёт, 日本") == (
+        b"A &-&- B/&BB4EQgRHBFEEQg-, &ZeVnLA-"
+    )
+    assert utils.utf7_to_unicode(b"A &-&- B/&BB4EQgRHBFEEQg-, &ZeVnLA-") == (
+        "A && B/Отчёт, 日本"
+    )
+    assert utils.utf7_to_unicode(b"Plain ASCII") == "Plain ASCII"
+    assert utils.str_to_utf7("Plain ASCII") == b"Plain ASCII"
+
+
 def test_u():
     assert utils.u("test") == "test"
     assert utils.u("テスト") == "テスト"
@@ -31,3 +42,21 @@ def test_b_to_str():
 def test_str_to_b():
     assert utils.str_to_b("test") == b"test"
     assert utils.str_to_b("ä") == b"\xc3\xa4"
+
+
+def test_expand_sequence_set():
+    assert utils.expand_sequence_set("1:3,7") == [1, 2, 3, 7]
+    assert utils.expand_sequence_set("5:3") == [5, 4, 3]
+    assert utils.expand_sequence_set("42") == [42]
+
+
+def test_list_pattern_to_regex():
+    pattern = utils.list_pattern_to_regex("Work/%", "/")
+    assert pattern.fullmatch("Work/Projects")
+    assert not pattern.fullmatch("Work/Projects/2024")
+    assert utils.list_pattern_to_regex("Work/*", "/").fullmatch("Work/Projects/2024")
+    assert utils.list_pattern_to_regex("a\\*", "/").fullmatch("a\\*")
+    assert not utils.list_pattern_to_regex("a\\*", "/").fullmatch("ab")
+    assert utils.list_pattern_to_regex("Work/%", "/") is pattern
+    assert utils.list_pattern_to_regex("%", "/", wildcards="*").fullmatch("%")
+    assert not utils.list_pattern_to_regex("%", "/", wildcards="*").fullmatch("a")